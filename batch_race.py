@@ -0,0 +1,229 @@
+"""Play many seeded races headless across every CPU core.
+
+Each race is a RaceSimulation driven by a scripted or random driver that
+steers with the same LEFT/RIGHT actions as the J/L keys.  Races are farmed
+out to a process pool and results stream back as they finish: each one is
+written as a JSON line (--out) and folded into a running summary, so memory
+use does not grow with the number of races.
+
+    python batch_race.py --races 2000 --driver dodge
+    python batch_race.py --races 500 --set BOOST_SPEED_CAP=1.1 \\
+        --set 'level_durations={"1": 30, "2": 45}' --out runs.jsonl
+
+--config picks a settings profile (a preset name or a TOML/JSON file, see
+profiles.py); --set NAME=VALUE then overrides a simulation module constant
+(VALUE is JSON) in every worker, for tuning level durations, entity-count
+growth and speed ramps by brute force.  Overrides of profile settings are
+folded into the profile and validated with it before anything is applied,
+so derived values such as LANE_WIDTH follow them.  A dict such as
+level_durations is merged into the profile's, so levels the override
+doesn't name keep their durations.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+import simulation
+import profiles
+from simulation import (CONTINUE, FINAL_LEVEL, LEFT, OBSTACLE_RADIUS, OPPONENT_RADIUS, RIGHT,
+                        TICK_DT, RaceSimulation)
+
+LOOKAHEAD = 140  # track units the dodge driver scans ahead
+MAX_RACE_SECONDS = 900  # give up on races that never end
+
+
+def random_driver(sim, rng):
+    """Changes lane at random, about twice a second."""
+    if rng.random() < 2 * TICK_DT:
+        return [LEFT if rng.random() < 0.5 else RIGHT]
+    return []
+
+
+def _lane_clearance(sim, lane):
+    """Distance ahead to the first obstacle or opponent in `lane`."""
+    px, py = sim.player_car_pos[0], sim.player_car_pos[1]
+    lane_x = px + (lane - sim.player_car_lane) * simulation.LANE_WIDTH
+    nearest = LOOKAHEAD
+    for store, radius in ((sim.obstacles, OBSTACLE_RADIUS), (sim.opponent_cars, OPPONENT_RADIUS)):
+        dy = store.y - py
+        hit = (dy > -radius) & (dy < LOOKAHEAD) & (np.abs(store.x - lane_x) < radius + 6)
+        if hit.any():
+            nearest = min(nearest, float(dy[hit].min()))
+    return nearest
+
+
+def dodge_driver(sim, rng):
+    """Moves toward whichever lane has the most room ahead."""
+    lane = sim.player_car_lane
+    here = _lane_clearance(sim, lane)
+    if here >= LOOKAHEAD:
+        return []
+    best, best_room = lane, here
+    for other in (lane - 1, lane + 1):
+        if -1 <= other <= 1:
+            room = _lane_clearance(sim, other)
+            if room > best_room:
+                best, best_room = other, room
+    if best == lane:
+        return []
+    return [LEFT if best < lane else RIGHT]
+
+
+DRIVERS = {'random': random_driver, 'dodge': dodge_driver}
+
+
+def run_race(task):
+    """Play one race to game over, victory or the time limit."""
+    seed, driver_name = task
+    driver = DRIVERS[driver_name]
+    sim = RaceSimulation(seed=seed)
+    rng = np.random.default_rng(seed ^ 0x5EED)
+    crashes_by_level = [0] * FINAL_LEVEL
+    max_ticks = int(MAX_RACE_SECONDS / TICK_DT)
+    while sim.tick < max_ticks:
+        if sim.game_over or sim.win_message:
+            break
+        if sim.game_paused:
+            inputs = [CONTINUE]
+        else:
+            inputs = driver(sim, rng)
+        level, crashes = sim.current_level, sim.crash_count
+        sim.step(TICK_DT, inputs)
+        crashes_by_level[level - 1] += sim.crash_count - crashes
+    won = sim.win_message is not None
+    return {
+        'seed': seed,
+        'score': sim.score,
+        'crashes': sim.crash_count,
+        'crashes_by_level': crashes_by_level,
+        'level': sim.current_level,
+        'levels_completed': sim.current_level - 1 + won,
+        'won': won,
+        'game_over': sim.game_over,
+        'seconds': round(sim.tick * TICK_DT, 3),
+    }
+
+
+def _merge(current, value):
+    if isinstance(current, dict):
+        return {**current, **{int(k): v for k, v in value.items()}}
+    return value
+
+
+def merge_overrides(profile, overrides):
+    """Fold --set values into a copy of the profile and validate it.
+
+    Returns the profile and the overrides of constants it doesn't cover.
+    """
+    keys = {name: key for key, name in profiles.SIMULATION_KEYS.items()}
+    profile = copy.deepcopy(profile)
+    extra = {}
+    for name, value in overrides.items():
+        if name in keys:
+            profile[keys[name]] = _merge(profile[keys[name]], value)
+        else:
+            extra[name] = value
+    profiles.validate(profile)
+    return profile, extra
+
+
+def _configure(profile, extra):
+    profiles.apply_simulation(profile)
+    for name, value in extra.items():
+        setattr(simulation, name, _merge(getattr(simulation, name), value))
+
+
+def parse_override(text):
+    name, sep, value = text.partition('=')
+    if not sep or not hasattr(simulation, name):
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with a simulation constant, got {text!r}")
+    try:
+        value = json.loads(value)
+    except json.JSONDecodeError as e:
+        raise argparse.ArgumentTypeError(f"{name}: value is not JSON ({e})")
+    if isinstance(getattr(simulation, name), dict):
+        if not isinstance(value, dict) or not all(k.lstrip('-').isdigit() for k in value):
+            raise argparse.ArgumentTypeError(f"{name}: expected a JSON object keyed by number")
+    return name, value
+
+
+class Summary:
+    """Running totals over streamed race results."""
+
+    def __init__(self):
+        self.races = 0
+        self.wins = 0
+        self.game_overs = 0
+        self.score_sum = 0
+        self.crash_sum = 0
+        self.crashes_by_level = np.zeros(FINAL_LEVEL, np.int64)
+        self.completed = np.zeros(FINAL_LEVEL + 1, np.int64)  # histogram of levels_completed
+
+    def add(self, r):
+        self.races += 1
+        self.wins += r['won']
+        self.game_overs += r['game_over']
+        self.score_sum += r['score']
+        self.crash_sum += r['crashes']
+        self.crashes_by_level += r['crashes_by_level']
+        self.completed[r['levels_completed']] += 1
+
+    def lines(self):
+        n = max(self.races, 1)
+        # Races that got past level k = those that completed k or more levels
+        past = self.completed[::-1].cumsum()[::-1][1:]
+        lines = [f"races {self.races}  won {self.wins / n:.1%}  game over {self.game_overs / n:.1%}  "
+                 f"mean score {self.score_sum / n:.0f}  mean crashes {self.crash_sum / n:.2f}"]
+        for level in range(1, FINAL_LEVEL + 1):
+            lines.append(f"  level {level}: completed {past[level - 1] / n:6.1%}  "
+                         f"crashes/race {self.crashes_by_level[level - 1] / n:.2f}")
+        return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--races', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first race")
+    parser.add_argument('--driver', choices=sorted(DRIVERS), default='dodge')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--out', help="append one JSON line per race to this file")
+    parser.add_argument('--config', default='default', help="preset name or TOML/JSON profile")
+    parser.add_argument('--set', type=parse_override, action='append', default=[],
+                        metavar='NAME=VALUE', help="override a simulation constant")
+    args = parser.parse_args(argv)
+
+    try:
+        profile, extra = merge_overrides(profiles.load(args.config), dict(args.set))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    _configure(profile, extra)
+    tasks = ((args.seed + i, args.driver) for i in range(args.races))
+    summary = Summary()
+    out = open(args.out, 'a') if args.out else None
+    start = time.perf_counter()
+    try:
+        with Pool(args.processes, initializer=_configure, initargs=(profile, extra)) as pool:
+            for r in pool.imap_unordered(run_race, tasks, chunksize=4):
+                summary.add(r)
+                if out:
+                    out.write(json.dumps(r) + '\n')
+                if summary.races % 100 == 0:
+                    print(f"{summary.races}/{args.races} races", file=sys.stderr)
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    for line in summary.lines():
+        print(line)
+    print(f"{elapsed:.1f}s on {args.processes} processes ({summary.races / elapsed:.2f} races/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
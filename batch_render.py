@@ -0,0 +1,219 @@
+"""Batched drawing of many copies of one mesh.
+
+Fixed-function OpenGL has no instanced draw call, so the per-instance
+translation (and optional RGBA tint) is applied with NumPy into a single
+streamed vertex buffer, and the whole batch is drawn with one
+glDrawElements per primitive type.  Draw-call count stays flat however
+many obstacles or opponents are on screen.
+
+A split-screen frame uploads the copies once (upload()) and then draws a
+different subset from each viewport (draw_uploaded()); runs of consecutive
+copies in a subset go out in one glMultiDrawElements call.
+
+That CPU transform costs time per vertex, so it only pays for small meshes
+(obstacles, coarse car LODs).  Meshes of LIST_MIN_VERTICES or more - the
+full-detail car - are drawn by MeshList instead: a compiled display list
+per copy, which leaves the vertex work to the GPU.  That is one glCallList
+per car rather than one call per batch, but the call costs about 4.5 us
+against about 63 us to transform and stream the 4184-vertex car, and only
+a few dozen cars are ever on screen.  instanced() picks one.
+"""
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+
+# From here a display list call beats the CPU transform.  level5 with 4
+# players: 10.4 -> 12.0 fps when the cars moved to display lists, and
+# 11.1-13.2 fps (all InstanceBatch) vs 13.2-15.1 fps (this) when re-checked.
+LIST_MIN_VERTICES = 256
+
+
+def _upload(target, buffer_id, data, usage):
+    glBindBuffer(target, buffer_id)
+    glBufferData(target, data.nbytes, data, usage)
+
+
+class InstanceBatch:
+    """Draws any number of translated (and optionally tinted) copies of a mesh."""
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.capacity = 0
+        self.count = 0  # copies in the buffers since the last upload()
+        self.draw_calls = 0  # issued by the last draw()
+        self._tinted = False
+        self._position_vbo, self._normal_vbo, self._color_vbo, self._tint_vbo, \
+            self._triangle_ibo, self._line_ibo = glGenBuffers(6)
+
+    def _grow(self, count):
+        """Resize the per-instance buffers to hold at least count copies."""
+        mesh = self.mesh
+        self.capacity = max(count, self.capacity * 2, 8)
+        n, v = self.capacity, mesh.vertex_count
+        self._positions = np.empty((n, v, 3), np.float32)
+        self._colors = np.empty((n, v, 4), np.float32)
+        base = (np.arange(n, dtype=np.uint32) * v)[:, None]
+        _upload(GL_ARRAY_BUFFER, self._normal_vbo, np.tile(mesh.normals, (n, 1)), GL_STATIC_DRAW)
+        _upload(GL_ARRAY_BUFFER, self._color_vbo, np.tile(mesh.colors, (n, 1)), GL_STATIC_DRAW)
+        if len(mesh.triangles):
+            _upload(GL_ELEMENT_ARRAY_BUFFER, self._triangle_ibo,
+                    (mesh.triangles[None, :] + base).ravel(), GL_STATIC_DRAW)
+        if len(mesh.lines):
+            _upload(GL_ELEMENT_ARRAY_BUFFER, self._line_ibo,
+                    (mesh.lines[None, :] + base).ravel(), GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def upload(self, offsets, tints=None):
+        """Stream one copy per row of offsets ((n, 3)); tints is (n, 4) RGBA."""
+        count = self.count = len(offsets)
+        self._tinted = tints is not None
+        if count == 0:
+            return
+        if count > self.capacity:
+            self._grow(count)
+        mesh = self.mesh
+
+        positions = self._positions[:count]
+        np.add(mesh.positions[None, :, :], np.asarray(offsets, np.float32)[:, None, :], out=positions)
+        _upload(GL_ARRAY_BUFFER, self._position_vbo, positions, GL_STREAM_DRAW)
+        if self._tinted:
+            colors = self._colors[:count]
+            np.multiply(mesh.colors[None, :, :], np.asarray(tints, np.float32)[:, None, :], out=colors)
+            _upload(GL_ARRAY_BUFFER, self._tint_vbo, colors, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, offsets, tints=None):
+        """Draw one copy per row of offsets ((n, 3)); tints is (n, 4) RGBA."""
+        self.upload(offsets, tints)
+        self.draw_uploaded()
+
+    def draw_uploaded(self, which=None):
+        """Draw the uploaded copies picked by a bool mask or sorted indices (None = all)."""
+        self.draw_calls = 0
+        if which is None:
+            starts = ends = None
+            if self.count == 0:
+                return
+        else:
+            idx = np.flatnonzero(which) if np.asarray(which).dtype == bool else np.asarray(which)
+            if len(idx) == 0:
+                return
+            # One index range per run of consecutive copies
+            breaks = np.flatnonzero(np.diff(idx) != 1) + 1
+            starts = idx[np.concatenate([[0], breaks])]
+            ends = idx[np.concatenate([breaks - 1, [len(idx) - 1]])] + 1
+        mesh = self.mesh
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self._position_vbo)
+        glVertexPointer(3, GL_FLOAT, 0, ctypes.c_void_p(0))
+        glBindBuffer(GL_ARRAY_BUFFER, self._normal_vbo)
+        glNormalPointer(GL_FLOAT, 0, ctypes.c_void_p(0))
+        glBindBuffer(GL_ARRAY_BUFFER, self._tint_vbo if self._tinted else self._color_vbo)
+        glColorPointer(4, GL_FLOAT, 0, ctypes.c_void_p(0))
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        for mode, elements, ibo in ((GL_TRIANGLES, mesh.triangles, self._triangle_ibo),
+                                    (GL_LINES, mesh.lines, self._line_ibo)):
+            per = len(elements)
+            if not per:
+                continue
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+            if starts is None:
+                glDrawElements(mode, self.count * per, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+            elif len(starts) == 1:
+                glDrawElements(mode, int(ends[0] - starts[0]) * per, GL_UNSIGNED_INT,
+                               ctypes.c_void_p(int(starts[0]) * per * 4))
+            else:
+                counts = ((ends - starts) * per).astype(np.int32)
+                offsets = (ctypes.c_void_p * len(starts))(*(int(s) * per * 4 for s in starts))
+                glMultiDrawElements(mode, counts, GL_UNSIGNED_INT, offsets, len(starts))
+            self.draw_calls += 1
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_NORMAL_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+
+class MeshList:
+    """Draws translated (and optionally tinted) copies of a mesh from display lists.
+
+    Same interface as InstanceBatch.  Each distinct tint is compiled into
+    its own list on first use; share= reuses another MeshList's lists.
+    """
+
+    def __init__(self, mesh, share=None):
+        self.mesh = mesh
+        self.count = 0
+        self.draw_calls = 0
+        self._lists = {} if share is None else share._lists  # tint (or None) -> list
+        self._offsets = []
+        self._tints = []
+
+    def _list(self, tint):
+        dl = self._lists.get(tint)
+        if dl is None:
+            mesh = self.mesh
+            colors = mesh.colors if tint is None else mesh.colors * np.asarray(tint, np.float32)
+            dl = self._lists[tint] = glGenLists(1)
+            # Client-array draws are dereferenced into the list at compile time
+            glNewList(dl, GL_COMPILE)
+            glEnableClientState(GL_VERTEX_ARRAY)
+            glEnableClientState(GL_NORMAL_ARRAY)
+            glEnableClientState(GL_COLOR_ARRAY)
+            glVertexPointer(3, GL_FLOAT, 0, mesh.positions)
+            glNormalPointer(GL_FLOAT, 0, mesh.normals)
+            glColorPointer(4, GL_FLOAT, 0, np.ascontiguousarray(colors, np.float32))
+            if len(mesh.triangles):
+                glDrawElements(GL_TRIANGLES, len(mesh.triangles), GL_UNSIGNED_INT, mesh.triangles)
+            if len(mesh.lines):
+                glDrawElements(GL_LINES, len(mesh.lines), GL_UNSIGNED_INT, mesh.lines)
+            glDisableClientState(GL_COLOR_ARRAY)
+            glDisableClientState(GL_NORMAL_ARRAY)
+            glDisableClientState(GL_VERTEX_ARRAY)
+            glEndList()
+        return dl
+
+    def upload(self, offsets, tints=None):
+        """Remember one copy per row of offsets ((n, 3)); tints is (n, 4) RGBA."""
+        self._offsets = np.asarray(offsets, float).reshape(-1, 3).tolist()
+        self.count = len(self._offsets)
+        if tints is None:
+            self._tints = [self._list(None)] * self.count
+        else:
+            self._tints = [self._list(tuple(map(float, tint))) for tint in tints]
+
+    def draw(self, offsets, tints=None):
+        """Draw one copy per row of offsets ((n, 3)); tints is (n, 4) RGBA."""
+        self.upload(offsets, tints)
+        self.draw_uploaded()
+
+    def draw_uploaded(self, which=None):
+        """Draw the uploaded copies picked by a bool mask or sorted indices (None = all)."""
+        if which is None:
+            idx = range(self.count)
+        elif np.asarray(which).dtype == bool:
+            idx = np.flatnonzero(which).tolist()
+        else:
+            idx = np.asarray(which).tolist()
+        offsets, lists = self._offsets, self._tints
+        for i in idx:
+            x, y, z = offsets[i]
+            glPushMatrix()
+            glTranslatef(x, y, z)
+            glCallList(lists[i])
+            glPopMatrix()
+        self.draw_calls = len(idx)
+
+
+def instanced(mesh):
+    """A MeshList for big meshes, an InstanceBatch for small ones."""
+    if mesh.vertex_count >= LIST_MIN_VERTICES:
+        return MeshList(mesh)
+    return InstanceBatch(mesh)
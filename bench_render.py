@@ -0,0 +1,202 @@
+"""Offscreen rendering benchmark.
+
+Renders scripted scenes through race.showScreen() into an offscreen
+framebuffer - an EGL pbuffer or OSMesa, so Mesa's software rasteriser
+works on a GPU-less Linux box - and reports frames/sec and per-phase
+timings from the frame profiler.
+
+    python bench_render.py
+    python bench_render.py --platform osmesa --frames 600
+    python bench_render.py --json new.json --baseline old.json --tolerance 0.15
+    python bench_render.py --players 2          # split screen
+
+With --baseline the run fails (exit code 1) if any scenario's fps drops
+more than --tolerance below the baseline's.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+WIDTH, HEIGHT = 800, 600
+SIM_FRAME = 1.0 / 60  # simulated time per rendered frame
+
+# name, level, rain, view_distance
+SCENARIOS = [
+    ('level1', 1, False, 600),
+    ('level5', 5, False, 600),
+    ('level1-rain', 1, True, 600),
+    ('level5-rain', 5, True, 600),
+    ('level5-view300', 5, False, 300),
+    ('level5-view1200', 5, False, 1200),
+]
+
+
+def _egl_context():
+    # Mesa needs a platform without a display server
+    os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+    import ctypes
+    from OpenGL import EGL
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize failed")
+    attrs = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+             EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+             EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+             EGL.EGL_NONE]
+    config, count = EGL.EGLConfig(), EGL.EGLint()
+    if not EGL.eglChooseConfig(display, (EGL.EGLint * len(attrs))(*attrs),
+                               ctypes.pointer(config), 1, ctypes.pointer(count)) or not count.value:
+        raise RuntimeError("no suitable EGL config")
+    size = [EGL.EGL_WIDTH, WIDTH, EGL.EGL_HEIGHT, HEIGHT, EGL.EGL_NONE]
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * len(size))(*size))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("eglMakeCurrent failed")
+    return display, surface, context
+
+
+def _osmesa_context():
+    from OpenGL import arrays, osmesa
+    from OpenGL.GL import GL_UNSIGNED_BYTE
+
+    context = osmesa.OSMesaCreateContextExt(osmesa.OSMESA_RGBA, 24, 0, 0, None)
+    buffer = arrays.GLubyteArray.zeros((HEIGHT, WIDTH, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, GL_UNSIGNED_BYTE, WIDTH, HEIGHT):
+        raise RuntimeError("OSMesaMakeCurrent failed")
+    return context, buffer
+
+
+_context = None  # the current context's handles (and OSMesa's buffer), kept alive
+
+
+def create_context(platform):
+    """Make an offscreen GL context current (PYOPENGL_PLATFORM must match)."""
+    global _context
+    if platform == 'egl':
+        _context = _egl_context()
+    elif platform == 'osmesa':
+        _context = _osmesa_context()
+    else:
+        raise ValueError(f"unknown platform {platform!r}")
+
+
+def run_scenario(race, name, level, rain, view_distance, frames, warmup, players=1):
+    import simulation
+    from OpenGL.GL import glFinish
+    from profiler import FrameProfiler
+    from track_mesh import TrackMesh
+
+    # Scene setup: view distance, level entity counts, rain
+    race.view_distance = simulation.view_distance = view_distance
+    race.profiler = FrameProfiler(window=frames)
+    sim = race.sim = simulation.RaceSimulation(profiler=race.profiler, players=players)
+    for _ in range(level - 1):
+        sim.advance_level()
+    # Start with the level's full traffic instead of phasing it in
+    sim.init_obstacles()
+    sim.init_opponents()
+    race._track_mesh = TrackMesh(sim.track, race.track_width, race.lane_segment, view_distance,
+                                 views=players)
+    race.sim_clock = simulation.FixedTimestep()
+    race.rain_enabled = rain
+    race.present_frame = glFinish
+
+    start = None
+    for frame in range(warmup + frames):
+        if frame == warmup:
+            race.profiler.frames.clear()
+            race.culler.reset_stats()
+            start = time.perf_counter()
+        race.profiler.begin_frame()
+        # Scripted drivers: weave between lanes, keep going after crashes
+        inputs = []
+        for player in range(players):
+            if (frame + 30 * player) % 90 == 45:
+                weave = simulation.LEFT if ((frame + 30 * player) // 90) % 2 else simulation.RIGHT
+                inputs.append((weave, player))
+        if sim.game_over or sim.game_paused:
+            sim.reset_game()
+        with race.profiler.scope('sim'):
+            race.render_alpha = race.sim_clock.advance(sim, SIM_FRAME, inputs)
+        race.showScreen()
+    race.profiler.begin_frame()  # close the last frame
+    elapsed = time.perf_counter() - start
+
+    phases = {n: race.profiler.stats(n)['mean'] for n in race.profiler.names()}
+    frame_stats = race.profiler.stats()
+    cull = {kind: {k: v / frames for k, v in counts.items()}
+            for kind, counts in race.culler.total_stats().items()}
+    return {
+        'fps': frames / elapsed,
+        'frame_p50_ms': frame_stats['p50'],
+        'frame_p95_ms': frame_stats['p95'],
+        'frame_p99_ms': frame_stats['p99'],
+        'opponents': len(sim.opponent_cars),
+        'obstacles': len(sim.obstacles),
+        'phases_mean_ms': phases,
+        'cull_per_frame': cull,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--platform', choices=('egl', 'osmesa'), default='egl')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--scenario', action='append', help="run only these (repeatable)")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', help="compare fps against an earlier --json file")
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    parser.add_argument('--config', default='default', help="settings preset or TOML/JSON profile")
+    parser.add_argument('--players', type=int, default=1, help="split-screen player cars")
+    args = parser.parse_args(argv)
+
+    os.environ['PYOPENGL_PLATFORM'] = args.platform
+    create_context(args.platform)
+    from OpenGL.GL import glViewport
+    from hud import Hud, block_glyph
+    import profiles
+    import race
+
+    race.configure(profiles.load(args.config))
+    glViewport(0, 0, WIDTH, HEIGHT)
+    race.init(verbose=False)
+    race.hud = Hud(glyph_fn=block_glyph)  # GLUT fonts need a window
+
+    results = {}
+    for name, level, rain, view_distance in SCENARIOS:
+        if args.scenario and name not in args.scenario:
+            continue
+        r = results[name] = run_scenario(race, name, level, rain, view_distance,
+                                         args.frames, args.warmup, args.players)
+        phases = '  '.join(f"{k}={v:.2f}" for k, v in sorted(r['phases_mean_ms'].items())
+                           if k != 'frame')
+        print(f"{name:<16} {r['fps']:8.1f} fps  p50 {r['frame_p50_ms']:6.2f}  "
+              f"p95 {r['frame_p95_ms']:6.2f} ms  [{phases}]")
+        print(' ' * 17 + '  '.join(f"{kind} drawn {c['drawn']:.1f} culled {c['culled']:.1f}"
+                                   for kind, c in sorted(r['cull_per_frame'].items())))
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        failed = False
+        for name, r in results.items():
+            old = baseline.get(name)
+            if old and r['fps'] < old['fps'] * (1 - args.tolerance):
+                print(f"REGRESSION {name}: {r['fps']:.1f} fps vs baseline {old['fps']:.1f}")
+                failed = True
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""View-frustum and distance culling for batched entities.
+
+The camera's frustum is rebuilt from the same parameters setupCamera()
+hands to gluPerspective/gluLookAt (in NumPy, so nothing is read back from
+the GL), as six planes.  visible() tests a whole array of axis-aligned
+bounding boxes against them at once and returns a mask of the boxes that
+can appear on screen; boxes further from the eye than max_distance are
+dropped too.  Per-kind drawn/culled counts for the last frame (summed over
+every camera set since begin_frame(), for split screen), and running
+totals, are kept for the stats API.
+"""
+import math
+
+import numpy as np
+
+
+def perspective(fovy, aspect, near, far):
+    """The matrix gluPerspective builds."""
+    f = 1.0 / math.tan(math.radians(fovy) / 2)
+    return np.array([[f / aspect, 0, 0, 0],
+                     [0, f, 0, 0],
+                     [0, 0, (far + near) / (near - far), 2 * far * near / (near - far)],
+                     [0, 0, -1, 0]])
+
+
+def look_at(eye, target, up):
+    """The matrix gluLookAt builds."""
+    eye = np.asarray(eye, float)
+    forward = np.asarray(target, float) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, up)
+    side /= np.linalg.norm(side)
+    up = np.cross(side, forward)
+    m = np.identity(4)
+    m[0, :3], m[1, :3], m[2, :3] = side, up, -forward
+    m[:3, 3] = -m[:3, :3] @ eye
+    return m
+
+
+class FrustumCuller:
+    """Culls entity bounding boxes against the current camera."""
+
+    def __init__(self):
+        self.planes = np.zeros((6, 4))  # a, b, c, d with inward normals
+        self.eye = np.zeros(3)
+        self.max_distance = None
+        self.enabled = True
+        self.frame = {}  # kind -> (drawn, culled) since begin_frame()
+        self.totals = {}  # kind -> [drawn, culled] since reset_stats()
+
+    def set_camera(self, eye, target, up, fovy, aspect, near, far, max_distance=None):
+        """Rebuild the frustum for a new frame (same arguments as the GLU calls)."""
+        clip = perspective(fovy, aspect, near, far) @ look_at(eye, target, up)
+        # Gribb/Hartmann: left, right, bottom, top, near, far
+        rows = clip[3] + np.array([clip[0], -clip[0], clip[1], -clip[1], clip[2], -clip[2]])
+        self.planes = rows / np.linalg.norm(rows[:, :3], axis=1)[:, None]
+        self.eye = np.asarray(eye, float)
+        self.max_distance = max_distance
+
+    def begin_frame(self):
+        """Start a new frame's drawn/culled counts."""
+        self.frame = {}
+
+    def visible(self, kind, centers, half_extents):
+        """Mask of the (n, 3) box centers whose boxes may be on screen."""
+        centers = np.asarray(centers, float).reshape(-1, 3)
+        if not self.enabled:
+            mask = np.ones(len(centers), bool)
+        else:
+            normals, d = self.planes[:, :3], self.planes[:, 3]
+            # Box is outside a plane if even its nearest corner is behind it
+            reach = np.abs(normals) @ np.asarray(half_extents, float)
+            mask = ((centers @ normals.T + d) >= -reach).all(axis=1)
+            if self.max_distance is not None:
+                radius = float(np.linalg.norm(half_extents))
+                dist2 = ((centers - self.eye) ** 2).sum(axis=1)
+                mask &= dist2 <= (self.max_distance + radius) ** 2
+        drawn = int(mask.sum())
+        d, c = self.frame.get(kind, (0, 0))
+        self.frame[kind] = (d + drawn, c + len(mask) - drawn)
+        total = self.totals.setdefault(kind, [0, 0])
+        total[0] += drawn
+        total[1] += len(mask) - drawn
+        return mask
+
+    def stats(self):
+        """{kind: {'drawn', 'culled'}} for the last frame."""
+        return {kind: {'drawn': d, 'culled': c} for kind, (d, c) in self.frame.items()}
+
+    def total_stats(self):
+        """{kind: {'drawn', 'culled'}} summed since the last reset_stats()."""
+        return {kind: {'drawn': d, 'culled': c} for kind, (d, c) in self.totals.items()}
+
+    def reset_stats(self):
+        self.totals = {}
+
+    def overlay_lines(self):
+        return [f"cull {kind:<14} drawn {d:5d}  culled {c:5d}" for kind, (d, c) in sorted(self.frame.items())]
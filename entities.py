@@ -0,0 +1,199 @@
+"""Structure-of-arrays storage for opponents and obstacles.
+
+Each EntityStore keeps one NumPy array per attribute (x, y, speed, lane,
+active, ...) instead of a list of dicts, so the per-tick update,
+curvature and recycle passes run as a handful of vectorised operations
+no matter how many entities are on the track.
+
+Storage is a pool: shrinking only lowers `count`, and the arrays are
+reallocated only when a group outgrows its capacity, so respawning on a
+level change or boost reuses the same memory.  The per-tick passes work
+through preallocated scratch buffers and allocate nothing.
+"""
+import numpy as np
+
+_FIELDS = ('_x', '_y', '_prev_x', '_prev_y', '_speed', '_lane', '_lane_pos', '_active')
+_NONE = np.zeros(0, dtype=np.intp)
+
+
+class EntityStore:
+    """A resizable group of track entities stored as parallel arrays.
+
+    Only the first `count` slots are live; use the live views (x, y, ...)
+    which always cover exactly those slots.
+    """
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        self.capacity = capacity
+        self._x = np.zeros(capacity)
+        self._y = np.zeros(capacity)
+        self._prev_x = np.zeros(capacity)
+        self._prev_y = np.zeros(capacity)
+        self._speed = np.zeros(capacity)
+        self._lane = np.zeros(capacity, dtype=np.int8)
+        self._lane_pos = np.zeros(capacity)  # eases toward lane during a lane change
+        self._active = np.zeros(capacity, dtype=bool)
+        # Scratch space for the per-tick passes and positions()
+        self._step = np.zeros(capacity)
+        self._mask = np.zeros(capacity, dtype=bool)
+        self._pos = np.zeros((capacity, 3))
+
+    def resize(self, count):
+        """Set the number of live entities, growing storage if needed.
+
+        New slots start zeroed and inactive; existing slots keep their data.
+        """
+        if count > self.capacity:
+            keep = {name: getattr(self, name)[:self.count].copy() for name in _FIELDS}
+            capacity = max(count, self.capacity * 2)
+            self._alloc(capacity)
+            for name, values in keep.items():
+                getattr(self, name)[:len(values)] = values
+        if count > self.count:
+            for name in _FIELDS:
+                getattr(self, name)[self.count:count] = 0
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    # Live views - writes go straight into the backing arrays
+    @property
+    def x(self):
+        return self._x[:self.count]
+
+    @property
+    def y(self):
+        return self._y[:self.count]
+
+    @property
+    def prev_x(self):
+        return self._prev_x[:self.count]
+
+    @property
+    def prev_y(self):
+        return self._prev_y[:self.count]
+
+    @property
+    def speed(self):
+        return self._speed[:self.count]
+
+    @property
+    def lane(self):
+        return self._lane[:self.count]
+
+    @property
+    def lane_pos(self):
+        return self._lane_pos[:self.count]
+
+    @property
+    def active(self):
+        return self._active[:self.count]
+
+    def spawn(self, x, y, speed=0.0, lane=0):
+        """Replace the whole group with len(y) fresh, active entities."""
+        self.resize(len(y))
+        self.x[:] = x
+        self.y[:] = y
+        self.speed[:] = speed
+        self.lane[:] = lane
+        self.lane_pos[:] = self.lane
+        self.active[:] = True
+        self.save_prev()
+
+    def append(self, x, y, speed=0.0, lane=0):
+        """Activate one more slot at the end of the group."""
+        i = self.count
+        self.resize(i + 1)
+        self._x[i] = self._prev_x[i] = x
+        self._y[i] = self._prev_y[i] = y
+        self._speed[i] = speed
+        self._lane[i] = self._lane_pos[i] = lane
+        self._active[i] = True
+
+    def swap_remove(self, i):
+        """Retire slot i by moving the last live entity into it."""
+        last = self.count - 1
+        for name in _FIELDS:
+            values = getattr(self, name)
+            values[i] = values[last]
+        self.count = last
+
+    def save_prev(self):
+        """Remember current positions (used for render interpolation)."""
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+
+    def advance(self, frames):
+        """Move every active entity forward by speed * frames."""
+        step = self._step[:self.count]
+        y = self.y
+        np.multiply(self.speed, frames, out=step)
+        np.add(y, step, out=y, where=self.active)
+
+    def set_lanes(self, idx, lanes):
+        """Put entities idx straight into lanes (no lane-change easing)."""
+        self.lane[idx] = lanes
+        self.lane_pos[idx] = self.lane[idx]
+
+    def steer(self, max_step):
+        """Ease lane_pos toward lane by at most max_step lanes."""
+        step = self._step[:self.count]
+        lane_pos = self.lane_pos
+        np.subtract(self.lane, lane_pos, out=step)
+        # np.minimum/maximum rather than np.clip, whose wrapper costs more
+        # than the clipping at the usual handful of cars
+        np.minimum(step, max_step, out=step)
+        np.maximum(step, -max_step, out=step)
+        lane_pos += step
+
+    def follow_lanes(self, lane_width, offsets):
+        """Put x at the (possibly in-between) lane position plus the track's
+        lateral offset at y."""
+        x = self.x
+        np.multiply(self.lane_pos, lane_width, out=x)
+        x += offsets
+
+    def behind(self, y_limit):
+        """Indices of live entities whose y has fallen below y_limit."""
+        mask = self._mask[:self.count]
+        np.less(self.y, y_limit, out=mask)
+        if not mask.any():
+            return _NONE
+        return np.flatnonzero(mask)
+
+    def interpolated(self, alpha, max_jump):
+        """positions() blended alpha of the way from the previous tick.
+
+        Entities that moved more than max_jump (recycled) snap to their new
+        position.  Shares positions()' buffer.
+        """
+        n = self.count
+        pos = self._pos[:n]
+        a = self._step[:n]
+        mask = self._mask[:n]
+        np.subtract(self.y, self.prev_y, out=a)
+        np.abs(a, out=a)
+        np.greater(a, max_jump, out=mask)
+        a.fill(alpha)
+        np.copyto(a, 1.0, where=mask)
+        for col, cur, prev in ((0, self.x, self.prev_x), (1, self.y, self.prev_y)):
+            out = pos[:, col]
+            np.subtract(cur, prev, out=out)
+            out *= a
+            out += prev
+        return pos
+
+    def positions(self):
+        """(count, 3) live positions (z is always 0).
+
+        This is a view of a buffer reused on every call; copy it to keep it.
+        """
+        pos = self._pos[:self.count]
+        pos[:, 0] = self.x
+        pos[:, 1] = self.y
+        return pos
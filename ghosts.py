@@ -0,0 +1,280 @@
+"""Ghost cars: a run's trajectory recorded compactly and raced against later.
+
+A ghost file holds one car's y position, lane and speed for every tick it
+was driving (ticks spent paused between levels are skipped, so a ghost
+keeps pace with the player however long they sit on the level screen).
+
+    python race.py --save-ghost best.ghost          # record player one
+    python race.py --ghosts best.ghost              # race against it
+    python race.py --ghosts ghosts/                 # the top MAX_GHOSTS by score
+    python ghosts.py ghosts/*.ghost                 # list them
+
+File layout (little-endian):
+
+    header   b'RGHO', u8 version, f64 tick_dt, u32 ticks, i64 score, u8 level
+    records  varint (zigzag(dy) << 1 | changed), then if changed:
+             u8 lane + 1, varint speed * SPEED_QUANT          (one per tick)
+
+dy is the change in round(y * QUANT) since the previous tick, which at
+any legal speed fits a one-byte varint, so a ghost costs about TICK_RATE
+bytes per second of driving.  Lane and speed are only written when they
+change.  Readers memory-map the file and decode one record per tick as
+the race goes, so nothing is loaded up front and rewinding for a restart
+just resets the cursor.
+"""
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+import simulation
+
+MAGIC = b'RGHO'
+VERSION = 1
+QUANT = 32  # y travels in 1/QUANT units
+SPEED_QUANT = 4096
+MAX_GHOSTS = 10
+
+_HEADER = struct.Struct('<4sBdIqB')
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+class GhostRecorder:
+    """Streams one player's car to a ghost file; add it to sim.tick_hooks.
+
+    A restart begins the file again, so it always holds the latest run.
+    close() fills in the header's tick count and the final score.
+    """
+
+    def __init__(self, path, player=0, tick_dt=simulation.TICK_DT):
+        self.player = player
+        self.tick_dt = tick_dt
+        self._fh = open(path, 'wb')
+        self._run = None
+        self._sim = None
+
+    def _begin(self, sim):
+        self._sim = sim
+        self._run = sim.run
+        self._fh.seek(0)
+        self._fh.truncate()
+        self._fh.write(_HEADER.pack(MAGIC, VERSION, self.tick_dt, 0, 0, 0))
+        self.ticks = 0
+        self._y = 0
+        self._lane = self._speed = None
+
+    def __call__(self, sim):
+        if sim.run != self._run:
+            self._begin(sim)
+        car = sim.players[self.player]
+        y = round(car.pos[1] * QUANT)
+        dy, self._y = y - self._y, y
+        speed = round(car.speed * SPEED_QUANT)
+        changed = car.lane != self._lane or speed != self._speed
+        zigzag = dy * 2 if dy >= 0 else -dy * 2 - 1
+        record = _varint(zigzag << 1 | changed)
+        if changed:
+            record += bytes([car.lane + 1]) + _varint(speed)
+            self._lane, self._speed = car.lane, speed
+        self._fh.write(record)
+        self.ticks += 1
+
+    def close(self):
+        if self._fh.closed:
+            return
+        if self._sim is not None:
+            car = self._sim.players[self.player]
+            self._fh.seek(0)
+            self._fh.write(_HEADER.pack(MAGIC, VERSION, self.tick_dt, self.ticks, car.score,
+                                        self._sim.current_level))
+        self._fh.close()
+
+
+def read_header(path):
+    """{'tick_dt', 'ticks', 'score', 'level'} of a ghost file."""
+    with open(path, 'rb') as fh:
+        data = fh.read(_HEADER.size)
+    if len(data) < _HEADER.size or data[:4] != MAGIC:
+        raise ValueError(f"{path}: not a ghost file")
+    _, version, tick_dt, ticks, score, level = _HEADER.unpack(data)
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported ghost version {version}")
+    return {'tick_dt': tick_dt, 'ticks': ticks, 'score': score, 'level': level}
+
+
+def _count_records(data, pos):
+    """Tick records from pos to the end of data, or -1 if the last is cut short."""
+    end = len(data)
+    count = 0
+    try:
+        while pos < end:
+            changed = data[pos] & 1
+            while data[pos] & 0x80:
+                pos += 1
+            pos += 1
+            if changed:
+                pos += 1  # lane
+                while data[pos] & 0x80:
+                    pos += 1
+                pos += 1
+            count += 1
+    except IndexError:
+        return -1
+    return count
+
+
+class Ghost:
+    """A memory-mapped ghost file, decoded one tick at a time."""
+
+    def __init__(self, path):
+        self.path = path
+        header = read_header(path)
+        self.score, self.ticks = header['score'], header['ticks']
+        with open(path, 'rb') as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if _count_records(self._map, _HEADER.size) != self.ticks:
+            self._map.close()
+            raise ValueError(f"{path}: truncated ghost (header says {self.ticks} ticks)")
+        self.rewind()
+
+    def rewind(self):
+        self._pos = _HEADER.size
+        self._y = 0
+        self.lane = 0
+        self.speed = 0.0
+        self.tick = 0
+        self.finished = self._pos >= len(self._map)
+
+    def _read_varint(self):
+        data, pos = self._map, self._pos
+        n = shift = 0
+        while True:
+            b = data[pos]
+            pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                self._pos = pos
+                return n
+            shift += 7
+
+    def advance(self):
+        """Decode the next tick; returns False once the run has ended."""
+        if self.finished:
+            return False
+        value = self._read_varint()
+        zigzag = value >> 1
+        self._y += zigzag >> 1 if not zigzag & 1 else -((zigzag + 1) >> 1)
+        if value & 1:
+            self.lane = self._map[self._pos] - 1
+            self._pos += 1
+            self.speed = self._read_varint() / SPEED_QUANT
+        self.tick += 1
+        self.finished = self._pos >= len(self._map)
+        return True
+
+    @property
+    def y(self):
+        return self._y / QUANT
+
+    def close(self):
+        self._map.close()
+
+
+class GhostPack:
+    """Ghosts raced in step with a simulation; add it to sim.tick_hooks.
+
+    Keeps current and previous-tick positions of every ghost for the
+    renderer; ghosts whose run has ended stay where they finished.
+    """
+
+    def __init__(self, ghosts, track):
+        self.ghosts = ghosts
+        self.track = track
+        self._run = None
+        n = len(ghosts)
+        self.pos = np.zeros((n, 3))
+        self.prev_pos = np.zeros((n, 3))
+        self._lerp = np.zeros((n, 3))
+
+    def __call__(self, sim):
+        if sim.run != self._run:
+            self._run = sim.run
+            for ghost in self.ghosts:
+                ghost.rewind()
+            self._place()
+        self.prev_pos[:] = self.pos
+        for ghost in self.ghosts:
+            ghost.advance()
+        self._place()
+
+    def _place(self):
+        for i, ghost in enumerate(self.ghosts):
+            self.pos[i, 0] = ghost.lane * simulation.LANE_WIDTH + self.track.offset(ghost.y)
+            self.pos[i, 1] = ghost.y
+
+    def positions(self, alpha):
+        """(n, 3) ghost positions alpha of the way through the tick (a reused buffer)."""
+        out = self._lerp
+        np.subtract(self.pos, self.prev_pos, out=out)
+        # Snap across respawns instead of sliding back down the track
+        jumps = np.abs(out[:, 1]) > simulation.MAX_INTERP_JUMP
+        out *= alpha
+        out += self.prev_pos
+        out[jumps] = self.pos[jumps]
+        return out
+
+
+def load(path, limit=MAX_GHOSTS):
+    """Ghosts from one file, or the `limit` best-scoring files in a directory."""
+    if not os.path.isdir(path):
+        return [Ghost(path)]
+    ranked = []
+    for name in os.listdir(path):
+        full = os.path.join(path, name)
+        if name.endswith('.ghost'):
+            try:
+                ranked.append((read_header(full)['score'], full))
+            except ValueError:
+                continue
+    ranked.sort(reverse=True)
+    loaded = []
+    for _, full in ranked:
+        if len(loaded) == limit:
+            break
+        try:
+            loaded.append(Ghost(full))
+        except ValueError:
+            continue
+    return loaded
+
+
+def main(argv=None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print("usage: python ghosts.py FILE.ghost [...]")
+        return 2
+    for path in paths:
+        try:
+            h = read_header(path)
+        except (OSError, ValueError) as e:
+            print(f"{path}: {e}")
+            continue
+        seconds = h['ticks'] * h['tick_dt']
+        size = os.path.getsize(path)
+        print(f"{path}: score {h['score']}  level {h['level']}  {seconds:.1f}s driven  "
+              f"{size:,} bytes ({size / max(seconds, 1e-9):.0f} B/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""2D heads-up display with cached text.
+
+The screen-space projection is set up once per frame (begin/end) instead
+of once per string.  Every glyph of a GLUT bitmap font is compiled into a
+display list the first time the font is used, and each HUD line is
+compiled into its own display list that is only rebuilt when its text
+changes - an unchanged line (like the controls banner) costs a single
+glCallList per frame.  Split-screen HUDs (one per viewport) share the
+glyph lists and keep their own line caches.
+"""
+from OpenGL.GL import *
+from OpenGL.GLU import *
+import OpenGL.GLUT as GLUTmod
+
+SCREEN_W, SCREEN_H = 800, 600
+
+
+def _font_key(font):
+    """GLUT fonts are ctypes pointers (unhashable); key them by address."""
+    return getattr(font, 'value', font)
+
+
+class Hud:
+    """Screen-space text layer; call begin(), text()..., end() each frame."""
+
+    def __init__(self, glyph_fn=None, share=None):
+        # Draws one character; defaults to GLUT's bitmap fonts
+        self.glyph_fn = GLUTmod.glutBitmapCharacter if glyph_fn is None else glyph_fn
+        self._glyph_bases = {}  # font -> first of 256 glyph display lists
+        if share is not None:
+            # Same font, same lists: compile each glyph once across HUDs
+            self.glyph_fn = share.glyph_fn
+            self._glyph_bases = share._glyph_bases
+        self._lines = {}  # (x, y, font) -> [text, display list]
+
+    def begin(self, width=SCREEN_W, height=SCREEN_H):
+        """Map text coordinates to pixels of a width x height viewport."""
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        gluOrtho2D(0, width, 0, height)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+
+    def end(self):
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+
+    def _glyphs(self, font):
+        base = self._glyph_bases.get(_font_key(font))
+        if base is None:
+            base = glGenLists(256)
+            for code in range(256):
+                glNewList(base + code, GL_COMPILE)
+                self.glyph_fn(font, code)
+                glEndList()
+            self._glyph_bases[_font_key(font)] = base
+        return base
+
+    def text(self, x, y, text, font=None):
+        """Draw white text at (x, y), recompiling only if it changed."""
+        if font is None:
+            font = GLUTmod.GLUT_BITMAP_HELVETICA_12
+        key = (x, y, _font_key(font))
+        line = self._lines.get(key)
+        if line is None:
+            line = self._lines[key] = [None, glGenLists(1)]
+        if line[0] != text:
+            base = self._glyphs(font)
+            glNewList(line[1], GL_COMPILE)
+            glColor3f(1, 1, 1)
+            glRasterPos2f(x, y)
+            glListBase(base)
+            glCallLists(text.encode('latin-1', 'replace'))
+            glEndList()
+            line[0] = text
+        glCallList(line[1])
+
+
+_BLOCK = bytes([0xff]) * 12
+
+
+def block_glyph(font, code):
+    """Stand-in for glutBitmapCharacter when GLUT has no display (offscreen
+    benchmarks): a solid 7x12 cell with the same advance as Helvetica 12."""
+    if code > 32:
+        glBitmap(8, 12, 0, 0, 7, 0, _BLOCK)
+    else:
+        glBitmap(0, 0, 0, 0, 7, 0, _BLOCK)
@@ -0,0 +1,34 @@
+"""Distance-based level-of-detail selection with hysteresis.
+
+Each entity slot keeps its current detail level.  It only switches to a
+coarser model once it is `hysteresis` (a fraction) beyond a threshold, and
+back to a finer one once it is that far inside it, so a car hovering near
+a boundary doesn't flicker between models every frame.
+"""
+import numpy as np
+
+
+class LodSelector:
+    """Chooses a level (0 = full detail) per entity from camera distance."""
+
+    def __init__(self, thresholds, hysteresis=0.1):
+        thresholds = np.asarray(thresholds, float)
+        self.levels = len(thresholds) + 1
+        self._coarsen_at = thresholds * (1 + hysteresis)
+        self._refine_at = thresholds * (1 - hysteresis)
+        self.current = np.zeros(0, np.int8)
+        self.counts = [0] * self.levels  # entities per level, last select()
+
+    def select(self, distances):
+        """Level per entity for this frame (slots keep their index between frames)."""
+        distances = np.asarray(distances, float)
+        n = len(distances)
+        if len(self.current) != n:
+            # New slots start at whatever their distance says, without hysteresis
+            fresh = np.searchsorted(self._coarsen_at, distances[len(self.current):])
+            self.current = np.concatenate([self.current[:n], fresh.astype(np.int8)])
+        coarsest = np.searchsorted(self._refine_at, distances)
+        finest = np.searchsorted(self._coarsen_at, distances)
+        np.clip(self.current, finest, coarsest, out=self.current)
+        self.counts = np.bincount(self.current, minlength=self.levels).tolist()
+        return self.current
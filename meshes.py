@@ -0,0 +1,221 @@
+"""Mesh data for the car and obstacle models.
+
+Meshes are plain NumPy arrays (positions, normals, RGBA colors and
+triangle/line indices) with no OpenGL calls, so they can be compiled into
+display lists, packed into instanced batches, or inspected headlessly.
+The shapes mirror what the old immediate-mode drawing emitted, including
+GLUT's torus and cylinder tessellation.
+"""
+import math
+
+import numpy as np
+
+# Car palettes: body, window, tire, rim, accent
+PLAYER_PALETTE = {
+    'body': (0.2, 0.4, 0.8),  # Blue for player
+    'window': (0.6, 0.8, 1.0),
+    'tire': (0.1, 0.1, 0.1),
+    'rim': (0.5, 0.5, 0.5),
+    'accent': (0.1, 0.2, 0.6),
+}
+OPPONENT_PALETTE = {
+    'body': (0.9, 0.1, 0.1),  # Red for opponents
+    'window': (0.8, 0.8, 0.8),
+    'tire': (0.1, 0.1, 0.1),
+    'rim': (0.7, 0.7, 0.7),
+    'accent': (0.7, 0.0, 0.0),
+}
+OBSTACLE_COLOR = (1.0, 0.0, 0.0)
+
+# Wheel offsets relative to the car origin (front and back)
+WHEEL_OFFSETS = ((-8, -2, 0), (8, -2, 0), (-8, 2, 0), (8, 2, 0))
+
+
+class Mesh:
+    """Indexed geometry: float32 positions/normals/colors plus index arrays."""
+
+    def __init__(self, positions=None, normals=None, colors=None, triangles=None, lines=None):
+        self.positions = np.zeros((0, 3), np.float32) if positions is None else np.asarray(positions, np.float32)
+        self.normals = np.zeros((0, 3), np.float32) if normals is None else np.asarray(normals, np.float32)
+        self.colors = np.zeros((0, 4), np.float32) if colors is None else np.asarray(colors, np.float32)
+        self.triangles = np.zeros(0, np.uint32) if triangles is None else np.asarray(triangles, np.uint32).ravel()
+        self.lines = np.zeros(0, np.uint32) if lines is None else np.asarray(lines, np.uint32).ravel()
+
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+
+    def bounds(self):
+        """Axis-aligned bounding box as (center, half extents)."""
+        lo, hi = self.positions.min(axis=0), self.positions.max(axis=0)
+        return (lo + hi) / 2, (hi - lo) / 2
+
+    def translated(self, offset):
+        return Mesh(self.positions + np.asarray(offset, np.float32), self.normals,
+                    self.colors, self.triangles, self.lines)
+
+    def rotated_z(self, degrees):
+        c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+        rot = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]], np.float32)
+        return Mesh(self.positions @ rot.T, self.normals @ rot.T,
+                    self.colors, self.triangles, self.lines)
+
+    def recolored(self, color):
+        colors = np.empty((self.vertex_count, 4), np.float32)
+        colors[:] = _rgba(color)
+        return Mesh(self.positions, self.normals, colors, self.triangles, self.lines)
+
+
+def merge(meshes):
+    """Concatenate meshes into one, re-basing their indices."""
+    positions, normals, colors, triangles, lines = [], [], [], [], []
+    base = 0
+    for m in meshes:
+        positions.append(m.positions)
+        normals.append(m.normals)
+        colors.append(m.colors)
+        triangles.append(m.triangles + base)
+        lines.append(m.lines + base)
+        base += m.vertex_count
+    return Mesh(np.concatenate(positions), np.concatenate(normals), np.concatenate(colors),
+                np.concatenate(triangles), np.concatenate(lines))
+
+
+def _rgba(color):
+    return tuple(color) + (1.0,) if len(color) == 3 else tuple(color)
+
+
+def quads(corners, color, normal=(0, 0, 1)):
+    """Flat quads from a (n*4, 3) corner list, split into triangle pairs."""
+    corners = np.asarray(corners, np.float32).reshape(-1, 4, 3)
+    n = len(corners)
+    tri = np.array([0, 1, 2, 0, 2, 3], np.uint32)
+    triangles = (tri[None, :] + 4 * np.arange(n, dtype=np.uint32)[:, None]).ravel()
+    normals = np.tile(np.asarray(normal, np.float32), (n * 4, 1))
+    return Mesh(corners.reshape(-1, 3), normals, None, triangles).recolored(color)
+
+
+def box(x0, y0, z0, x1, y1, z1, color):
+    """Axis-aligned box with outward face normals."""
+    faces = [
+        ([(x0, y0, z1), (x1, y0, z1), (x1, y1, z1), (x0, y1, z1)], (0, 0, 1)),
+        ([(x0, y0, z0), (x0, y1, z0), (x1, y1, z0), (x1, y0, z0)], (0, 0, -1)),
+        ([(x0, y0, z0), (x0, y0, z1), (x0, y1, z1), (x0, y1, z0)], (-1, 0, 0)),
+        ([(x1, y0, z0), (x1, y1, z0), (x1, y1, z1), (x1, y0, z1)], (1, 0, 0)),
+        ([(x0, y1, z0), (x0, y1, z1), (x1, y1, z1), (x1, y1, z0)], (0, 1, 0)),
+        ([(x0, y0, z0), (x1, y0, z0), (x1, y0, z1), (x0, y0, z1)], (0, -1, 0)),
+    ]
+    return merge([quads(c, color, n) for c, n in faces])
+
+
+def torus(inner_radius, outer_radius, sides, rings, color):
+    """Torus around the z axis, tessellated like glutSolidTorus."""
+    phi = np.linspace(0, 2 * math.pi, rings, endpoint=False)[:, None]
+    theta = np.linspace(0, 2 * math.pi, sides, endpoint=False)[None, :]
+    ring = outer_radius + inner_radius * np.cos(theta)
+    shape = (rings, sides)
+    positions = np.stack([np.cos(phi) * ring, np.sin(phi) * ring,
+                          np.broadcast_to(inner_radius * np.sin(theta), shape)], -1)
+    normals = np.stack([np.cos(phi) * np.cos(theta), np.sin(phi) * np.cos(theta),
+                        np.broadcast_to(np.sin(theta), shape)], -1)
+    j, i = np.meshgrid(np.arange(rings), np.arange(sides), indexing='ij')
+    a = j * sides + i
+    b = ((j + 1) % rings) * sides + i
+    c = ((j + 1) % rings) * sides + (i + 1) % sides
+    d = j * sides + (i + 1) % sides
+    triangles = np.stack([a, b, c, a, c, d], -1)
+    return Mesh(positions.reshape(-1, 3), normals.reshape(-1, 3), None, triangles).recolored(color)
+
+
+def cylinder(radius, height, slices, color):
+    """Capped cylinder from z=0 to z=height, like glutSolidCylinder."""
+    angle = np.linspace(0, 2 * math.pi, slices, endpoint=False)
+    cx, cy = np.cos(angle), np.sin(angle)
+    ring = np.stack([cx * radius, cy * radius, np.zeros(slices)], -1)
+    side_n = np.stack([cx, cy, np.zeros(slices)], -1)
+    top = ring + (0, 0, height)
+    positions = np.concatenate([ring, top, ring, top, [(0, 0, 0), (0, 0, height)]])
+    normals = np.concatenate([side_n, side_n, np.tile((0, 0, -1), (slices, 1)),
+                              np.tile((0, 0, 1), (slices, 1)), [(0, 0, -1), (0, 0, 1)]])
+    i = np.arange(slices)
+    k = (i + 1) % slices
+    sides_tri = np.stack([i, k, slices + k, i, slices + k, slices + i], -1)
+    bottom_c, top_c = 4 * slices, 4 * slices + 1
+    bottom = np.stack([np.full(slices, bottom_c), 2 * slices + k, 2 * slices + i], -1)
+    top_tri = np.stack([np.full(slices, top_c), 3 * slices + i, 3 * slices + k], -1)
+    triangles = np.concatenate([sides_tri.ravel(), bottom.ravel(), top_tri.ravel()])
+    return Mesh(positions, normals, None, triangles).recolored(color)
+
+
+def wheel_mesh(tire_color, rim_color, tire_rings=32, tire_sides=16, rim_rings=24, rim_sides=12, spokes=True):
+    """Tire, rim, six spokes, hub and bolt of one wheel."""
+    parts = [torus(1.0, 6, tire_sides, tire_rings, tire_color),
+             torus(0.6, 5, rim_sides, rim_rings, rim_color)]
+    if spokes:
+        spoke = box(-0.4, -0.4, -0.8, 0.4, 0.4, 0.8, (0.4, 0.4, 0.4)).translated((3.5, 0, 0))
+        parts.extend(spoke.rotated_z(a) for a in range(0, 360, 60))
+        parts.append(cylinder(1.5, 1, 12, (0.6, 0.6, 0.6)))  # Center hub
+        parts.append(cylinder(0.5, 1.5, 8, (0.3, 0.3, 0.3)))  # Center bolt
+    return merge(parts)
+
+
+def car_body_mesh(palette):
+    """Body panels, windows, lights, mirrors, bumpers, grille and door lines."""
+    parts = [
+        quads([(-10, -2, 0), (10, -2, 0), (10, 1.5, 0), (-10, 1.5, 0),  # Main body
+               (-6, 1.5, 0), (6, 1.5, 0), (6, 5, 0), (-6, 5, 0),  # Cabin
+               (6, -2, 0), (10, -2, 0), (10, 0.5, 0), (6, 1.5, 0),  # Hood
+               (-10, -2, 0), (-6, -2, 0), (-6, 1.5, 0), (-10, 0.5, 0)],  # Trunk
+              palette['body']),
+        quads([(5, 1.5, 0), (6, 1.5, 0), (6, 4.5, 0), (5, 4.5, 0),  # Front windshield
+               (-6, 1.5, 0), (-5, 1.5, 0), (-5, 4.5, 0), (-6, 4.5, 0),  # Rear windshield
+               (-5, 1.5, 0), (5, 1.5, 0), (5, 4.5, 0), (-5, 4.5, 0)],  # Side windows
+              palette['window']),
+        quads([(9, -1.5, 0), (10, -1.5, 0), (10, -0.5, 0), (9, -0.5, 0),  # Headlights
+               (9, -0.5, 0), (10, -0.5, 0), (10, 0.5, 0), (9, 0.5, 0)],
+              (1.0, 1.0, 0.9)),
+        quads([(-10, -1.5, 0), (-9, -1.5, 0), (-9, -0.5, 0), (-10, -0.5, 0),  # Taillights
+               (-10, -0.5, 0), (-9, -0.5, 0), (-9, 0.5, 0), (-10, 0.5, 0)],
+              (1.0, 0.2, 0.2)),
+        quads([(-6, 3, 0), (-5, 3, 0), (-5, 4, 0), (-6, 4, 0),  # Side mirrors
+               (5, 3, 0), (6, 3, 0), (6, 4, 0), (5, 4, 0)],
+              palette['accent']),
+        quads([(9, -2, 0), (10, -2, 0), (10, -1.5, 0), (9, -1.5, 0),  # Bumpers
+               (-10, -2, 0), (-9, -2, 0), (-9, -1.5, 0), (-10, -1.5, 0)],
+              (0.2, 0.2, 0.2)),
+        quads([(8, -1.5, 0), (9, -1.5, 0), (9, -1, 0), (8, -1, 0)], (0.3, 0.3, 0.3)),  # Grille
+        quads([(-9, -2, 0), (-8, -2, 0), (-8, -1.5, 0), (-9, -1.5, 0)], (0.4, 0.4, 0.4)),  # Exhaust
+    ]
+    # Door lines
+    doors = Mesh([(-2, -2, 0), (-2, 5, 0), (2, -2, 0), (2, 5, 0)], np.tile((0, 0, 1), (4, 1)),
+                 None, None, [0, 1, 2, 3]).recolored((0.1, 0.1, 0.1))
+    return merge(parts + [doors])
+
+
+def car_mesh(palette):
+    """The full-detail car: four wheels plus the body."""
+    wheel = wheel_mesh(palette['tire'], palette['rim'])
+    return merge([wheel.translated(offset) for offset in WHEEL_OFFSETS] + [car_body_mesh(palette)])
+
+
+def car_lod_meshes(palette):
+    """Car models from full detail down, for distance-based LOD.
+
+    0: the full car; 1: the full body on coarse spokeless wheels;
+    2: a two-box body on flat eight-sided wheels.
+    """
+    coarse_wheel = wheel_mesh(palette['tire'], palette['rim'], tire_rings=12, tire_sides=6,
+                              rim_rings=8, rim_sides=4, spokes=False)
+    flat_wheel = cylinder(6, 0.5, 8, palette['tire'])
+    block = merge([box(-10, -2, 0, 10, 1.5, 1, palette['body']),
+                   box(-6, 1.5, 0, 6, 5, 1, palette['window'])])
+    return [
+        car_mesh(palette),
+        merge([coarse_wheel.translated(o) for o in WHEEL_OFFSETS] + [car_body_mesh(palette)]),
+        merge([flat_wheel.translated(o) for o in WHEEL_OFFSETS] + [block]),
+    ]
+
+
+def obstacle_mesh():
+    """Red roadblock cube."""
+    return box(-8, -8, 0, 8, 8, 15, OBSTACLE_COLOR)
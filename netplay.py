@@ -0,0 +1,645 @@
+"""Networked races: an authoritative UDP server and predicting clients.
+
+    python netplay.py server --port 5400              # host races
+    python race.py --connect 127.0.0.1:5400 --race 7   # play in race 7
+    python netplay.py loadtest --races 50 --players 2 --seconds 10
+
+The server owns every RaceSimulation and steps them all from one asyncio
+loop.  Clients only send inputs; every SNAPSHOT_RATE-th of a second the
+server sends each client a snapshot of its race, delta-compressed against
+the newest snapshot that client has acknowledged.
+
+A snapshot is a fixed int32 layout per race (positions in 1/QUANT units).
+A delta is a bitmask of the fields that changed plus the changes in the
+narrowest of int8/int16/int32 that holds them all, so parked obstacles
+cost nothing and moving cars a byte or two.  The state is captured once
+per race per snapshot and each distinct baseline is diffed once, however
+many of the race's clients share it.
+
+Inputs are numbered and stamped with the tick they are meant for.  Every
+input packet repeats all inputs the server hasn't applied yet (a lost
+datagram costs nothing but a few bytes) and acknowledges the newest
+snapshot received.  Clients run their tick counter INPUT_LEAD_TICKS plus
+half a round trip ahead of the server, so inputs normally arrive in time
+to be applied on the tick they were stamped with.
+
+Clients predict their own car: lane and speed inputs apply at once and the
+car moves every tick.  Each snapshot carries the server's view of that car
+and the last input it applied; the client restarts from it, re-applies
+the newer inputs and re-runs the ticks since, which corrects what it
+can't predict (crashes, speed ramps) without adding input lag.  Other cars
+and opponents are dead-reckoned forward from the latest snapshot.
+
+Client and server must use the same settings profile (--config): a join
+carries a digest of the client's simulation settings and the protocol
+version, and the server refuses it if either differs from its own.
+"""
+import argparse
+import asyncio
+import math
+import random
+import struct
+import sys
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+import profiles
+import simulation
+from replay import ACTION_CODES, CODE_ACTIONS
+from simulation import (BASE_FRAME_RATE, CONTINUE, LEFT, MAX_FRAME_TIME, RESTART, RIGHT,
+                        SPEED_DOWN, SPEED_UP, TICK_RATE, RaceSimulation)
+
+DEFAULT_PORT = 5400
+PROTOCOL = 1  # bumped whenever a packet or the snapshot layout changes
+SNAPSHOT_RATE = 30  # snapshots per second
+HISTORY = 32  # snapshots kept as delta baselines (about a second)
+INPUT_LEAD_TICKS = 2  # client clock runs this far ahead of half a round trip
+MAX_INPUT_LEAD = TICK_RATE  # inputs stamped further ahead are applied at once
+MAX_RESENT_INPUTS = 32
+CLIENT_TIMEOUT = 5.0  # seconds of silence before a seat is freed
+JOIN_ATTEMPTS = 10
+JOIN_RETRY = 0.5
+
+QUANT = 16  # positions travel in 1/QUANT units
+SPEED_QUANT = 4096
+LANE_QUANT = 256
+
+# Snapshot layout: globals, then per player, obstacle and opponent blocks
+GLOBALS = 6  # level, flags, level ms, banner ms, obstacles, opponents
+PLAYER_FIELDS = 6  # y, lane, speed, score, crashes, flags
+OBSTACLE_FIELDS = 3  # x, y, active
+OPPONENT_FIELDS = 3  # y, lane position, speed
+PAUSED, OVER, WON = 1, 2, 4
+OUT, GRACE = 1, 2
+FULL, BAD_SEATS, MISMATCH = 1, 2, 3  # refusal reasons
+REFUSALS = {
+    FULL: "is full",
+    BAD_SEATS: f"can't have that many seats (1-{simulation.MAX_PLAYERS})",
+    MISMATCH: "runs a different game version or settings profile (--config)",
+}
+
+_JOIN = struct.Struct('<cIBHI')  # b'J', race, seats wanted if it's new, protocol, settings
+_WELCOME = struct.Struct('<cIBBId')  # b'W', race, player, seats, server tick, tick_dt
+_REFUSED = struct.Struct('<cIB')  # b'X', race, reason
+_INPUT = struct.Struct('<cIIB')  # b'I', snapshot ack, first input seq, count
+_INPUT_EVENT = struct.Struct('<IB')  # tick, action code
+_SNAPSHOT = struct.Struct('<cIII')  # b'S', tick, baseline tick (0 = none), last input applied
+_LEAVE = b'L'
+
+_WIDTHS = (np.dtype('<i1'), np.dtype('<i2'), np.dtype('<i4'))
+
+
+def state_size(sim):
+    return (GLOBALS + PLAYER_FIELDS * len(sim.players) + OBSTACLE_FIELDS * sim.obstacles.capacity
+            + OPPONENT_FIELDS * sim.opponent_cars.capacity)
+
+
+def _blocks(sim, state):
+    """Views of state: (globals, players, obstacles, opponents), field-major."""
+    n_players, n_obstacles = len(sim.players), sim.obstacles.capacity
+    a = GLOBALS
+    b = a + PLAYER_FIELDS * n_players
+    c = b + OBSTACLE_FIELDS * n_obstacles
+    return (state[:a], state[a:b].reshape(n_players, PLAYER_FIELDS),
+            state[b:c].reshape(OBSTACLE_FIELDS, n_obstacles),
+            state[c:].reshape(OPPONENT_FIELDS, sim.opponent_cars.capacity))
+
+
+def capture(sim, state):
+    """Quantise sim's shared state into the int32 vector state."""
+    state.fill(0)
+    head, cars, obstacles, opponents = _blocks(sim, state)
+    head[:] = (sim.current_level,
+               sim.game_paused * PAUSED | sim.game_over * OVER | (sim.win_message is not None) * WON,
+               round(sim.level_elapsed * 1000), round(sim.level_banner_left * 1000),
+               len(sim.obstacles), len(sim.opponent_cars))
+    for row, car in zip(cars, sim.players):
+        row[:] = (round(car.pos[1] * QUANT), car.lane, round(car.speed * SPEED_QUANT), car.score,
+                  car.crash_count, car.out * OUT | (car.grace > 0) * GRACE)
+    store, n = sim.obstacles, len(sim.obstacles)
+    np.rint(store.x * QUANT, out=obstacles[0, :n], casting='unsafe')
+    np.rint(store.y * QUANT, out=obstacles[1, :n], casting='unsafe')
+    obstacles[2, :n] = store.active
+    store, n = sim.opponent_cars, len(sim.opponent_cars)
+    np.rint(store.y * QUANT, out=opponents[0, :n], casting='unsafe')
+    np.rint(store.lane_pos * LANE_QUANT, out=opponents[1, :n], casting='unsafe')
+    np.rint(store.speed * SPEED_QUANT, out=opponents[2, :n], casting='unsafe')
+
+
+def encode_delta(state, base):
+    """Bytes turning base into state: width code, changed-field bitmask, changes."""
+    diff = state.astype(np.int64) - base
+    changed = diff != 0
+    values = diff[changed]
+    peak = int(np.abs(values).max()) if len(values) else 0
+    width = 0 if peak < 0x80 else 1 if peak < 0x8000 else 2
+    return (bytes([width]) + np.packbits(changed, bitorder='little').tobytes()
+            + values.astype(_WIDTHS[width]).tobytes())
+
+
+def decode_delta(data, base):
+    """The state encode_delta(state, base) was made from."""
+    n = len(base)
+    mask_bytes = (n + 7) // 8
+    changed = np.unpackbits(np.frombuffer(data, np.uint8, mask_bytes, 1), count=n,
+                            bitorder='little').astype(bool)
+    state = base.copy()
+    state[changed] += np.frombuffer(data, _WIDTHS[data[0]], int(changed.sum()), 1 + mask_bytes)
+    return state
+
+
+class _Seat:
+    """One client's place in a hosted race."""
+
+    def __init__(self, addr, player, now):
+        self.addr = addr
+        self.player = player
+        self.last_heard = now
+        self.received_seq = 0  # newest input seq queued
+        self.applied_seq = 0  # newest input seq applied to the simulation
+        self.pending = deque()  # (tick, seq, action) not yet applied
+        self.acked = 0  # newest snapshot tick the client has
+        self.bytes_sent = 0
+
+
+class HostedRace:
+    """A server-side race: the simulation, its seats and recent snapshots."""
+
+    def __init__(self, race_id, seats):
+        self.race_id = race_id
+        self.sim = RaceSimulation(players=seats)
+        self.seats = [None] * seats
+        self.history = OrderedDict()  # snapshot tick -> state vector
+
+    def step(self, dt):
+        sim = self.sim
+        for seat in self.seats:
+            if seat is None:
+                continue
+            pending = seat.pending
+            while pending and (pending[0][0] <= sim.tick or pending[0][0] > sim.tick + MAX_INPUT_LEAD):
+                _, seq, action = pending.popleft()
+                sim.apply_input(action, seat.player)
+                seat.applied_seq = seq
+        sim.step(dt)
+
+    def snapshot(self, transport):
+        """Capture the state and send every seat its delta."""
+        sim = self.sim
+        state = np.empty(state_size(sim), np.int32)
+        capture(sim, state)
+        self.history[sim.tick] = state
+        if len(self.history) > HISTORY:
+            self.history.popitem(last=False)
+        payloads = {}  # baseline tick -> encoded delta
+        for seat in self.seats:
+            if seat is None:
+                continue
+            base_tick = seat.acked if seat.acked in self.history else 0
+            payload = payloads.get(base_tick)
+            if payload is None:
+                base = self.history[base_tick] if base_tick else np.zeros_like(state)
+                payload = payloads[base_tick] = encode_delta(state, base)
+            packet = _SNAPSHOT.pack(b'S', sim.tick, base_tick, seat.applied_seq) + payload
+            transport.sendto(packet, seat.addr)
+            seat.bytes_sent += len(packet)
+
+
+class RaceServer(asyncio.DatagramProtocol):
+    """Hosts any number of races on one UDP socket; run() drives them."""
+
+    def __init__(self, tick_rate=TICK_RATE, loss=0.0):
+        self.tick_dt = 1.0 / tick_rate
+        self.snapshot_ticks = max(1, round(tick_rate / SNAPSHOT_RATE))
+        self.loss = loss  # drop this fraction of incoming datagrams (testing)
+        self.races = {}  # race id -> HostedRace
+        self.seats = {}  # addr -> (HostedRace, _Seat)
+        self.transport = None
+        self.settings = profiles.simulation_digest()
+        self.ticks = 0
+        self.tick_seconds = 0.0  # spent stepping and sending, since start
+        self.race_ticks = 0  # summed over races
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if self.loss and random.random() < self.loss:
+            return
+        kind = data[:1]
+        now = time.monotonic()
+        if kind == b'I':
+            entry = self.seats.get(addr)
+            if entry is not None:
+                self._inputs(entry[1], data, now)
+        elif kind == b'J' and len(data) == _JOIN.size:
+            _, race_id, seats, protocol, settings = _JOIN.unpack(data)
+            if protocol != PROTOCOL or settings != self.settings:
+                self.transport.sendto(_REFUSED.pack(b'X', race_id, MISMATCH), addr)
+            else:
+                self._join(race_id, seats, addr, now)
+        elif kind == _LEAVE:
+            self._leave(addr)
+
+    def _join(self, race_id, seats, addr, now):
+        entry = self.seats.get(addr)
+        if entry is None or entry[0].race_id != race_id:
+            if entry is not None:
+                self._leave(addr)
+            race = self.races.get(race_id)
+            if race is None:
+                if not 1 <= seats <= simulation.MAX_PLAYERS:
+                    self.transport.sendto(_REFUSED.pack(b'X', race_id, BAD_SEATS), addr)
+                    return
+                race = self.races[race_id] = HostedRace(race_id, seats)
+            if None not in race.seats:
+                self.transport.sendto(_REFUSED.pack(b'X', race_id, FULL), addr)
+                return
+            player = race.seats.index(None)
+            race.seats[player] = _Seat(addr, player, now)
+            entry = self.seats[addr] = (race, race.seats[player])
+        # (A repeated join just gets the welcome again)
+        race, seat = entry
+        self.transport.sendto(_WELCOME.pack(b'W', race_id, seat.player, len(race.seats),
+                                            race.sim.tick, self.tick_dt), addr)
+
+    def _inputs(self, seat, data, now):
+        seat.last_heard = now
+        _, ack, first, count = _INPUT.unpack_from(data)
+        if ack > seat.acked:
+            seat.acked = ack
+        pos = _INPUT.size
+        for i in range(count):
+            tick, code = _INPUT_EVENT.unpack_from(data, pos)
+            pos += _INPUT_EVENT.size
+            seq = first + i
+            if seq != seat.received_seq + 1:
+                continue  # already have it
+            action = CODE_ACTIONS.get(code)
+            if action is not None:
+                seat.pending.append((tick, seq, action))
+            seat.received_seq = seq
+
+    def _leave(self, addr):
+        entry = self.seats.pop(addr, None)
+        if entry is None:
+            return
+        race, seat = entry
+        race.seats[seat.player] = None
+        if all(s is None for s in race.seats):
+            del self.races[race.race_id]
+
+    def tick(self):
+        """Step every race once; send snapshots when due."""
+        start = time.perf_counter()
+        dt = self.tick_dt
+        self.ticks += 1
+        send = self.ticks % self.snapshot_ticks == 0
+        for race in self.races.values():
+            race.step(dt)
+            if send:
+                race.snapshot(self.transport)
+        self.race_ticks += len(self.races)
+        self.tick_seconds += time.perf_counter() - start
+
+    def drop_silent(self):
+        now = time.monotonic()
+        for addr, (_, seat) in list(self.seats.items()):
+            if now - seat.last_heard > CLIENT_TIMEOUT:
+                self._leave(addr)
+
+    async def run(self):
+        """Tick at the server rate until cancelled (late ticks run back to back)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        next_sweep = deadline + 1.0
+        while True:
+            self.tick()
+            deadline += self.tick_dt
+            now = loop.time()
+            if now - deadline > MAX_FRAME_TIME:
+                deadline = now  # fell far behind; don't try to catch up
+            if now > next_sweep:
+                self.drop_silent()
+                next_sweep = now + 1.0
+            await asyncio.sleep(max(0.0, deadline - now))
+
+
+class RaceClient(asyncio.DatagramProtocol):
+    """One seat in a remote race.
+
+    mirror is a RaceSimulation that is never stepped: snapshots are written
+    into it and advance() moves it between them (predicting this client's
+    car), so it can be drawn like a local race.
+    """
+
+    def __init__(self, race_id, seats=1, loss=0.0):
+        self.race_id = race_id
+        self.seats = seats
+        self.loss = loss
+        self.transport = None
+        self.player = None
+        self.mirror = None
+        self.tick = 0
+        self.tick_dt = simulation.TICK_DT
+        self._accumulator = 0.0
+        self._welcome = None
+        self._join_sent = 0.0
+        self._snapshots = OrderedDict()  # tick -> state vector
+        self._zero = None
+        self.latest = 0  # newest snapshot tick applied
+        self._inputs = deque()  # (seq, tick, action) the server hasn't applied
+        self._next_seq = 1
+        self.bytes_received = self.bytes_sent = 0
+        self.snapshots = 0
+        self.correction_total = 0.0  # predicted-vs-server distance, summed over snapshots
+        self.correction_max = 0.0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def error_received(self, exc):
+        if self._welcome is not None and not self._welcome.done():
+            self._welcome.set_exception(ConnectionError(exc))
+
+    def _send(self, packet):
+        self.transport.sendto(packet)
+        self.bytes_sent += len(packet)
+
+    async def join(self):
+        self._welcome = asyncio.get_running_loop().create_future()
+        join = _JOIN.pack(b'J', self.race_id, self.seats, PROTOCOL, profiles.simulation_digest())
+        for _ in range(JOIN_ATTEMPTS):
+            self._join_sent = time.perf_counter()
+            self._send(join)
+            try:
+                await asyncio.wait_for(asyncio.shield(self._welcome), JOIN_RETRY)
+                return self
+            except asyncio.TimeoutError:
+                continue
+        raise ConnectionError(f"no answer from the server for race {self.race_id}")
+
+    def leave(self):
+        if self.transport is not None:
+            self._send(_LEAVE)
+            self.transport.close()
+
+    def datagram_received(self, data, addr):
+        if self.loss and random.random() < self.loss:
+            return
+        self.bytes_received += len(data)
+        kind = data[:1]
+        if kind == b'S' and self.mirror is not None:
+            self._snapshot(data)
+        elif kind == b'W' and len(data) == _WELCOME.size and not self._welcome.done():
+            _, _, self.player, self.seats, server_tick, self.tick_dt = _WELCOME.unpack(data)
+            self.mirror = RaceSimulation(players=self.seats, seed=0)
+            self._zero = np.zeros(state_size(self.mirror), np.int32)
+            rtt_ticks = (time.perf_counter() - self._join_sent) / self.tick_dt
+            self.tick = server_tick + math.ceil(rtt_ticks / 2) + INPUT_LEAD_TICKS
+            self._welcome.set_result(self.player)
+        elif kind == b'X' and len(data) == _REFUSED.size and not self._welcome.done():
+            reason = REFUSALS.get(_REFUSED.unpack(data)[2], "was refused")
+            self._welcome.set_exception(ConnectionError(f"race {self.race_id} {reason}"))
+
+    def send_input(self, action):
+        """Queue an action for the next tick: predicted at once, sent now."""
+        if action in (LEFT, RIGHT, SPEED_UP, SPEED_DOWN):
+            self.mirror.apply_input(action, self.player)
+        self._inputs.append((self._next_seq, self.tick, action))
+        self._next_seq += 1
+        self._send_inputs()
+
+    def _send_inputs(self):
+        events = list(self._inputs)[:MAX_RESENT_INPUTS]
+        first = events[0][0] if events else self._next_seq
+        self._send(_INPUT.pack(b'I', self.latest, first, len(events))
+                   + b''.join(_INPUT_EVENT.pack(tick, ACTION_CODES[action]) for _, tick, action in events))
+
+    def _snapshot(self, data):
+        tick, base_tick, applied = _SNAPSHOT.unpack_from(data)[1:]
+        base = self._snapshots.get(base_tick) if base_tick else self._zero
+        if base is None or tick <= self.latest:
+            return  # baseline already dropped, or stale
+        state = decode_delta(data[_SNAPSHOT.size:], base)
+        self._snapshots[tick] = state
+        while len(self._snapshots) > HISTORY:
+            self._snapshots.popitem(last=False)
+        self.snapshots += 1
+        self.latest = tick
+        while self._inputs and self._inputs[0][0] <= applied:
+            self._inputs.popleft()
+        self._apply(state, tick)
+        self._send_inputs()  # acknowledges the snapshot
+
+    def _apply(self, state, tick):
+        """Install a server snapshot, then predict forward to our tick."""
+        sim = self.mirror
+        if tick >= self.tick:
+            # Our clock fell behind the server's (a stall): jump ahead again
+            self.tick = tick + INPUT_LEAD_TICKS
+        head, cars, obstacles, opponents = _blocks(sim, state)
+        level, flags, elapsed_ms, banner_ms, n_obstacles, n_opponents = (int(v) for v in head)
+        sim.current_level = level
+        sim.game_paused = bool(flags & PAUSED)
+        sim.game_over = bool(flags & OVER)
+        sim.win_message = "WINNER! You finished the battle run." if flags & WON else None
+        sim.level_elapsed = elapsed_ms / 1000
+        sim.level_banner_left = banner_ms / 1000
+
+        store = sim.obstacles
+        store.resize(n_obstacles)
+        store.x[:] = obstacles[0, :n_obstacles] / QUANT
+        store.y[:] = obstacles[1, :n_obstacles] / QUANT
+        store.active[:] = obstacles[2, :n_obstacles]
+        store = sim.opponent_cars
+        store.resize(n_opponents)
+        store.y[:] = opponents[0, :n_opponents] / QUANT
+        store.lane_pos[:] = opponents[1, :n_opponents] / LANE_QUANT
+        store.speed[:] = opponents[2, :n_opponents] / SPEED_QUANT
+        store.active[:] = True
+        store.follow_lanes(simulation.LANE_WIDTH, sim.track.offsets(store.y))
+
+        own = sim.players[self.player]
+        predicted_y = own.pos[1]
+        for car, row in zip(sim.players, cars):
+            y, lane, speed, score, crashes, car_flags = (int(v) for v in row)
+            car.pos[1] = y / QUANT
+            car.lane, car.speed, car.score, car.crash_count = lane, speed / SPEED_QUANT, score, crashes
+            car.out = bool(car_flags & OUT)
+            car.grace = self.tick_dt if car_flags & GRACE else 0.0
+            car.pos[0] = car.lane * simulation.LANE_WIDTH + sim.track.offset(car.pos[1])
+
+        # Replay what the server hasn't seen yet over the ticks since
+        pending = list(self._inputs)
+        for t in range(tick, self.tick):
+            while pending and pending[0][1] <= t:
+                _, _, action = pending.pop(0)
+                if action in (LEFT, RIGHT, SPEED_UP, SPEED_DOWN):
+                    sim.apply_input(action, self.player)
+            self._move(own_only=True)
+        for _, _, action in pending:
+            if action in (LEFT, RIGHT, SPEED_UP, SPEED_DOWN):
+                sim.apply_input(action, self.player)
+        # Everything else is dead-reckoned over the same ticks in one go
+        self._move(own_only=False, ticks=self.tick - tick, skip=self.player)
+        error = abs(own.pos[1] - predicted_y)
+        self.correction_total += error
+        self.correction_max = max(self.correction_max, error)
+
+    def _move(self, own_only, ticks=1, skip=None):
+        """Advance cars (just ours, or all but skip) and opponents by ticks."""
+        sim = self.mirror
+        if sim.game_paused or sim.game_over or ticks <= 0:
+            return
+        frames = ticks * self.tick_dt * BASE_FRAME_RATE
+        track = sim.track
+        for car in ([sim.players[self.player]] if own_only else sim.players):
+            if car.out or car.index == skip:
+                continue
+            car.pos[1] += car.speed * frames
+            car.pos[0] = car.lane * simulation.LANE_WIDTH + track.offset(car.pos[1])
+        if not own_only:
+            opponents = sim.opponent_cars
+            opponents.advance(frames)
+            opponents.follow_lanes(simulation.LANE_WIDTH, track.offsets(opponents.y))
+
+    def advance(self, frame_time):
+        """Run our ticks for frame_time seconds; returns the render alpha."""
+        sim = self.mirror
+        self._accumulator += min(frame_time, MAX_FRAME_TIME)
+        while self._accumulator >= self.tick_dt:
+            for car in sim.players:
+                car.prev_pos[:] = car.pos
+            sim.opponent_cars.save_prev()
+            self._move(own_only=False)
+            self.tick += 1
+            self._accumulator -= self.tick_dt
+        return self._accumulator / self.tick_dt
+
+
+async def start_server(host='127.0.0.1', port=DEFAULT_PORT, tick_rate=TICK_RATE, loss=0.0):
+    """Bind a RaceServer and start ticking it; returns (server, task)."""
+    loop = asyncio.get_running_loop()
+    _, server = await loop.create_datagram_endpoint(lambda: RaceServer(tick_rate, loss),
+                                                    local_addr=(host, port))
+    return server, asyncio.create_task(server.run())
+
+
+async def connect(host, port, race_id, seats=1, loss=0.0):
+    """Join race_id on a server (creating it with `seats` cars if new)."""
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_datagram_endpoint(lambda: RaceClient(race_id, seats, loss),
+                                                    remote_addr=(host, port))
+    try:
+        return await client.join()
+    except ConnectionError:
+        client.transport.close()
+        raise
+
+
+def poll(loop):
+    """Run one pass of an event loop that isn't running (from a GLUT callback)."""
+    loop.call_soon(loop.stop)
+    loop.run_forever()
+
+
+async def _bot(client, seconds, rng):
+    """Drive a client like a restless player for `seconds`."""
+    loop = asyncio.get_running_loop()
+    frame = 1.0 / BASE_FRAME_RATE
+    last = start = loop.time()
+    while last - start < seconds:
+        await asyncio.sleep(frame)
+        now = loop.time()
+        client.advance(now - last)
+        last = now
+        sim = client.mirror
+        if client.player == 0 and (sim.game_paused or sim.game_over):
+            if rng.random() < 0.05:
+                client.send_input(RESTART if sim.game_over else CONTINUE)
+        elif rng.random() < 0.02:
+            client.send_input(rng.choice((LEFT, RIGHT, LEFT, RIGHT, SPEED_UP, SPEED_DOWN)))
+
+
+async def loadtest(races, players, seconds, tick_rate=TICK_RATE, loss=0.0):
+    """Host `races` races of `players` bot clients over localhost UDP; returns stats."""
+    server, task = await start_server('127.0.0.1', 0, tick_rate, loss)
+    port = server.transport.get_extra_info('sockname')[1]
+    clients = []
+    for race_id in range(1, races + 1):
+        for _ in range(players):
+            clients.append(await connect('127.0.0.1', port, race_id, players, loss))
+    start = (server.ticks, server.tick_seconds, server.race_ticks,
+             sum(c.bytes_received for c in clients), sum(c.bytes_sent for c in clients))
+    began = time.perf_counter()
+    rng = random.Random(1)
+    await asyncio.gather(*(_bot(c, seconds, random.Random(rng.random())) for c in clients))
+    elapsed = time.perf_counter() - began
+    ticks, tick_seconds, race_ticks = (server.ticks - start[0], server.tick_seconds - start[1],
+                                       server.race_ticks - start[2])
+    down = sum(c.bytes_received for c in clients) - start[3]
+    up = sum(c.bytes_sent for c in clients) - start[4]
+    snapshots = sum(c.snapshots for c in clients)
+    for c in clients:
+        c.leave()
+    task.cancel()
+    server.transport.close()
+    return {
+        'clients': len(clients),
+        'server_ticks_per_s': ticks / elapsed,
+        'server_load': tick_seconds / elapsed,  # fraction of one core
+        'race_tick_us': tick_seconds / max(1, race_ticks) * 1e6,
+        'down_bytes_per_s': down / elapsed / len(clients),
+        'up_bytes_per_s': up / elapsed / len(clients),
+        'snapshot_bytes': down / max(1, snapshots),
+        'correction_mean': sum(c.correction_total for c in clients) / max(1, snapshots),
+        'correction_max': max(c.correction_max for c in clients),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('mode', choices=('server', 'loadtest'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--tick-rate', type=int, default=TICK_RATE,
+                        help="server ticks per second (clients follow)")
+    parser.add_argument('--config', default='default', help="settings preset or TOML/JSON profile")
+    parser.add_argument('--races', type=int, default=10, help="loadtest: races to host")
+    parser.add_argument('--players', type=int, default=2, help="loadtest: clients per race")
+    parser.add_argument('--seconds', type=float, default=10.0, help="loadtest: how long to run")
+    parser.add_argument('--loss', type=float, default=0.0, help="loadtest: datagram loss to simulate")
+    args = parser.parse_args(argv)
+    try:
+        profiles.apply_simulation(profiles.load(args.config))
+    except (OSError, ValueError) as e:
+        print(f"Can't use --config {args.config}: {e}")
+        return 2
+
+    if args.mode == 'server':
+        async def serve():
+            server, task = await start_server(args.host, args.port, args.tick_rate)
+            print(f"Serving races on {args.host}:{args.port} at {args.tick_rate} ticks/s")
+            await task
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    r = asyncio.run(loadtest(args.races, args.players, args.seconds, args.tick_rate, args.loss))
+    print(f"{args.races} races x {args.players} clients for {args.seconds:g}s "
+          f"(loss {args.loss:.0%}):")
+    print(f"  server  {r['server_ticks_per_s']:.0f} ticks/s  load {r['server_load']:.0%} of a core  "
+          f"{r['race_tick_us']:.0f} us per race tick")
+    print(f"  client  down {r['down_bytes_per_s']:.0f} B/s  up {r['up_bytes_per_s']:.0f} B/s  "
+          f"snapshot {r['snapshot_bytes']:.0f} B")
+    print(f"  prediction error  mean {r['correction_mean']:.2f}  max {r['correction_max']:.2f} units")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Opponent driving: lookahead, lane changes and overtaking on a budget.
+
+Every hazard on the road - obstacles, other opponents and the player - is
+reduced to (lane-space x, y, speed) arrays once per tick and indexed by
+lane with a LaneIndex.  A replanning opponent then asks one threat query
+of the hazards in a window around it: for each of the three lanes, how
+many base frames until it would run into the nearest hazard ahead in that
+lane (given both speeds), and whether anything is alongside.  The window
+reaches as far ahead as the car can close in the lookahead horizon, so a
+query costs what the local traffic costs, however long the field is.  If
+its own lane has a threat inside the horizon it moves to the adjacent free
+lane with the most room, which is also how faster cars get past slower
+ones.
+
+Cars replan in a round-robin: every PLAN_INTERVAL ticks the planner takes
+the next share of the field, so each car replans once per REPLAN_TICKS
+ticks and the fixed cost of a planning pass is paid only every few ticks.
+A pass also stops at PAIR_BUDGET opponent/hazard candidate pairs (they are
+counted before any is built); cars past that wait for the next pass.  The
+budget counts pairs rather than wall time so the simulation stays
+deterministic for replays.
+
+A small field (SCALAR_HAZARDS or fewer hazards, as in a normal game) is
+planned car by car in plain Python instead, with the same decisions:
+there NumPy's per-call overhead would cost several times the work.
+"""
+import bisect
+import math
+
+import numpy as np
+
+from spatial import LaneIndex
+
+LOOKAHEAD_FRAMES = 90  # time-to-contact horizon, in 1/60 s frames
+SIDE_CLEARANCE = 35  # free road needed alongside to move into a lane
+REPLAN_TICKS = 6
+PLAN_INTERVAL = 3  # ticks between planning passes
+PAIR_BUDGET = 4096
+SCALAR_HAZARDS = 64
+
+# Index slabs are lane-wide: 1-3 are the lanes, 0 and 4 the road beside them
+_LANE_SLABS = 5
+
+
+class OpponentPlanner:
+    """Staggered lane-change planning for EntityStore opponents."""
+
+    def __init__(self, replan_ticks=REPLAN_TICKS, pair_budget=PAIR_BUDGET, interval=PLAN_INTERVAL):
+        self.replan_ticks = replan_ticks
+        self.pair_budget = pair_budget
+        self.interval = interval
+        self.cursor = 0
+        self._ticks = 0
+        self._index = None
+        self.planned = 0  # opponents replanned on the last update
+        self.pairs = 0  # threat pairs evaluated on the last update
+        self.lane_changes = 0  # since creation
+
+    def due(self):
+        """Count a tick; True when a planning pass should run on it."""
+        self._ticks += 1
+        if self._ticks < self.interval:
+            self.planned = self.pairs = 0
+            return False
+        self._ticks = 0
+        return True
+
+    def _hazard_index(self, hazard_x, hazard_y, lane_width):
+        index = self._index
+        if index is None or index.slab_width != lane_width:
+            half = _LANE_SLABS / 2 * lane_width
+            index = self._index = LaneIndex(lane_width, -half, half)
+        index.build(hazard_x, hazard_y)
+        return index
+
+    def update(self, opponents, hazard_x, hazard_y, hazard_speed, first_opponent, lane_width):
+        """Replan the next few opponents.
+
+        hazard_* are lane-space x, y and speed of everything on the road;
+        opponent i is hazard first_opponent + i (so it can skip itself).
+        """
+        n = len(opponents)
+        self.planned = self.pairs = 0
+        if n == 0:
+            return
+        count = min(n, math.ceil(n * self.interval / self.replan_ticks))
+        if len(hazard_y) <= SCALAR_HAZARDS and len(hazard_y) * count <= self.pair_budget:
+            self._plan_scan(opponents, count, hazard_x, hazard_y, hazard_speed, first_opponent,
+                            lane_width)
+            return
+        idx = (self.cursor + np.arange(count)) % n
+        y = opponents.y[idx]
+        speed = opponents.speed[idx]
+
+        # Candidates: hazards in the three lanes, from alongside to as far
+        # ahead as this car could close within the horizon
+        reach = np.maximum(speed * LOOKAHEAD_FRAMES, SIDE_CLEARANCE)
+        index = self._hazard_index(hazard_x, hazard_y, lane_width)
+        # Only the longest run of cars whose pairs fit the budget (at least
+        # one) has its pairs built
+        qi, hi, slab, count = index.window_pairs(y - SIDE_CLEARANCE, y + reach, 1, 3,
+                                                 self.pair_budget)
+        idx = idx[:count]
+        self.cursor = (self.cursor + count) % n
+        self.planned, self.pairs = count, len(qi)
+        others = hi != first_opponent + idx[qi]
+        qi, hi, hazard_lane = qi[others], hi[others], slab[others] - 1
+
+        dy = hazard_y[hi] - y[qi]
+        closing = speed[qi] - hazard_speed[hi]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            contact = np.where((dy > 0) & (closing > 0), dy / closing, np.inf)
+        room = np.full((count, 3), np.inf)
+        np.minimum.at(room, (qi, hazard_lane), contact)
+        near = np.abs(dy) < SIDE_CLEARANCE
+        blocked = np.zeros((count, 3), bool)
+        blocked[qi[near], hazard_lane[near]] = True
+
+        lane = opponents.lane[idx].astype(np.intp)
+        col = lane + 1
+        here = room[np.arange(count), col]
+        threatened = here < LOOKAHEAD_FRAMES
+        # Don't start a new change halfway through the last one
+        threatened &= opponents.lane_pos[idx] == lane
+        if not threatened.any():
+            return
+        # Candidates: the adjacent lanes that are on the road and free alongside
+        score = np.where(blocked, -np.inf, room)
+        adjacent = np.abs(np.arange(3)[None, :] - col[:, None]) == 1
+        score[~adjacent] = -np.inf
+        best = score.argmax(axis=1)
+        change = threatened & (score[np.arange(count), best] > here)
+        if change.any():
+            opponents.lane[idx[change]] = best[change] - 1
+            self.lane_changes += int(change.sum())
+
+    def _plan_scan(self, opponents, count, hazard_x, hazard_y, hazard_speed, first_opponent,
+                   lane_width):
+        """update() for a small field, one car at a time.
+
+        Every hazard in every window fits the pair budget, so no car is
+        deferred.
+        """
+        n = len(opponents)
+        x_min = -_LANE_SLABS / 2 * lane_width
+        # Hazards on the three lanes, as (y, hazard, lane, speed) sorted by y
+        on_lanes = []
+        for h, (x, y, v) in enumerate(zip(hazard_x.tolist(), hazard_y.tolist(),
+                                          hazard_speed.tolist())):
+            slab = min(max(math.floor((x - x_min) / lane_width), 0), _LANE_SLABS - 1)
+            if 1 <= slab <= 3:
+                on_lanes.append((y, h, slab - 2, v))
+        on_lanes.sort()
+        lane_ys = [hazard[0] for hazard in on_lanes]
+        ys, speeds = opponents.y.tolist(), opponents.speed.tolist()
+        lanes, lane_pos = opponents.lane.tolist(), opponents.lane_pos.tolist()
+        pairs = 0
+        for k in range(count):
+            i = (self.cursor + k) % n
+            y, speed = ys[i], speeds[i]
+            lo, hi = y - SIDE_CLEARANCE, y + max(speed * LOOKAHEAD_FRAMES, SIDE_CLEARANCE)
+            room = [math.inf] * 3
+            blocked = [False] * 3
+            window = on_lanes[bisect.bisect_left(lane_ys, lo):bisect.bisect_right(lane_ys, hi)]
+            pairs += len(window)
+            for hy, h, hazard_lane, hv in window:
+                if h == first_opponent + i:
+                    continue
+                dy = hy - y
+                closing = speed - hv
+                if dy > 0 and closing > 0:
+                    room[hazard_lane + 1] = min(room[hazard_lane + 1], dy / closing)
+                if abs(dy) < SIDE_CLEARANCE:
+                    blocked[hazard_lane + 1] = True
+            lane = lanes[i]
+            here = room[lane + 1]
+            if here >= LOOKAHEAD_FRAMES or lane_pos[i] != lane:
+                continue
+            # The adjacent lane with the most room, lower lane first on a tie
+            best, best_room = None, -math.inf
+            for col in (lane, lane + 2):
+                if 0 <= col <= 2 and not blocked[col] and room[col] > best_room:
+                    best, best_room = col, room[col]
+            if best is not None and best_room > here:
+                opponents.lane[i] = best - 1
+                self.lane_changes += 1
+        self.cursor = (self.cursor + count) % n
+        self.planned, self.pairs = count, pairs
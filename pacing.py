@@ -0,0 +1,46 @@
+"""Frame pacing: cap the frame rate without drifting or busy-waiting.
+
+FramePacer.wait() blocks until the next frame is due.  Deadlines advance
+by a fixed period from the previous deadline (not from when the frame
+happened to finish), so the average rate holds at the cap; if a frame
+runs late the schedule restarts from now instead of bursting to catch up.
+The wait sleeps for most of the gap and spins only for the last
+SPIN_SECONDS, since time.sleep() can overshoot by a millisecond or so.
+"""
+import time
+
+SPIN_SECONDS = 0.002
+
+
+class FramePacer:
+    """Holds a loop to at most `fps` iterations per second (0 = uncapped)."""
+
+    def __init__(self, fps=60):
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        self.fps = fps
+        self.period = 1.0 / fps if fps else 0.0
+        self.reset()
+
+    def reset(self):
+        """Forget the schedule (after a pause, so the next frame isn't 'late')."""
+        self._deadline = None
+
+    def wait(self):
+        """Sleep until the next frame is due; returns the seconds waited."""
+        if not self.period:
+            return 0.0
+        now = time.perf_counter()
+        if self._deadline is None or now - self._deadline > self.period:
+            # First frame, or we fell more than a frame behind
+            self._deadline = now + self.period
+            return 0.0
+        start = now
+        remaining = self._deadline - now
+        if remaining > SPIN_SECONDS:
+            time.sleep(remaining - SPIN_SECONDS)
+        while time.perf_counter() < self._deadline:
+            pass
+        self._deadline += self.period
+        return time.perf_counter() - start
@@ -0,0 +1,147 @@
+"""Frame-time profiler with named timing scopes.
+
+Wrap a phase in `with profiler.scope('draw_track'):` and its wall time is
+added to the current frame.  The last `window` frames are kept so rolling
+percentiles (p50/p95/p99) can be shown on screen or dumped to JSON/CSV.
+NULL_PROFILER has the same interface and does nothing, so instrumented
+code can run unprofiled at near-zero cost.
+"""
+import csv
+import json
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+FRAME = 'frame'
+
+
+class _Scope:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, perf_counter() - self.start)
+        return False
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FrameProfiler:
+    """Collects per-frame timings for named scopes over a rolling window."""
+
+    def __init__(self, window=600):
+        self.frames = deque(maxlen=window)  # each frame: {scope: milliseconds}
+        self.frame_count = 0
+        self.events = []  # (frame number, label) markers, e.g. level changes
+        self._current = {}
+        self._frame_start = None
+        self._scopes = {}
+
+    def scope(self, name):
+        s = self._scopes.get(name)
+        if s is None:
+            s = self._scopes[name] = _Scope(self, name)
+        return s
+
+    def add(self, name, seconds):
+        self._current[name] = self._current.get(name, 0.0) + seconds * 1000.0
+
+    def mark(self, label):
+        """Tag the current frame (shows up in the dump)."""
+        self.events.append((self.frame_count, label))
+
+    def begin_frame(self):
+        now = perf_counter()
+        if self._frame_start is not None:
+            self._current[FRAME] = (now - self._frame_start) * 1000.0
+            self.frames.append(self._current)
+            self.frame_count += 1
+        self._current = {}
+        self._frame_start = now
+
+    def names(self):
+        seen = {}
+        for frame in self.frames:
+            for name in frame:
+                seen[name] = None
+        return list(seen)
+
+    def stats(self, name=FRAME):
+        """Rolling mean/p50/p95/p99/max in milliseconds for one scope."""
+        values = np.array([f.get(name, 0.0) for f in self.frames])
+        if len(values) == 0:
+            return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'mean': float(values.mean()), 'p50': float(p50), 'p95': float(p95),
+                'p99': float(p99), 'max': float(values.max())}
+
+    def histogram(self, name=FRAME, bins=20):
+        values = np.array([f.get(name, 0.0) for f in self.frames])
+        counts, edges = np.histogram(values, bins=bins)
+        return counts.tolist(), edges.tolist()
+
+    def overlay_lines(self):
+        """Short text summary, one line per scope, for the on-screen overlay."""
+        lines = []
+        for name in [FRAME] + sorted(n for n in self.names() if n != FRAME):
+            s = self.stats(name)
+            lines.append(f"{name:<20} p50 {s['p50']:6.2f}  p95 {s['p95']:6.2f}  p99 {s['p99']:6.2f} ms")
+        return lines
+
+    def dump(self, path):
+        """Write the window to path as CSV (*.csv) or JSON (anything else)."""
+        names = self.names()
+        first = self.frame_count - len(self.frames)
+        if str(path).endswith('.csv'):
+            with open(path, 'w', newline='') as fh:
+                writer = csv.writer(fh)
+                writer.writerow(['frame_number'] + names)
+                for i, frame in enumerate(self.frames):
+                    writer.writerow([first + i] + [f"{frame.get(n, 0.0):.4f}" for n in names])
+            return
+        data = {
+            'summary': {name: self.stats(name) for name in names},
+            'histogram': dict(zip(('counts', 'edges_ms'), self.histogram())),
+            'events': self.events,
+            'first_frame': first,
+            'frames': list(self.frames),
+        }
+        with open(path, 'w') as fh:
+            json.dump(data, fh, indent=1)
+
+
+class NullProfiler:
+    """Drop-in FrameProfiler that records nothing."""
+
+    _scope = _NullScope()
+
+    def scope(self, name):
+        return self._scope
+
+    def add(self, name, seconds):
+        pass
+
+    def mark(self, label):
+        pass
+
+    def begin_frame(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
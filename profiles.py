@@ -0,0 +1,217 @@
+"""Game settings profiles: presets plus TOML/JSON overrides.
+
+A profile is a flat dict of tuning values (track shape, view distance,
+entity caps, speed ramps, rain, frame-rate cap, ...).  Three presets ship
+built in - "low-end", "default" and "stress" - and a TOML or JSON file can
+start from one of them and override any subset:
+
+    # kiosk.toml
+    base = "low-end"
+    view_distance = 450
+    fps_cap = 30
+
+    [level_durations]
+    1 = 30
+
+load() merges and validates; apply_simulation() writes the simulation's
+share into the simulation module (race.configure() handles the rest).
+Loading .toml files needs Python 3.11+ or the tomli package.
+"""
+import copy
+import json
+import os
+import zlib
+
+import simulation
+
+PRESETS = {
+    'default': {
+        'level_durations': {1: 45, 2: 60, 3: 75, 4: 90, 5: 120},
+        'track_width': 150,
+        'track_curvature': 0.015,
+        'track_amplitude': 30,
+        'view_distance': 600,
+        'lane_segment': 40,
+        'fov_y': 60,
+        'fps_cap': 60,
+        'rain_count': 300,
+        'heavy_rain_count': 20000,
+        'lod_distances': [250, 450],
+        'start_obstacles': 3,
+        'start_opponents': 2,
+        'obstacle_cap': 9,
+        'opponent_cap': 7,
+        'boost_obstacle_cap': 7,
+        'boost_opponent_cap': 6,
+        'base_speed': 0.4,
+        'level_speed_step': 0.05,
+        'level_speed_cap': 1.3,
+        'boost_speed_step': 0.1,
+        'boost_speed_cap': 1.2,
+        'min_speed': 0.1,
+        'max_speed': 1.5,
+    },
+}
+PRESETS['low-end'] = dict(PRESETS['default'], **{
+    'view_distance': 400,
+    'fps_cap': 30,
+    'rain_count': 100,
+    'heavy_rain_count': 4000,
+    'lod_distances': [150, 300],
+    'obstacle_cap': 7,
+    'opponent_cap': 5,
+    'boost_obstacle_cap': 6,
+    'boost_opponent_cap': 5,
+})
+PRESETS['stress'] = dict(PRESETS['default'], **{
+    'view_distance': 1200,
+    'fps_cap': 0,
+    'rain_count': 2000,
+    'heavy_rain_count': 50000,
+    'lod_distances': [400, 800],
+    'start_obstacles': 8,
+    'start_opponents': 6,
+    'obstacle_cap': 24,
+    'opponent_cap': 20,
+    'boost_obstacle_cap': 20,
+    'boost_opponent_cap': 16,
+})
+
+# Profile keys that live in the simulation module, and their names there
+SIMULATION_KEYS = {
+    'level_durations': 'level_durations',
+    'track_width': 'track_width',
+    'track_curvature': 'track_curvature',
+    'track_amplitude': 'track_amplitude',
+    'view_distance': 'view_distance',
+    'lane_segment': 'lane_segment',
+    'start_obstacles': 'START_OBSTACLES',
+    'start_opponents': 'START_OPPONENTS',
+    'obstacle_cap': 'OBSTACLE_CAP',
+    'opponent_cap': 'OPPONENT_CAP',
+    'boost_obstacle_cap': 'BOOST_OBSTACLE_CAP',
+    'boost_opponent_cap': 'BOOST_OPPONENT_CAP',
+    'base_speed': 'BASE_SPEED',
+    'level_speed_step': 'LEVEL_SPEED_STEP',
+    'level_speed_cap': 'LEVEL_SPEED_CAP',
+    'boost_speed_step': 'BOOST_SPEED_STEP',
+    'boost_speed_cap': 'BOOST_SPEED_CAP',
+    'min_speed': 'MIN_SPEED',
+    'max_speed': 'MAX_SPEED',
+}
+
+_INTS = ('fps_cap', 'rain_count', 'heavy_rain_count', 'start_obstacles',
+         'start_opponents', 'obstacle_cap', 'opponent_cap', 'boost_obstacle_cap',
+         'boost_opponent_cap')
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate(profile):
+    """Raise ValueError listing every problem with a complete profile."""
+    errors = []
+    unknown = set(profile) - set(PRESETS['default'])
+    missing = set(PRESETS['default']) - set(profile)
+    errors += [f"unknown setting {k!r}" for k in sorted(unknown)]
+    errors += [f"missing setting {k!r}" for k in sorted(missing)]
+
+    for key, value in profile.items():
+        if key in unknown or key in ('level_durations', 'lod_distances'):
+            continue
+        if key in _INTS:
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                errors.append(f"{key} must be a non-negative integer, got {value!r}")
+        elif not _is_number(value) or value <= 0:
+            errors.append(f"{key} must be a positive number, got {value!r}")
+
+    durations = profile.get('level_durations')
+    if not isinstance(durations, dict) or set(durations) != set(range(1, simulation.FINAL_LEVEL + 1)):
+        errors.append(f"level_durations must give seconds for levels 1-{simulation.FINAL_LEVEL}")
+    elif not all(_is_number(v) and v > 0 for v in durations.values()):
+        errors.append("level_durations must all be positive")
+
+    lod = profile.get('lod_distances')
+    if (not isinstance(lod, (list, tuple)) or len(lod) != 2 or not all(_is_number(d) for d in lod)
+            or not 0 < lod[0] < lod[1]):
+        errors.append(f"lod_distances must be two increasing positive distances, got {lod!r}")
+
+    if not errors:
+        p = profile
+        if p['fov_y'] >= 180:
+            errors.append("fov_y must be under 180 degrees")
+        if p['track_width'] <= simulation.SPAWN_EDGE_MARGIN:
+            errors.append(f"track_width must be over {simulation.SPAWN_EDGE_MARGIN} "
+                          "so obstacles can spawn inside the road edges")
+        if p['view_distance'] <= simulation.OBSTACLE_START_AHEAD:
+            errors.append(f"view_distance must be over {simulation.OBSTACLE_START_AHEAD}, "
+                          "where the first obstacles are placed")
+        if p['start_obstacles'] > min(p['obstacle_cap'], p['boost_obstacle_cap']):
+            errors.append("start_obstacles is above an obstacle cap")
+        if p['start_opponents'] > min(p['opponent_cap'], p['boost_opponent_cap']):
+            errors.append("start_opponents is above an opponent cap")
+        if not p['min_speed'] <= p['base_speed'] <= p['max_speed']:
+            errors.append("base_speed must lie between min_speed and max_speed")
+        if max(p['level_speed_cap'], p['boost_speed_cap']) > p['max_speed']:
+            errors.append("speed caps must not exceed max_speed")
+    if errors:
+        raise ValueError("invalid profile: " + "; ".join(errors))
+
+
+def _read(path):
+    if str(path).endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError(f"{path}: reading TOML needs Python 3.11+ or the tomli package")
+        with open(path, 'rb') as fh:
+            return tomllib.load(fh)
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def load(name_or_path='default'):
+    """A validated profile from a preset name or a .toml/.json file."""
+    if name_or_path in PRESETS:
+        data = {}
+        base = name_or_path
+    elif os.path.exists(name_or_path):
+        data = _read(name_or_path)
+        if not isinstance(data, dict):
+            raise ValueError(f"{name_or_path}: a profile must be a table of settings, "
+                             f"not {type(data).__name__}")
+        base = data.pop('base', 'default')
+        if base not in PRESETS:
+            raise ValueError(f"{name_or_path}: unknown base preset {base!r} "
+                             f"(choose from {', '.join(sorted(PRESETS))})")
+    else:
+        raise ValueError(f"no preset or file named {name_or_path!r} "
+                         f"(presets: {', '.join(sorted(PRESETS))})")
+    profile = copy.deepcopy(PRESETS[base])
+    if 'level_durations' in data:
+        # Levels not mentioned keep the base preset's durations
+        try:
+            durations = {int(k): v for k, v in data.pop('level_durations').items()}
+        except (AttributeError, ValueError):
+            raise ValueError("level_durations must map level numbers to seconds")
+        profile['level_durations'].update(durations)
+    profile.update(data)
+    validate(profile)
+    return profile
+
+
+def simulation_digest():
+    """CRC of the simulation settings in force, to check two processes agree."""
+    values = {key: getattr(simulation, name) for key, name in SIMULATION_KEYS.items()}
+    return zlib.crc32(json.dumps(values, sort_keys=True).encode())
+
+
+def apply_simulation(profile):
+    """Install the profile's simulation settings (before creating a RaceSimulation)."""
+    for key, name in SIMULATION_KEYS.items():
+        setattr(simulation, name, profile[key])
+    simulation.LANE_WIDTH = simulation.track_width / 3
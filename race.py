@@ -3,54 +3,131 @@ from OpenGL.GLUT import *
 import OpenGL.GLUT as GLUTmod
 from OpenGL.GLU import *
 import math
-import random
+import asyncio
+import gc
 import sys
 import time
 
-# Game state variables
-game_over = False
-game_paused = False
-laps_completed = 0
-score = 0
-crash_count = 0
-
-# Level/timer variables
-current_level = 1
-level_start_time = time.time()
-level_durations = {1: 45, 2: 60, 3: 75, 4: 90, 5: 120}  # seconds - more reasonable durations
-fifteen_sec_boost_applied = False
-level_banner_until = 0.0
-win_message = None
+import numpy as np
+
+from batch_render import InstanceBatch, MeshList, instanced
+from culling import FrustumCuller
+from lod import LodSelector
+from pacing import FramePacer
+from hud import Hud, SCREEN_W, SCREEN_H
+from profiler import FrameProfiler
+import ghosts
+import netplay
+import profiles
+from rain import RainSystem
+from replay import InputRecorder
+from track_mesh import TrackMesh
+from meshes import car_mesh, car_lod_meshes, obstacle_mesh, PLAYER_PALETTE, OPPONENT_PALETTE
+from simulation import (RaceSimulation, FixedTimestep, TICK_DT, MAX_PLAYERS, lerp_pos, lerp_store,
+                        track_width, view_distance, lane_segment, LEFT, RIGHT, SPEED_UP, SPEED_DOWN,
+                        CONTINUE, RESTART)
+
+# Game state lives in the headless simulation; the GLUT callbacks below only
+# feed it input and draw what it holds.
+sim = None
+# With --connect the race runs on a netplay server: sim is then the client's
+# mirror of it and inputs go to the server
+net = None
+net_loop = None
+pending_inputs = []
+last_idle_time = None
+# The simulation ticks at a fixed rate; render_alpha is how far we are into
+# the next tick, used to interpolate car positions between ticks.
+sim_clock = FixedTimestep()
+render_alpha = 1.0
+
+# Frames are capped at FPS_CAP (`--fps N`, 0 = uncapped).  While the game is
+# paused, over or hidden the idle callback is unregistered, so GLUT blocks
+# until an event instead of spinning a core; input and expose wake it up.
+# (A networked race pauses only its drawing: see hidden_poll.)
+FPS_CAP = 60
+pacer = FramePacer(FPS_CAP)
+idle_running = True
+window_visible = True
+# A hidden window in a networked race still reads (and so acknowledges)
+# server snapshots at this period, or the server would free our seat
+NET_HIDDEN_POLL_MS = 100
+hidden_polling = False
 
 # Rain system variables (screen-space overlay)
 rain_enabled = False
-rain_drops = []
+rain = None  # RainSystem, created in init()
 rain_dx = 0.0
 rain_dy = -6.0
 last_rain_tick = 0.0
 rain_interval = 0.03
 RAIN_COUNT = 300
-
-# Player car variables
-player_car_pos = [0, -200, 0]  # Start at bottom of track
-player_car_lane = 0  # 0 = center, -1 = left, 1 = right
-player_speed = 0.45  # Slower base speed for better competition
-
-# Opponent cars
-opponent_cars = []
-opponent_count = 2  # Reduced for performance
-
-# Track variables
-track_width = 150
-track_length = 400
-track_curvature = 0.015
-# Endless road rendering window and segment size
-view_distance = 600
-lane_segment = 40
-
-# Obstacles
-obstacles = []
-obstacle_count = 3  # Fewer obstacles for less frequent encounters
+HEAVY_RAIN_COUNT = 20000  # heavy-storm mode (S key)
+
+# Batches for repeated models, created once a GL context exists: CPU-instanced
+# for small meshes, display lists for detailed car models (batch_render).
+# Obstacle and player positions are uploaded once a frame for every viewport.
+_obstacle_batch = None
+_opponent_batches = None  # one per level of detail, full model first
+_player_batch = None
+_obstacle_positions = None  # this frame's uploaded positions
+_opponent_positions = None
+_player_positions = None
+_ghost_batch = None  # shares the player car's lists, tinted see-through
+_ghost_positions = None
+_track_mesh = None
+hud = None
+
+# Split screen (`--players N`): each player car gets its own viewport,
+# camera, HUD and LOD state; the world is shared
+PLAYERS = 1
+_views = []
+_views_key = None
+# Per player: left, right, faster, slower.  Player one's speed is on the
+# Up/Down arrows.
+PLAYER_KEYS = (
+    (b'j', b'l', None, None),
+    (b'z', b'x', b'e', b'd'),
+    (b',', b'.', b'i', b'k'),
+    (b'4', b'6', b'8', b'2'),
+)
+KEY_ACTIONS = {key: (action, player)
+               for player, keys in enumerate(PLAYER_KEYS)
+               for key, action in zip(keys, (LEFT, RIGHT, SPEED_UP, SPEED_DOWN)) if key}
+PLAYER_TINTS = (
+    (1.0, 1.0, 1.0, 1.0),
+    (1.0, 0.45, 0.45, 1.0),
+    (0.5, 1.0, 0.5, 1.0),
+    (1.0, 0.8, 0.3, 1.0),
+)
+
+# Ghost cars (`--ghosts FILE|DIR`) replay earlier runs alongside player one;
+# `--save-ghost FILE` records this run for next time
+ghost_pack = None
+GHOST_TINT = (0.6, 0.8, 1.0, 0.35)
+
+# Entities outside the camera frustum (or past the end of the road) are
+# skipped; per-frame drawn/culled counts show in the F3 overlay
+culler = FrustumCuller()
+_obstacle_bounds = None  # (center, half extents) of each model
+_opponent_bounds = None
+
+# Opponents switch to coarser models with camera distance
+OPPONENT_LOD_DISTANCES = (250, 450)
+
+# Shows a finished frame; offscreen benchmarks replace it with glFinish
+present_frame = glutSwapBuffers
+
+# Steps run (last registered first) when the game exits.  freeglut is told
+# to return from glutMainLoop rather than call C exit(), which would skip
+# them and leave Python-buffered files unflushed.
+_exit_steps = []
+
+# Frame-time instrumentation; F3 toggles the on-screen overlay and
+# `--profile out.json` (or .csv) dumps the rolling window at exit
+profiler = FrameProfiler()
+profile_overlay = False
+profile_overlay_lines = []
 
 # Camera variables
 camera_angle = 0
@@ -58,240 +135,64 @@ camera_angle = 0
 # Game variables
 fovY = 60  # Reduced FOV for performance
 
-def _draw_wheel_3d(tire_color=(0.05, 0.05, 0.05), rim_color=(0.9, 0.9, 0.9)):
-    """Realistic 3D wheel design with proper size."""
-    glPushMatrix()
-    
-    # Tire (outer ring) - smaller and more realistic
-    glColor3f(*tire_color)
-    GLUTmod.glutSolidTorus(1.0, 6, 16, 32)  # Smaller tire, fewer segments
-    
-    # Rim (inner ring) - smaller and more realistic
-    glColor3f(*rim_color)
-    GLUTmod.glutSolidTorus(0.6, 5, 12, 24)
-    
-    # Spokes - 3D rectangular prisms (smaller)
-    glColor3f(0.4, 0.4, 0.4)
-    for a in range(0, 360, 60):
-        rad = math.radians(a)
-        glPushMatrix()
-        glRotatef(a, 0, 0, 1)  # Rotate to spoke position
-        glTranslatef(3.5, 0, 0)  # Move to rim position
-        
-        # Draw 3D spoke as a rectangular prism (smaller)
-        glBegin(GL_QUADS)
-        # Front face
-        glVertex3f(-0.4, -0.4, 0.8)
-        glVertex3f(0.4, -0.4, 0.8)
-        glVertex3f(0.4, 0.4, 0.8)
-        glVertex3f(-0.4, 0.4, 0.8)
-        # Back face
-        glVertex3f(-0.4, -0.4, -0.8)
-        glVertex3f(0.4, -0.4, -0.8)
-        glVertex3f(0.4, 0.4, -0.8)
-        glVertex3f(-0.4, 0.4, -0.8)
-        # Left face
-        glVertex3f(-0.4, -0.4, -0.8)
-        glVertex3f(-0.4, -0.4, 0.8)
-        glVertex3f(-0.4, 0.4, 0.8)
-        glVertex3f(-0.4, 0.4, -0.8)
-        # Right face
-        glVertex3f(0.4, -0.4, -0.8)
-        glVertex3f(0.4, -0.4, 0.8)
-        glVertex3f(0.4, 0.4, 0.8)
-        glVertex3f(0.4, 0.4, -0.8)
-        # Top face
-        glVertex3f(-0.4, 0.4, -0.8)
-        glVertex3f(0.4, 0.4, -0.8)
-        glVertex3f(0.4, 0.4, 0.8)
-        glVertex3f(-0.4, 0.4, 0.8)
-        # Bottom face
-        glVertex3f(-0.4, -0.4, -0.8)
-        glVertex3f(0.4, -0.4, -0.8)
-        glVertex3f(0.4, -0.4, 0.8)
-        glVertex3f(-0.4, -0.4, 0.8)
-        glEnd()
-        glPopMatrix()
-    
-    # Center hub - 3D cylinder (smaller)
-    glColor3f(0.6, 0.6, 0.6)
-    GLUTmod.glutSolidCylinder(1.5, 1, 12, 6)  # Radius 1.5, height 1
-    
-    # Center bolt - 3D cylinder (smaller)
-    glColor3f(0.3, 0.3, 0.3)
-    GLUTmod.glutSolidCylinder(0.5, 1.5, 8, 4)  # Radius 0.5, height 1.5
-    
-    glPopMatrix()
-
-def draw_car(x, y, z, color=(0.95, 0.9, 0.2), is_opponent=False):
-    """Realistic 3D car design with proper proportions."""
-    glPushMatrix()
-    glTranslatef(x, y, z)
-
-    # Choose palette
-    if is_opponent:
-        body_color = (0.9, 0.1, 0.1)  # Red for opponents
-        window_color = (0.8, 0.8, 0.8)
-        tire_color = (0.1, 0.1, 0.1)
-        rim_color = (0.7, 0.7, 0.7)
-        accent_color = (0.7, 0.0, 0.0)
-    else:
-        body_color = (0.2, 0.4, 0.8)  # Blue for player
-        window_color = (0.6, 0.8, 1.0)
-        tire_color = (0.1, 0.1, 0.1)
-        rim_color = (0.5, 0.5, 0.5)
-        accent_color = (0.1, 0.2, 0.6)
-
-    # Wheels (4 wheels - front and back) - much smaller
-    glPushMatrix(); glTranslatef(-8, -2, 0); _draw_wheel_3d(tire_color, rim_color); glPopMatrix()
-    glPushMatrix(); glTranslatef(8, -2, 0); _draw_wheel_3d(tire_color, rim_color); glPopMatrix()
-    glPushMatrix(); glTranslatef(-8, 2, 0); _draw_wheel_3d(tire_color, rim_color); glPopMatrix()
-    glPushMatrix(); glTranslatef(8, 2, 0); _draw_wheel_3d(tire_color, rim_color); glPopMatrix()
-
-    # Car body - realistic proportions
-    glColor3f(*body_color)
-    glBegin(GL_QUADS)
-    
-    # Main body (lower section) - much smaller
-    glVertex3f(-10, -2, 0)
-    glVertex3f(10, -2, 0)
-    glVertex3f(10, 1.5, 0)
-    glVertex3f(-10, 1.5, 0)
-    
-    # Upper body (cabin area) - smaller and more realistic
-    glVertex3f(-6, 1.5, 0)
-    glVertex3f(6, 1.5, 0)
-    glVertex3f(6, 5, 0)
-    glVertex3f(-6, 5, 0)
-    
-    # Hood (front) - realistic slope
-    glVertex3f(6, -2, 0)
-    glVertex3f(10, -2, 0)
-    glVertex3f(10, 0.5, 0)
-    glVertex3f(6, 1.5, 0)
-    
-    # Trunk (back) - realistic slope
-    glVertex3f(-10, -2, 0)
-    glVertex3f(-6, -2, 0)
-    glVertex3f(-6, 1.5, 0)
-    glVertex3f(-10, 0.5, 0)
-    glEnd()
-
-    # Windows - realistic design
-    glColor3f(*window_color)
-    glBegin(GL_QUADS)
-    # Front windshield (angled)
-    glVertex3f(5, 1.5, 0)
-    glVertex3f(6, 1.5, 0)
-    glVertex3f(6, 4.5, 0)
-    glVertex3f(5, 4.5, 0)
-    
-    # Rear windshield (angled)
-    glVertex3f(-6, 1.5, 0)
-    glVertex3f(-5, 1.5, 0)
-    glVertex3f(-5, 4.5, 0)
-    glVertex3f(-6, 4.5, 0)
-    
-    # Side windows (realistic size)
-    glVertex3f(-5, 1.5, 0)
-    glVertex3f(5, 1.5, 0)
-    glVertex3f(5, 4.5, 0)
-    glVertex3f(-5, 4.5, 0)
-    glEnd()
-
-    # Headlights - realistic size
-    glColor3f(1.0, 1.0, 0.9)
-    glBegin(GL_QUADS)
-    # Left headlight
-    glVertex3f(9, -1.5, 0)
-    glVertex3f(10, -1.5, 0)
-    glVertex3f(10, -0.5, 0)
-    glVertex3f(9, -0.5, 0)
-    # Right headlight
-    glVertex3f(9, -0.5, 0)
-    glVertex3f(10, -0.5, 0)
-    glVertex3f(10, 0.5, 0)
-    glVertex3f(9, 0.5, 0)
-    glEnd()
-
-    # Taillights - realistic size
-    glColor3f(1.0, 0.2, 0.2)
-    glBegin(GL_QUADS)
-    # Left taillight
-    glVertex3f(-10, -1.5, 0)
-    glVertex3f(-9, -1.5, 0)
-    glVertex3f(-9, -0.5, 0)
-    glVertex3f(-10, -0.5, 0)
-    # Right taillight
-    glVertex3f(-10, -0.5, 0)
-    glVertex3f(-9, -0.5, 0)
-    glVertex3f(-9, 0.5, 0)
-    glVertex3f(-10, 0.5, 0)
-    glEnd()
-
-    # Side mirrors - realistic size
-    glColor3f(*accent_color)
-    glBegin(GL_QUADS)
-    # Left mirror
-    glVertex3f(-6, 3, 0)
-    glVertex3f(-5, 3, 0)
-    glVertex3f(-5, 4, 0)
-    glVertex3f(-6, 4, 0)
-    # Right mirror
-    glVertex3f(5, 3, 0)
-    glVertex3f(6, 3, 0)
-    glVertex3f(6, 4, 0)
-    glVertex3f(5, 4, 0)
-    glEnd()
-
-    # Bumpers - realistic size
-    glColor3f(0.2, 0.2, 0.2)
-    glBegin(GL_QUADS)
-    # Front bumper
-    glVertex3f(9, -2, 0)
-    glVertex3f(10, -2, 0)
-    glVertex3f(10, -1.5, 0)
-    glVertex3f(9, -1.5, 0)
-    # Rear bumper
-    glVertex3f(-10, -2, 0)
-    glVertex3f(-9, -2, 0)
-    glVertex3f(-9, -1.5, 0)
-    glVertex3f(-10, -1.5, 0)
-    glEnd()
-
-    # Door lines - realistic size
-    glColor3f(0.1, 0.1, 0.1)
-    glBegin(GL_LINES)
-    glVertex3f(-2, -2, 0)
-    glVertex3f(-2, 5, 0)
-    glVertex3f(2, -2, 0)
-    glVertex3f(2, 5, 0)
-    glEnd()
-
-    # Grille (front) - realistic size
-    glColor3f(0.3, 0.3, 0.3)
-    glBegin(GL_QUADS)
-    glVertex3f(8, -1.5, 0)
-    glVertex3f(9, -1.5, 0)
-    glVertex3f(9, -1, 0)
-    glVertex3f(8, -1, 0)
-    glEnd()
-
-    # Exhaust pipes (back) - realistic size
-    glColor3f(0.4, 0.4, 0.4)
-    glBegin(GL_QUADS)
-    glVertex3f(-9, -2, 0)
-    glVertex3f(-8, -2, 0)
-    glVertex3f(-8, -1.5, 0)
-    glVertex3f(-9, -1.5, 0)
-    glEnd()
-    
-    glPopMatrix()
-
-def draw_track():
-    """Draw the racing track with an endless effect around the player.
+class Viewport:
+    """One player's part of the window and the per-camera state that goes with it."""
+
+    def __init__(self, index, player, rect, view_hud):
+        self.index = index
+        self.player = player
+        self.rect = rect  # x, y, width, height in pixels
+        self.hud = view_hud
+        self.lod = LodSelector(OPPONENT_LOD_DISTANCES)
+
+def viewport_rects(players):
+    """Full window for one player, side by side for two, else a 2x2 grid."""
+    if players == 1:
+        return [(0, 0, SCREEN_W, SCREEN_H)]
+    half_w, half_h = SCREEN_W // 2, SCREEN_H // 2
+    if players == 2:
+        return [(0, 0, half_w, SCREEN_H), (half_w, 0, SCREEN_W - half_w, SCREEN_H)]
+    cells = [(0, half_h), (half_w, half_h), (0, 0), (half_w, 0)]
+    return [(x, y, half_w, half_h) for x, y in cells[:players]]
+
+def local_players():
+    """Player cars driven from this keyboard (all of them, unless networked)."""
+    return [net.player] if net is not None else list(range(len(sim.players)))
+
+def viewports():
+    """The Viewport per local player, rebuilt when the players or HUD change."""
+    global _views, _views_key
+    players = local_players()
+    key = (tuple(players), hud, OPPONENT_LOD_DISTANCES)
+    if key != _views_key:
+        n = len(players)
+        # A lone player's HUD is the full-screen one
+        _views = [Viewport(i, player, rect, hud if n == 1 else Hud(share=hud))
+                  for i, (player, rect) in enumerate(zip(players, viewport_rects(n)))]
+        _views_key = key
+    return _views
+
+# Black palette stripes like screenshot (teal to black)
+TRACK_PALETTE = (
+    (0.60, 0.75, 0.80),  # light slate
+    (0.45, 0.60, 0.65),
+    (0.15, 0.35, 0.42),
+    (0.05, 0.18, 0.22),
+    (0.0, 0.0, 0.0),
+)
+
+def _lane_strips(width):
+    """(lane centre x, RGBA) per lane strip, and the strips' half width."""
+    strips = tuple((x, TRACK_PALETTE[i] + (0.35,))
+                   for x, i in ((-width/3, 0), (0, 2), (width/3, 4)))
+    return strips, width/3 - 10
+
+LANE_STRIPS, LANE_STRIP_HALF_WIDTH = _lane_strips(track_width)
+
+def draw_track(view):
+    """Draw the racing track with an endless effect around the view's player.
     Each lane is colored; background has a dark gradient aesthetic."""
-    player_y = player_car_pos[1]
+    player_y = player_render_pos(view.player)[1]
     start_y = int((player_y - view_distance) // lane_segment * lane_segment)
     end_y = int((player_y + view_distance) // lane_segment * lane_segment)
 
@@ -307,19 +208,10 @@ def draw_track():
     glVertex3f(-track_width, player_y + view_distance, -1)
     glEnd()
 
-    # Black palette stripes like screenshot (teal to black)
-    palette = [
-        (0.60, 0.75, 0.80),  # light slate
-        (0.45, 0.60, 0.65),
-        (0.15, 0.35, 0.42),
-        (0.05, 0.18, 0.22),
-        (0.0, 0.0, 0.0)
-    ]
     # Colored lane strips
-    lane_colors = [palette[0], palette[2], palette[4]]
-    for lane_idx, x_center in enumerate([-track_width/3, 0, track_width/3]):
-        half = track_width/3 - 10
-        glColor4f(lane_colors[lane_idx][0], lane_colors[lane_idx][1], lane_colors[lane_idx][2], 0.35)
+    half = LANE_STRIP_HALF_WIDTH
+    for x_center, color in LANE_STRIPS:
+        glColor4f(*color)
         glBegin(GL_QUADS)
         glVertex3f(x_center - half, player_y - view_distance, 0)
         glVertex3f(x_center + half, player_y - view_distance, 0)
@@ -327,325 +219,97 @@ def draw_track():
         glVertex3f(x_center - half, player_y + view_distance, 0)
         glEnd()
 
-    # Track boundaries (white)
-    glColor3f(1.0, 1.0, 1.0)
-    for i in range(start_y, end_y, lane_segment):
-        x_offset = math.sin(i * track_curvature) * 30
-        glBegin(GL_LINES)
-        # Left boundary
-        glVertex3f(-track_width + x_offset, i, 0)
-        glVertex3f(-track_width + x_offset, i + lane_segment, 0)
-        # Right boundary
-        glVertex3f(track_width + x_offset, i, 0)
-        glVertex3f(track_width + x_offset, i + lane_segment, 0)
-        glEnd()
-
-    # Lane dividers (yellow, dashed every 2 segments)
-    glColor3f(1.0, 1.0, 0.0)
-    for i in range(start_y, end_y, lane_segment * 2):
-        x_offset = math.sin(i * track_curvature) * 30
-        glBegin(GL_LINES)
-        # Left lane divider
-        glVertex3f(-track_width/3 + x_offset, i, 0)
-        glVertex3f(-track_width/3 + x_offset, i + lane_segment, 0)
-        # Right lane divider
-        glVertex3f(track_width/3 + x_offset, i, 0)
-        glVertex3f(track_width/3 + x_offset, i + lane_segment, 0)
-        glEnd()
+    # Track boundaries (white) and dashed lane dividers (yellow), streamed
+    # from cached chunks
+    _track_mesh.draw(start_y, end_y, view.index)
+
+def upload_entities():
+    """Stream this frame's obstacle and player car copies once for every view.
+
+    Opponents are only interpolated here; each view uploads just the ones it
+    can see, per level of detail (see draw_opponents).
+    """
+    global _obstacle_positions, _opponent_positions, _player_positions, _ghost_positions
+    _obstacle_positions = sim.obstacles.positions()
+    _obstacle_batch.upload(_obstacle_positions)
+    _opponent_positions = lerp_store(sim.opponent_cars, render_alpha)
+    n = len(sim.players)
+    _player_positions = np.array([player_render_pos(i) for i in range(n)], float)
+    _player_batch.upload(_player_positions, PLAYER_TINTS[:n])
+    if ghost_pack is not None:
+        _ghost_positions = ghost_pack.positions(render_alpha)
+        _ghost_batch.upload(_ghost_positions, np.tile(GHOST_TINT, (len(_ghost_positions), 1)))
+
+def draw_players():
+    """Draw the player cars in view (a lone player's always is)"""
+    if len(_player_positions) == 1:
+        _player_batch.draw_uploaded()
+        return
+    center, half = _opponent_bounds  # same car body
+    _player_batch.draw_uploaded(culler.visible('players', _player_positions + center, half))
 
 def draw_obstacles():
-    """Draw obstacles on the track"""
-    for obstacle in obstacles:
-        glPushMatrix()
-        glTranslatef(obstacle['pos'][0], obstacle['pos'][1], obstacle['pos'][2])
-        
-        # Draw obstacle as a red cube
-        glColor3f(1.0, 0.0, 0.0)
-        glBegin(GL_QUADS)
-        # Front face
-        glVertex3f(-8, -8, 0)
-        glVertex3f(8, -8, 0)
-        glVertex3f(8, 8, 0)
-        glVertex3f(-8, 8, 0)
-        # Back face
-        glVertex3f(-8, -8, 15)
-        glVertex3f(8, -8, 15)
-        glVertex3f(8, 8, 15)
-        glVertex3f(-8, 8, 15)
-        # Left face
-        glVertex3f(-8, -8, 0)
-        glVertex3f(-8, -8, 15)
-        glVertex3f(-8, 8, 15)
-        glVertex3f(-8, 8, 0)
-        # Right face
-        glVertex3f(8, -8, 0)
-        glVertex3f(8, -8, 15)
-        glVertex3f(8, 8, 15)
-        glVertex3f(8, 8, 0)
-        # Top face
-        glVertex3f(-8, -8, 15)
-        glVertex3f(8, -8, 15)
-        glVertex3f(8, 8, 15)
-        glVertex3f(-8, 8, 15)
-        # Bottom face
-        glVertex3f(-8, -8, 0)
-        glVertex3f(8, -8, 0)
-        glVertex3f(8, 8, 0)
-        glVertex3f(-8, 8, 0)
-        glEnd()
-        
-        glPopMatrix()
-
-def draw_text(x, y, text, font=None):
-    if font is None:
-        font = GLUTmod.GLUT_BITMAP_HELVETICA_12
-    glColor3f(1, 1, 1)
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, 800, 0, 600)
-    
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
-    
-    glRasterPos2f(x, y)
-    for ch in text:
-        glutBitmapCharacter(font, ord(ch))
-    
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-    glMatrixMode(GL_MODELVIEW)
+    """Draw the obstacles in view as one batch"""
+    center, half = _obstacle_bounds
+    _obstacle_batch.draw_uploaded(culler.visible('obstacles', _obstacle_positions + center, half))
+
+def draw_opponents(view):
+    """Draw the opponent cars in view, one batch per level of detail"""
+    positions = _opponent_positions
+    center, half = _opponent_bounds
+    visible = culler.visible('opponents', positions + center, half)
+    levels = view.lod.select(np.linalg.norm(positions - culler.eye, axis=1))
+    for level, batch in enumerate(_opponent_batches):
+        batch.draw(positions[visible & (levels == level)])
+
+def draw_ghosts():
+    """Draw the ghost cars in view, see-through and without hiding what's behind"""
+    if ghost_pack is None:
+        return
+    center, half = _opponent_bounds  # same car body
+    glDepthMask(GL_FALSE)
+    _ghost_batch.draw_uploaded(culler.visible('ghosts', _ghost_positions + center, half))
+    glDepthMask(GL_TRUE)
 
 def _draw_rain_overlay():
+    """Advance and draw the rain (inside the HUD's screen-space projection)."""
     if not rain_enabled:
         return
-    global last_rain_tick, rain_drops
+    global last_rain_tick
     now = time.time()
     if now - last_rain_tick > rain_interval:
-        # Update rain
-        for drop in rain_drops:
-            drop[0] += rain_dx
-            drop[1] += rain_dy
-            if drop[1] < 0 or drop[0] < -10 or drop[0] > 810:
-                drop[0] = random.randint(-10, 810)
-                drop[1] = 600
+        rain.update()
         last_rain_tick = now
-
-    # Draw in screen space
-    glMatrixMode(GL_PROJECTION)
-    glPushMatrix()
-    glLoadIdentity()
-    gluOrtho2D(0, 800, 0, 600)
-    glMatrixMode(GL_MODELVIEW)
-    glPushMatrix()
-    glLoadIdentity()
-    glBegin(GL_LINES)
-    for idx, drop in enumerate(rain_drops):
-        if idx % 2 == 0:
-            glColor3f(0.5, 0.7, 1.0)
-        else:
-            glColor3f(0.8, 0.9, 1.0)
-        glVertex2f(drop[0], drop[1])
-        glVertex2f(drop[0] + 3, drop[1] - 12)
-    glEnd()
-    glPopMatrix()
-    glMatrixMode(GL_PROJECTION)
-    glPopMatrix()
-    glMatrixMode(GL_MODELVIEW)
-
-
-
-def init_obstacles():
-    """Initialize obstacles at random positions ahead of the player."""
-    global obstacles
-    obstacles = []
-    base_y = player_car_pos[1]
-    for i in range(obstacle_count):
-        x = random.uniform(-track_width + 40, track_width - 40)
-        # Place obstacles further apart
-        y = base_y + random.uniform(220, view_distance)
-        obstacles.append({
-            'pos': [x, y, 0],
-            'active': True
-        })
-
-def init_opponents():
-    """Initialize opponent cars"""
-    global opponent_cars
-    opponent_cars = []
-    for i in range(opponent_count):
-        lane = random.choice([-1, 0, 1])
-        y_pos = random.uniform(-track_length + 100, track_length - 100)
-        opponent_cars.append({
-            'pos': [lane * track_width/3, y_pos, 0],
-            'speed': max(0.35, min(0.6, player_speed * random.uniform(0.85, 1.15))),
-            'lane': lane
-        })
-
-def reset_game():
-    """Reset game to initial state"""
-    global game_over, game_paused, laps_completed, score, crash_count
-    global player_car_pos, player_car_lane, player_speed
-    global current_level, level_start_time, fifteen_sec_boost_applied, level_banner_until, win_message
-    
-    game_over = False
-    game_paused = False
-    laps_completed = 0
-    score = 0
-    crash_count = 0
-    player_car_pos = [0, -200, 0]
-    player_car_lane = 0
-    # Base speed scales with level
-    base_speed = 0.4 + 0.05 * (current_level - 1)
-    player_speed = base_speed
-    level_start_time = time.time()
-    fifteen_sec_boost_applied = False
-    level_banner_until = time.time() + 2.0
-    win_message = None
-    
-    init_obstacles()
-    init_opponents()
-    
-    print("=== CAR RACING GAME RESET ===")
-    print(f"Level: {current_level}")
-    print(f"Laps Completed: {laps_completed}")
-    print(f"Score: {score}")
-    print(f"Crashes: {crash_count}")
-
-def distance(pos1, pos2):
-    """Calculate distance between two 3D points"""
-    return math.sqrt((pos1[0] - pos2[0])**2 + (pos1[1] - pos2[1])**2 + (pos1[2] - pos2[2])**2)
-
-def check_collision(car_pos, obstacle_pos, radius=15):
-    """Check collision between car and obstacle"""
-    return distance(car_pos, obstacle_pos) < radius
-
-def check_lap_completion():
-    """Deprecated for endless road. Kept for compatibility."""
-    return
-
-def update_player_car():
-    """Update player car position"""
-    global player_car_pos, player_car_lane
-    
-    # Move forward automatically
-    player_car_pos[1] += player_speed
-    
-    # Increment score over distance
-    global score
-    score += 1
-    
-    # Apply track curvature
-    x_offset = math.sin(player_car_pos[1] * track_curvature) * 30
-    player_car_pos[0] = player_car_lane * track_width/3 + x_offset
-    
-    # No lap completion for endless mode
-    
-    # Check collision with obstacles
-    for obstacle in obstacles:
-        if obstacle['active'] and check_collision(player_car_pos, obstacle['pos']):
-            handle_crash()
-
-    # Check collision with opponents
-    for opponent in opponent_cars:
-        if check_collision(player_car_pos, opponent['pos'], radius=18):
-            handle_crash()
-
-def update_opponent_cars():
-    """Update opponent car positions and recycle them ahead for endless mode."""
-    global opponent_cars
-    player_y = player_car_pos[1]
-    
-    for opponent in opponent_cars:
-        # Move forward
-        opponent['pos'][1] += opponent['speed']
-        
-        # Apply track curvature
-        x_offset = math.sin(opponent['pos'][1] * track_curvature) * 30
-        opponent['pos'][0] = opponent['lane'] * track_width/3 + x_offset
-        
-        # If far behind the player, recycle ahead
-        if opponent['pos'][1] < player_y - 100:
-            opponent['pos'][1] = player_y + view_distance + random.uniform(50, 300)
-            opponent['lane'] = random.choice([-1, 0, 1])
-
-def update_obstacles():
-    """Recycle obstacles for endless mode when they fall behind the player."""
-    global obstacles
-    player_y = player_car_pos[1]
-    for obstacle in obstacles:
-        if obstacle['pos'][1] < player_y - 50:
-            obstacle['pos'][0] = random.uniform(-track_width + 40, track_width - 40)
-            # Respawn further ahead to reduce frequency
-            obstacle['pos'][1] = player_y + view_distance + random.uniform(220, 520)
-            obstacle['active'] = True
-
-def handle_crash():
-    """Handle car crash"""
-    global crash_count, player_car_pos, player_car_lane, game_over, opponent_cars
-    
-    crash_count += 1
-    print(f"CRASH! Total crashes: {crash_count}")
-    
-    # Reset car position
-    player_car_pos = [0, -200, 0]
-    player_car_lane = 0
-    
-    # Reposition opponents ahead to keep them visible after crash
-    base_y = player_car_pos[1]
-    for opponent in opponent_cars:
-        opponent['lane'] = random.choice([-1, 0, 1])
-        opponent['pos'][1] = base_y + random.uniform(140, 460)
-        x_offset = math.sin(opponent['pos'][1] * track_curvature) * 30
-        opponent['pos'][0] = opponent['lane'] * track_width/3 + x_offset
-    
-    if crash_count >= 5:
-        game_over = True
-        print("GAME OVER - Too many crashes!")
+    rain.draw()
 
 def keyboardListener(key, x, y):
     """Handle keyboard inputs"""
-    global player_car_lane, game_over, game_paused
     global rain_enabled
     
-    if game_over:
+    if sim.game_over:
         if key == b'r':
-            reset_game()
+            pending_inputs.append(RESTART)
         return
     
-    if game_paused:
-        # Only allow continue, restart, quit while paused
-        if key == b'c' and not game_over:
-            _advance_level()
-        elif key == b'r':
-            reset_game()
-        elif key == b'q':
-            print("Quitting game...")
-            glutLeaveMainLoop()
-        return
-    
-    # Move lanes (changed to J/L to free A/B for rain)
-    if key == b'j':
-        if player_car_lane > -1:
-            player_car_lane -= 1
-            print("Moved to left lane")
-    if key == b'l':
-        if player_car_lane < 1:
-            player_car_lane += 1
-            print("Moved to right lane")
-    
-    # Reset game (R key)
-    if key == b'r':
-        reset_game()
-    
     # Quit game (Q key)
     if key == b'q':
         print("Quitting game...")
         glutLeaveMainLoop()
         return
 
+    # Lanes (J/L to free A/B for rain; see PLAYER_KEYS for the others),
+    # restart and continue go to the simulation
+    player_input = KEY_ACTIONS.get(key)
+    if player_input is not None and player_input[1] < len(viewports()):
+        pending_inputs.append(player_input)
+    if key == b'r':
+        pending_inputs.append(RESTART)
+    if key == b'c':
+        pending_inputs.append(CONTINUE)
+
+    if sim.game_paused:
+        return
+
     # Rain toggles
     if key == b'a':
         rain_enabled = True
@@ -653,36 +317,14 @@ def keyboardListener(key, x, y):
     if key == b'b':
         rain_enabled = False
         print("Rain stopped")
-
-    # Continue to next level (if not paused between levels, ignore)
-    if key == b'c' and not game_over and not game_paused:
-        _advance_level()
-
-def _advance_level():
-    global current_level, game_paused, level_start_time, fifteen_sec_boost_applied
-    global obstacle_count, opponent_count, player_speed, win_message
-    if current_level >= 5:
-        return
-    current_level += 1
-    # Increase difficulty per level
-    obstacle_count = min(obstacle_count + 1, 9)
-    opponent_count = min(opponent_count + 1, 7)
-    player_speed = min(player_speed + 0.05, 1.3)
-    fifteen_sec_boost_applied = False
-    game_paused = False
-    level_start_time = time.time()
-    global level_banner_until
-    level_banner_until = time.time() + 2.0
-    win_message = None  # Clear any previous win message
-    init_obstacles()
-    init_opponents()
-    print(f"=== ADVANCED TO LEVEL {current_level} ===")
-    print(f"Obstacles: {obstacle_count}, Opponents: {opponent_count}, Speed: {player_speed:.2f}")
+    if key == b's':
+        heavy = rain.count != HEAVY_RAIN_COUNT
+        rain.resize(HEAVY_RAIN_COUNT if heavy else RAIN_COUNT)
+        print("Heavy storm ON" if heavy else "Heavy storm OFF")
 
 def specialKeyListener(key, x, y):
     """Handle special key inputs"""
-    global camera_angle
-    global player_speed
+    global camera_angle, profile_overlay
     
     # Rotate camera left (LEFT arrow key)
     if key == GLUT_KEY_LEFT:
@@ -694,17 +336,31 @@ def specialKeyListener(key, x, y):
 
     # Speed control
     if key == GLUT_KEY_UP:
-        player_speed = min(player_speed + 0.05, 1.5)
+        pending_inputs.append(SPEED_UP)
     if key == GLUT_KEY_DOWN:
-        player_speed = max(player_speed - 0.05, 0.1)
+        pending_inputs.append(SPEED_DOWN)
+
+    # Frame-time overlay
+    if key == GLUT_KEY_F3:
+        profile_overlay = not profile_overlay
 
-def setupCamera():
-    """Configure camera settings"""
-    global camera_angle, player_car_pos
+def player_render_pos(player=0):
+    """Player position interpolated between the last two simulation ticks."""
+    car = sim.players[player]
+    return lerp_pos(car.prev_pos, car.pos, render_alpha)
+
+def setupCamera(view):
+    """Configure camera settings for one player's viewport"""
+    player_car_pos = player_render_pos(view.player)
+    x, y, width, height = view.rect
+    glViewport(x, y, width, height)
+    # Same picture proportions as the full 800x600 window
+    aspect = (width / height) / (SCREEN_W / SCREEN_H)
     
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(fovY, 1.0, 0.1, 800)
+    far = max(800, view_distance + 200)
+    gluPerspective(fovY, aspect, 0.1, far)
     glMatrixMode(GL_MODELVIEW)
     glLoadIdentity()
     
@@ -720,92 +376,234 @@ def setupCamera():
     gluLookAt(camera_x, camera_y, camera_z,  # Camera position
               look_x, look_y, look_z,         # Look-at target
               0, 0, 1)                        # Up vector
+    # Nothing is drawn past the end of the road
+    culler.set_camera((camera_x, camera_y, camera_z), (look_x, look_y, look_z), (0, 0, 1),
+                      fovY, aspect, 0.1, far, max_distance=view_distance + 120)
 
 def idle():
     """Idle function for game updates"""
-    global game_over, game_paused
-    global level_start_time, fifteen_sec_boost_applied, current_level
-    global obstacle_count, opponent_count, player_speed
+    global last_idle_time, render_alpha
     
-    if not game_over and not game_paused:
-        update_player_car()
-        update_opponent_cars()
-        update_obstacles()
-        # Timed difficulty and level progression
-        elapsed = time.time() - level_start_time
-        if elapsed > 15 and not fifteen_sec_boost_applied:
-            player_speed = min(player_speed + 0.1, 1.2)
-            obstacle_count = min(obstacle_count + 1, 7)
-            opponent_count = min(opponent_count + 1, 6)
-            fifteen_sec_boost_applied = True
-            init_obstacles()
-            init_opponents()
-        # Level completion check
-        if elapsed >= level_durations.get(current_level, 30):
-            if current_level < 5:
-                game_paused = True
-                print(f"Level {current_level} complete! Press C to continue.")
-            else:
-                global win_message
-                win_message = "WINNER! You finished the battle run."
-                game_paused = True
+    profiler.begin_frame()
+    with profiler.scope('pace'):
+        pacer.wait()
+    now = time.time()
+    frame_time = 0.0 if last_idle_time is None else now - last_idle_time
+    last_idle_time = now
+    
+    inputs = pending_inputs[:]
+    del pending_inputs[:]
+    if net is not None:
+        with profiler.scope('net'):
+            netplay.poll(net_loop)
+            for item in inputs:
+                net.send_input(item if isinstance(item, str) else item[0])
+            render_alpha = net.advance(frame_time)
+    else:
+        with profiler.scope('sim'):
+            render_alpha = sim_clock.advance(sim, frame_time, inputs)
     
     glutPostRedisplay()
-
-def showScreen():
-    """Display function to render the game scene"""
-    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-    glLoadIdentity()
-    
-    setupCamera()
-    
-    # Draw game elements
-    draw_track()
-    draw_obstacles()
-    
-    # Draw player car (blue)
-    draw_car(player_car_pos[0], player_car_pos[1], player_car_pos[2], None, is_opponent=False)
-    
-    # Draw opponent cars
-    for opponent in opponent_cars:
-        draw_car(opponent['pos'][0], opponent['pos'][1], opponent['pos'][2], None, is_opponent=True)
-    
-    # Draw UI text
-    draw_text(10, 570, f"Level: {current_level}")
-    draw_text(10, 550, f"Score: {score}")
-    draw_text(10, 530, f"Crashes: {crash_count}")
-    draw_text(10, 510, f"Speed: {player_speed:.1f}")
+    if (sim.game_paused or sim.game_over) and net is None:
+        # Nothing moves until a key is pressed: draw this frame, then sleep
+        suspend_idle()
+
+def suspend_idle():
+    """Stop the idle loop; GLUT then only wakes for window events."""
+    global idle_running
+    if idle_running:
+        glutIdleFunc(None)
+        idle_running = False
+
+def wake():
+    """Restart the idle loop (after input, or when the window reappears)."""
+    global idle_running, last_idle_time
+    glutPostRedisplay()
+    if not idle_running and window_visible:
+        # Don't count the time asleep as game time
+        last_idle_time = None
+        pacer.reset()
+        glutIdleFunc(idle)
+        idle_running = True
+
+def _waking(handler):
+    """Wrap an input callback so it restarts a suspended idle loop."""
+    def callback(*args):
+        handler(*args)
+        wake()
+    return callback
+
+def visibilityListener(state):
+    """Stop simulating and drawing while the window is minimized or hidden.
+
+    A networked race can't stop: it keeps polling the server at a low rate.
+    """
+    global window_visible, hidden_polling
+    window_visible = state == GLUT_VISIBLE
+    if window_visible:
+        wake()
+    else:
+        suspend_idle()
+        if net is not None and not hidden_polling:
+            hidden_polling = True
+            glutTimerFunc(NET_HIDDEN_POLL_MS, hidden_poll, 0)
+
+def hidden_poll(value):
+    """Timer callback while hidden in a networked race: poll, keep our clock running."""
+    global hidden_polling, last_idle_time, render_alpha
+    if window_visible:
+        hidden_polling = False
+        return
+    now = time.time()
+    frame_time = 0.0 if last_idle_time is None else now - last_idle_time
+    last_idle_time = now
+    netplay.poll(net_loop)
+    render_alpha = net.advance(frame_time)
+    glutTimerFunc(NET_HIDDEN_POLL_MS, hidden_poll, 0)
+
+def draw_player_hud(view):
+    """One split-screen player's lines, top left of their viewport"""
+    car = sim.players[view.player]
+    top = view.rect[3]
+    view.hud.text(10, top - 20, f"P{car.index + 1}  Score: {car.score}  Crashes: {car.crash_count}")
+    view.hud.text(10, top - 36, "OUT" if car.out else f"Speed: {car.speed:.1f}")
+
+def _split_controls():
+    """Lane/speed keys of each split-screen player, for the controls line."""
+    parts = ["P1 J/L Up/Down"]
+    for i, (left, right, faster, slower) in enumerate(PLAYER_KEYS[1:len(viewports())], 2):
+        parts.append(f"P{i} {left.decode().upper()}/{right.decode().upper()} "
+                     f"{faster.decode().upper()}/{slower.decode().upper()}")
+    return "  ".join(parts)
+
+def draw_hud():
+    """HUD lines, rain and messages (expects hud.begin() to be active)"""
+    views = viewports()
+    split = len(views) > 1
+    car = sim.players[views[0].player]
+    if split:
+        # Per-player lines are in each viewport; the shared ones go bottom left
+        timer = "" if sim.game_over or sim.game_paused else f"  Time Left: {sim.time_left():.0f}s"
+        hud.text(10, 26, f"Level: {sim.current_level}{timer}")
+    else:
+        hud.text(10, 570, f"Level: {sim.current_level}")
+        hud.text(10, 550, f"Score: {car.score}")
+        hud.text(10, 530, f"Crashes: {car.crash_count}")
+        hud.text(10, 510, f"Speed: {car.speed:.1f}")
     
-    # Show level timer
-    if not game_over and not game_paused:
-        elapsed = time.time() - level_start_time
-        level_duration = level_durations.get(current_level, 60)
-        time_left = max(0, level_duration - elapsed)
-        draw_text(10, 470, f"Time Left: {time_left:.0f}s")
+        # Show level timer
+        if not sim.game_over and not sim.game_paused:
+            hud.text(10, 470, f"Time Left: {sim.time_left():.0f}s")
     
     # Rain overlay and messages
-    _draw_rain_overlay()
+    with profiler.scope('rain'):
+        _draw_rain_overlay()
     
     # Game control instructions
-    draw_text(10, 490, "Controls: J/L - Lanes, Arrows - Camera & Speed, A/B Rain, C Continue")
+    if split:
+        hud.text(10, 10, _split_controls() + ", Arrows - Camera, A/B Rain, C Continue")
+    else:
+        hud.text(10, 490, "Controls: J/L - Lanes, Arrows - Camera & Speed, A/B Rain, C Continue")
 
     # Show level banner briefly after reset/advance
-    if time.time() < level_banner_until:
-        draw_text(300, 560, f"Level {current_level} | Score: {score}")
-    
-    if game_paused:
-        if win_message is not None:
-            draw_text(180, 300, f"{win_message} Press R to restart.")
-        elif current_level < 5:
-            draw_text(220, 320, f"Level {current_level} Complete! Press C to continue to Level {current_level + 1}")
-            draw_text(260, 300, f"Score: {score}")
-    
-    if game_over:
-        draw_text(300, 250, "GAME OVER - Press R to Restart", GLUTmod.GLUT_BITMAP_HELVETICA_12)
-    
-    glutSwapBuffers()
+    if sim.level_banner_left > 0:
+        hud.text(300, 560, f"Level {sim.current_level}" if split
+                 else f"Level {sim.current_level} | Score: {car.score}")
+    
+    if sim.game_paused:
+        if sim.win_message is not None:
+            hud.text(180, 300, f"{sim.win_message} Press R to restart.")
+        elif sim.current_level < 5:
+            hud.text(220, 320, f"Level {sim.current_level} Complete! Press C to continue to Level {sim.current_level + 1}")
+            if not split:
+                hud.text(260, 300, f"Score: {car.score}")
+    
+    if sim.game_over:
+        hud.text(300, 250, "GAME OVER - Press R to Restart", GLUTmod.GLUT_BITMAP_HELVETICA_12)
+
+def draw_profile_overlay():
+    """Rolling frame-time percentiles per phase (refreshed twice a second)."""
+    global profile_overlay_lines
+    if not profile_overlay_lines or profiler.frame_count % 30 == 0:
+        profile_overlay_lines = profiler.overlay_lines() + culler.overlay_lines()
+        counts = np.sum([view.lod.counts for view in viewports()], axis=0)
+        profile_overlay_lines.append("opponent LOD " + " / ".join(map(str, counts)))
+    for i, line in enumerate(profile_overlay_lines):
+        hud.text(420, 570 - 16 * i, line)
 
-def init():
+def showScreen():
+    """Display function to render the game scene"""
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    glLoadIdentity()
+    
+    views = viewports()
+    split = len(views) > 1
+    culler.begin_frame()
+    with profiler.scope('upload'):
+        upload_entities()
+    
+    if split:
+        # Bitmap text isn't clipped to the viewport; keep each HUD inside its own
+        glEnable(GL_SCISSOR_TEST)
+    for view in views:
+        if split:
+            glScissor(*view.rect)
+        setupCamera(view)
+    
+        # Draw game elements
+        with profiler.scope('draw_track'):
+            draw_track(view)
+        with profiler.scope('draw_obstacles'):
+            draw_obstacles()
+    
+        # Draw player cars (blue, tinted per player)
+        with profiler.scope('draw_car'):
+            draw_players()
+    
+        # Draw opponent cars
+        with profiler.scope('draw_opponents'):
+            draw_opponents(view)
+    
+        # Translucent ghosts last, over the solid scene
+        with profiler.scope('draw_ghosts'):
+            draw_ghosts()
+    
+        if split:
+            with profiler.scope('draw_hud'):
+                view.hud.begin(view.rect[2], view.rect[3])
+                draw_player_hud(view)
+                view.hud.end()
+    if split:
+        glDisable(GL_SCISSOR_TEST)
+        glViewport(0, 0, SCREEN_W, SCREEN_H)
+    
+    # Draw shared UI text and overlays in one screen-space pass
+    with profiler.scope('draw_hud'):
+        hud.begin()
+        draw_hud()
+        if profile_overlay:
+            draw_profile_overlay()
+        hud.end()
+    
+    with profiler.scope('swap'):
+        present_frame()
+
+def configure(profile):
+    """Apply a settings profile from profiles.load(); call before init()."""
+    global track_width, view_distance, lane_segment, fovY, RAIN_COUNT, HEAVY_RAIN_COUNT
+    global LANE_STRIPS, LANE_STRIP_HALF_WIDTH, OPPONENT_LOD_DISTANCES
+    profiles.apply_simulation(profile)
+    track_width = profile['track_width']
+    view_distance = profile['view_distance']
+    lane_segment = profile['lane_segment']
+    fovY = profile['fov_y']
+    RAIN_COUNT = profile['rain_count']
+    HEAVY_RAIN_COUNT = profile['heavy_rain_count']
+    LANE_STRIPS, LANE_STRIP_HALF_WIDTH = _lane_strips(track_width)
+    OPPONENT_LOD_DISTANCES = tuple(profile['lod_distances'])
+    pacer.set_fps(profile['fps_cap'])
+
+def init(verbose=True, seed=None):
     """Initialize OpenGL settings"""
     glClearColor(0.0, 0.0, 0.0, 1.0)  # Black background
     glPointSize(2.0)
@@ -829,18 +627,90 @@ def init():
     glLightfv(GL_LIGHT0, GL_DIFFUSE, light_diffuse)
     glLightfv(GL_LIGHT0, GL_SPECULAR, light_specular)
     
+    # Batched models for obstacles and opponent traffic
+    global _obstacle_batch, _opponent_batches, _player_batch, _ghost_batch
+    global _obstacle_bounds, _opponent_bounds
+    _obstacle_batch = InstanceBatch(obstacle_mesh())
+    _opponent_batches = [instanced(mesh) for mesh in car_lod_meshes(OPPONENT_PALETTE)]
+    _player_batch = MeshList(car_mesh(PLAYER_PALETTE))
+    _ghost_batch = MeshList(_player_batch.mesh, share=_player_batch)
+    _obstacle_bounds = _obstacle_batch.mesh.bounds()
+    _opponent_bounds = _opponent_batches[0].mesh.bounds()
+    
     # Initialize game
-    reset_game()
+    global sim, _track_mesh
+    if net is not None:
+        sim = net.mirror
+    else:
+        sim = RaceSimulation(verbose=verbose, profiler=profiler, seed=seed, players=PLAYERS)
+    _track_mesh = TrackMesh(sim.track, track_width, lane_segment, view_distance,
+                            views=len(local_players()))
+
+    global hud
+    hud = Hud()
 
     # Seed rain positions
-    global rain_drops
-    rain_drops = []
-    for _ in range(RAIN_COUNT):
-        rain_drops.append([random.randint(0, 800), random.randint(0, 600)])
+    global rain
+    rain = RainSystem(RAIN_COUNT, rain_dx, rain_dy)
+
+def load_ghosts(path):
+    """Race player one against a ghost file, or the best ones in a directory."""
+    global ghost_pack
+    try:
+        loaded = ghosts.load(path)
+    except (OSError, ValueError) as e:
+        print(f"Can't load ghosts from {path}: {e}")
+        return
+    if loaded:
+        ghost_pack = ghosts.GhostPack(loaded, sim.track)
+        sim.tick_hooks.append(ghost_pack)
+    print(f"Racing {len(loaded)} ghost(s): " + ", ".join(str(g.score) for g in loaded))
+
+def shutdown():
+    """Run the exit steps (profile dump, closing recordings) once each."""
+    while _exit_steps:
+        step = _exit_steps.pop()
+        try:
+            step()
+        except Exception as e:
+            print(f"Error while exiting: {e}")
+
+def join_race(address, race_id, seats):
+    """Connect to a netplay server (`host:port`) before init()."""
+    global net, net_loop
+    host, port = address.rsplit(':', 1)
+    net_loop = asyncio.new_event_loop()
+    net = net_loop.run_until_complete(netplay.connect(host, int(port), race_id, seats))
+    _exit_steps.append(net.leave)
 
 def main():
+    global PLAYERS
+    config = sys.argv[sys.argv.index('--config') + 1] if '--config' in sys.argv else 'default'
+    if '--players' in sys.argv:
+        PLAYERS = int(sys.argv[sys.argv.index('--players') + 1])
+        if not 1 <= PLAYERS <= MAX_PLAYERS:
+            print(f"--players must be 1-{MAX_PLAYERS}")
+            sys.exit(2)
+    try:
+        configure(profiles.load(config))
+    except (OSError, ValueError) as e:
+        print(f"Can't use --config {config}: {e}")
+        sys.exit(2)
+    if '--profile' in sys.argv:
+        path = sys.argv[sys.argv.index('--profile') + 1]
+        _exit_steps.append(lambda: profiler.dump(path))
+    if '--connect' in sys.argv:
+        address = sys.argv[sys.argv.index('--connect') + 1]
+        race_id = int(sys.argv[sys.argv.index('--race') + 1]) if '--race' in sys.argv else 1
+        try:
+            join_race(address, race_id, PLAYERS)
+        except (OSError, ValueError) as e:
+            print(f"Can't join race {race_id} at {address}: {e}")
+            sys.exit(2)
+        print(f"Joined race {race_id} as player {net.player + 1} of {net.seats}")
     try:
         glutInit()
+        glutSetOption(GLUT_ACTION_ON_WINDOW_CLOSE, GLUT_ACTION_GLUTMAINLOOP_RETURNS)
         glutInitDisplayMode(GLUT_RGBA | GLUT_DOUBLE | GLUT_DEPTH)
         glutInitWindowSize(800, 600)
         glutInitWindowPosition(100, 100)
@@ -848,16 +718,39 @@ def main():
         
         glutDisplayFunc(showScreen)
         glutIdleFunc(idle)
-        glutSpecialFunc(specialKeyListener)
+        glutVisibilityFunc(visibilityListener)
+        glutSpecialFunc(_waking(specialKeyListener))
         glutMouseFunc(lambda *args: None)  # No mouse needed
-        glutKeyboardFunc(keyboardListener)
+        glutKeyboardFunc(_waking(keyboardListener))
+        if '--fps' in sys.argv:
+            pacer.set_fps(int(sys.argv[sys.argv.index('--fps') + 1]))
         
-        init()
+        seed = int(sys.argv[sys.argv.index('--seed') + 1]) if '--seed' in sys.argv else None
+        init(seed=seed)
+        if net is None:
+            if '--record' in sys.argv:
+                # Log every input against its tick; replay.py re-runs the race
+                recorder = InputRecorder(sys.argv[sys.argv.index('--record') + 1], sim, TICK_DT)
+                _exit_steps.append(recorder.close)
+            if '--save-ghost' in sys.argv:
+                ghost_recorder = ghosts.GhostRecorder(sys.argv[sys.argv.index('--save-ghost') + 1])
+                sim.tick_hooks.append(ghost_recorder)
+                _exit_steps.append(ghost_recorder.close)
+            if '--ghosts' in sys.argv:
+                load_ghosts(sys.argv[sys.argv.index('--ghosts') + 1])
+            print(f"Seed: {sim.seed}")
+        # Everything allocated so far lives for the whole game; keep the
+        # collector from rescanning it on every collection
+        gc.collect()
+        gc.freeze()
         
         print("=== 3D CAR RACING GAME STARTED ===")
         print("Controls:")
-        print("J/L - Change lanes | A - Rain ON | B - Rain OFF")
-        print("Arrow Keys: LEFT/RIGHT camera, UP/DOWN speed")
+        print("J/L - Change lanes | A - Rain ON | B - Rain OFF | S - Heavy storm")
+        for i, (left, right, faster, slower) in enumerate(PLAYER_KEYS[1:len(local_players())], 2):
+            print(f"Player {i}: {left.decode().upper()}/{right.decode().upper()} - Change lanes, "
+                  f"{faster.decode().upper()}/{slower.decode().upper()} - Speed")
+        print("Arrow Keys: LEFT/RIGHT camera, UP/DOWN speed | F3 - Frame-time overlay")
         print("R - Restart | Q - Quit | C - Continue (between levels)")
         print("Goal: Survive levels, avoid obstacles and opponents, finish Level 5 to win")
         
@@ -865,6 +758,8 @@ def main():
     except Exception as e:
         print(f"Error starting game: {e}")
         input("Press Enter to exit...")
+    finally:
+        shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""Screen-space rain drawn from a NumPy particle buffer.
+
+Drop positions live in one preallocated float32 array.  Each tick advects
+every drop and respawns the ones that left the screen with a few in-place
+vectorised operations (no per-drop Python work, no per-tick allocation),
+then the line vertices are written into a second preallocated array and
+uploaded to a VBO.  Drawing is a single glDrawArrays(GL_LINES).
+"""
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+SCREEN_W, SCREEN_H = 800, 600
+STREAK = (3.0, -12.0)  # drop tail, relative to its head
+DROP_COLORS = ((0.5, 0.7, 1.0), (0.8, 0.9, 1.0))  # alternating per drop
+
+
+class RainSystem:
+    """A fixed-size pool of rain drops in screen coordinates."""
+
+    def __init__(self, count, dx=0.0, dy=-6.0, rng=None):
+        self.dx = dx
+        self.dy = dy
+        self.rng = np.random.default_rng() if rng is None else rng
+        self._vbo = None
+        self._color_vbo = None
+        self.resize(count)
+
+    def resize(self, count):
+        """(Re)seed the pool with count drops scattered over the screen."""
+        self.count = count
+        self.pos = np.empty((count, 2), np.float32)
+        self.pos[:, 0] = self.rng.integers(0, SCREEN_W + 1, count)
+        self.pos[:, 1] = self.rng.integers(0, SCREEN_H + 1, count)
+        # Scratch buffers reused every tick
+        self._fresh = np.empty(count, np.float64)
+        self._mask = np.empty(count, bool)
+        self._tmp = np.empty(count, bool)
+        self._verts = np.empty((count, 2, 2), np.float32)
+        self._colors = np.empty((count, 2, 3), np.float32)
+        self._colors[0::2] = DROP_COLORS[0]
+        self._colors[1::2] = DROP_COLORS[1]
+        self._colors_dirty = True
+        self._verts_dirty = True
+
+    def update(self):
+        """Advect every drop one tick and respawn those that left the screen."""
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        x += self.dx
+        y += self.dy
+        mask, tmp = self._mask, self._tmp
+        np.less(y, 0, out=mask)
+        np.less(x, -10, out=tmp)
+        mask |= tmp
+        np.greater(x, SCREEN_W + 10, out=tmp)
+        mask |= tmp
+        if mask.any():
+            fresh = self._fresh
+            self.rng.random(out=fresh)
+            fresh *= SCREEN_W + 21
+            fresh -= 10
+            np.floor(fresh, out=fresh)
+            np.copyto(x, fresh, where=mask, casting='same_kind')
+            np.copyto(y, SCREEN_H, where=mask, casting='unsafe')
+        self._verts_dirty = True
+
+    def _upload(self):
+        if self._vbo is None:
+            self._vbo, self._color_vbo = glGenBuffers(2)
+        if self._colors_dirty:
+            glBindBuffer(GL_ARRAY_BUFFER, self._color_vbo)
+            glBufferData(GL_ARRAY_BUFFER, self._colors.nbytes, self._colors, GL_STATIC_DRAW)
+            self._colors_dirty = False
+            self._verts_dirty = True
+            glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+            glBufferData(GL_ARRAY_BUFFER, self._verts.nbytes, None, GL_STREAM_DRAW)
+        if self._verts_dirty:
+            verts = self._verts
+            verts[:, 0] = self.pos
+            np.add(self.pos, STREAK, out=verts[:, 1])
+            glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, verts.nbytes, verts)
+            self._verts_dirty = False
+
+    def draw(self):
+        """Draw every drop as one line batch (expects a 2D screen projection)."""
+        if self.count == 0:
+            return
+        self._upload()
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glVertexPointer(2, GL_FLOAT, 0, ctypes.c_void_p(0))
+        glBindBuffer(GL_ARRAY_BUFFER, self._color_vbo)
+        glColorPointer(3, GL_FLOAT, 0, ctypes.c_void_p(0))
+        glDrawArrays(GL_LINES, 0, self.count * 2)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
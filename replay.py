@@ -0,0 +1,199 @@
+"""Record and replay races from a seed plus a tick-stamped input log.
+
+The simulation draws all of its randomness from one seeded generator and
+advances in fixed ticks, so the seed, the player count, the settings
+profile and the list of (tick, action, player) input events are enough to
+reproduce a race bit-for-bit.  Replays run headless at full speed, which
+makes a recording both a repeatable performance workload and a regression
+test for crash/score outcomes.
+
+    python race.py --record run.rpl      # play, then quit with Q
+    python replay.py run.rpl             # re-run it and check the outcome
+
+A race recorded with `--config low-end` must be replayed with the same
+profile (`python replay.py --config low-end run.rpl`); the header holds a
+digest of the simulation settings and replay() refuses a mismatch.
+
+File layout (little-endian):
+
+    header   b'RRPL', u8 version, u64 seed, f64 tick_dt, u8 players,
+             u32 settings digest (profiles.simulation_digest)
+    events   u8 player << 4 | action code, varint tick delta      (repeated)
+    footer   u8 0xFF, varint tick delta to the end,
+             i64 score, i64 crashes, i64 level, u32 state digest
+             (score and crashes are player one's)
+"""
+import argparse
+import struct
+import sys
+import time
+
+import profiles
+from simulation import (CONTINUE, LEFT, RESTART, RIGHT, SPEED_DOWN, SPEED_UP,
+                        RaceSimulation)
+
+MAGIC = b'RRPL'
+VERSION = 7  # bumped whenever the simulation rules change
+END = 0xFF
+
+ACTION_CODES = {LEFT: 1, RIGHT: 2, SPEED_UP: 3, SPEED_DOWN: 4, CONTINUE: 5, RESTART: 6}
+CODE_ACTIONS = {code: action for action, code in ACTION_CODES.items()}
+
+_HEADER = struct.Struct('<4sBQdBI')
+_OUTCOME = struct.Struct('<qqqI')
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated replay")
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+class InputRecorder:
+    """Streams a simulation's input events to a replay file.
+
+    Attach before the first input is applied; close() writes the outcome
+    footer that replay() checks against.
+    """
+
+    def __init__(self, path, sim, tick_dt):
+        self.sim = sim
+        self._fh = open(path, 'wb')
+        self._fh.write(_HEADER.pack(MAGIC, VERSION, sim.seed, tick_dt, len(sim.players),
+                                    profiles.simulation_digest()))
+        self._last_tick = sim.tick
+        self.events = 0
+        sim.input_log = self.log
+
+    def log(self, tick, action, player=0):
+        self._fh.write(bytes([player << 4 | ACTION_CODES[action]]) + _varint(tick - self._last_tick))
+        self._last_tick = tick
+        self.events += 1
+
+    def close(self):
+        if self._fh.closed:
+            return
+        sim = self.sim
+        sim.input_log = None
+        self._fh.write(bytes([END]) + _varint(sim.tick - self._last_tick))
+        self._fh.write(_OUTCOME.pack(sim.score, sim.crash_count, sim.current_level,
+                                     sim.state_digest()))
+        self._fh.close()
+
+
+def load(path):
+    """Parse a replay file into (seed, tick_dt, players, settings, events, end_tick, outcome).
+
+    events are (tick, action, player) tuples; settings is the simulation
+    settings digest it was recorded under.
+    """
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    magic, version = data[:4], data[4] if len(data) > 4 else None
+    if magic != MAGIC:
+        raise ValueError(f"{path}: not a replay file")
+    if version != VERSION:
+        raise ValueError(f"{path}: unsupported replay version {version}")
+    if len(data) < _HEADER.size:
+        raise ValueError(f"{path}: truncated replay")
+    _, _, seed, tick_dt, players, settings = _HEADER.unpack_from(data)
+    pos = _HEADER.size
+    tick = 0
+    events = []
+    try:
+        while True:
+            if pos >= len(data):
+                raise ValueError("truncated replay (no footer)")
+            code = data[pos]
+            delta, pos = _read_varint(data, pos + 1)
+            tick += delta
+            if code == END:
+                break
+            if code & 0x0F not in CODE_ACTIONS or code >> 4 >= players:
+                raise ValueError(f"bad input event {code:#04x}")
+            events.append((tick, CODE_ACTIONS[code & 0x0F], code >> 4))
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    if len(data) - pos < _OUTCOME.size:
+        raise ValueError(f"{path}: truncated replay")
+    score, crashes, level, digest = _OUTCOME.unpack_from(data, pos)
+    outcome = {'score': score, 'crashes': crashes, 'level': level, 'digest': digest}
+    return seed, tick_dt, players, settings, events, tick, outcome
+
+
+def replay(path, profiler=None):
+    """Re-run a recording headless; returns (sim, expected outcome, matched).
+
+    The simulation settings in force must be the ones it was recorded
+    under (profiles.apply_simulation), otherwise ValueError.
+    """
+    seed, tick_dt, players, settings, events, end_tick, expected = load(path)
+    if settings != profiles.simulation_digest():
+        raise ValueError(f"{path}: recorded with other simulation settings; "
+                         "replay it with the --config it was recorded with")
+    kwargs = {} if profiler is None else {'profiler': profiler}
+    sim = RaceSimulation(seed=seed, players=players, **kwargs)
+    i, n = 0, len(events)
+    while sim.tick < end_tick:
+        inputs = []
+        while i < n and events[i][0] == sim.tick:
+            inputs.append(events[i][1:])
+            i += 1
+        sim.step(tick_dt, inputs)
+    # Inputs that arrived after the last tick ran
+    for _, action, player in events[i:]:
+        sim.apply_input(action, player)
+    actual = {'score': sim.score, 'crashes': sim.crash_count, 'level': sim.current_level,
+              'digest': sim.state_digest()}
+    return sim, expected, actual == expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-run recorded races and check their outcome.")
+    parser.add_argument('paths', nargs='+', metavar='FILE.rpl')
+    parser.add_argument('--config', default='default',
+                        help="settings preset or TOML/JSON profile the races were recorded with")
+    args = parser.parse_args(argv)
+    try:
+        profiles.apply_simulation(profiles.load(args.config))
+    except (OSError, ValueError) as e:
+        print(f"Can't use --config {args.config}: {e}")
+        return 2
+    failed = False
+    for path in args.paths:
+        start = time.perf_counter()
+        try:
+            sim, expected, ok = replay(path)
+        except (OSError, ValueError) as e:
+            print(e)
+            failed = True
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {sim.tick} ticks in {elapsed:.2f}s ({sim.tick / elapsed:,.0f} ticks/s)  "
+              f"score {sim.score}  crashes {sim.crash_count}  level {sim.current_level}  "
+              f"{'OK' if ok else 'MISMATCH'}")
+        if not ok:
+            print(f"  expected score {expected['score']}  crashes {expected['crashes']}  "
+                  f"level {expected['level']}  digest {expected['digest']:08x}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
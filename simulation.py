@@ -0,0 +1,615 @@
+"""Headless race simulation.
+
+All gameplay state that used to live in race.py module globals is held by
+RaceSimulation and advanced with step(dt, inputs).  Nothing in here touches
+OpenGL or the wall clock, so races can be simulated on machines without a
+display (CI boxes, benchmarks, regression tests).
+"""
+import struct
+import zlib
+
+import numpy as np
+
+from entities import EntityStore
+from opponent_ai import OpponentPlanner
+from profiler import NULL_PROFILER
+from spatial import LaneIndex
+from track_profile import TrackProfile, sine_shape
+
+# Track / world tuning (shared with the renderer in race.py)
+level_durations = {1: 45, 2: 60, 3: 75, 4: 90, 5: 120}  # seconds - more reasonable durations
+track_width = 150
+track_length = 400
+track_curvature = 0.015
+track_amplitude = 30
+view_distance = 600
+SPAWN_EDGE_MARGIN = 40  # obstacles spawn at least this far inside the road edges
+OBSTACLE_START_AHEAD = 220  # nearest a starting obstacle is placed
+lane_segment = 40
+
+# Fixed simulation rate.  Speeds are tuned in track units per 1/60 s frame
+# (the rate the game originally ran at), so each tick scales them by
+# dt * BASE_FRAME_RATE.
+TICK_RATE = 120
+TICK_DT = 1.0 / TICK_RATE
+BASE_FRAME_RATE = 60
+MAX_FRAME_TIME = 0.25  # clamp long stalls so the sim doesn't spiral
+MAX_INTERP_JUMP = 50  # moves longer than this in one tick are teleports
+
+# Entity count caps: per level-up, and for the 15-second boost
+OBSTACLE_CAP = 9
+OPPONENT_CAP = 7
+BOOST_OBSTACLE_CAP = 7
+BOOST_OPPONENT_CAP = 6
+
+# Difficulty ramps: starting entity counts, player speed per level, and the
+# mid-level boost (tuned with batch_race.py)
+START_OBSTACLES = 3  # Fewer obstacles for less frequent encounters
+START_OPPONENTS = 2  # Reduced for performance
+BASE_SPEED = 0.4
+LEVEL_SPEED_STEP = 0.05
+LEVEL_SPEED_CAP = 1.3
+BOOST_SECONDS = 15
+BOOST_SPEED_STEP = 0.1
+BOOST_SPEED_CAP = 1.2
+# Up/Down arrow speed control
+SPEED_KEY_STEP = 0.05
+MIN_SPEED = 0.1
+MAX_SPEED = 1.5
+
+# Difficulty changes are phased in: one entity added or retired at most
+# every SPAWN_INTERVAL seconds, and speed steps eased in over
+# SPEED_RAMP_SECONDS (see DifficultyScheduler)
+SPAWN_INTERVAL = 0.25
+SPEED_RAMP_SECONDS = 2.0
+
+LANE_CHANGE_SECONDS = 0.5  # an opponent takes this long to slide over one lane
+
+LANES = np.array([-1, 0, 1], dtype=np.int8)
+LANE_WIDTH = track_width / 3
+OBSTACLE_RADIUS = 15
+OPPONENT_RADIUS = 18
+
+PLAYER_START = (0, -200, 0)  # bottom of the track, centre lane
+
+# Local multiplayer: each car's starting (lane, distance behind PLAYER_START)
+MAX_PLAYERS = 4
+START_GRID = {
+    1: ((0, 0),),
+    2: ((-1, 0), (1, 0)),
+    3: ((-1, 0), (0, 0), (1, 0)),
+    4: ((-1, 0), (1, 0), (-1, 60), (1, 60)),
+}
+RESPAWN_GRACE = 1.5  # seconds a crashed car can't crash again (multiplayer)
+
+FINAL_LEVEL = 5
+MAX_CRASHES = 5
+LEVEL_BANNER_SECONDS = 2.0
+
+# Input actions accepted by RaceSimulation.step()
+LEFT = 'left'
+RIGHT = 'right'
+SPEED_UP = 'speed_up'
+SPEED_DOWN = 'speed_down'
+CONTINUE = 'continue'
+RESTART = 'restart'
+
+
+class PlayerCar:
+    """One player's car and standing; obstacles and opponents are shared."""
+
+    __slots__ = ('index', 'start_lane', 'start', 'pos', 'prev_pos', 'lane', 'speed',
+                 'score', 'score_accum', 'crash_count', 'last_impact', 'grace', 'out')
+
+    def __init__(self, index, players):
+        self.index = index
+        lane, back = START_GRID[players][index]
+        self.start_lane = lane
+        self.start = (PLAYER_START[0] + lane * LANE_WIDTH, PLAYER_START[1] - back, PLAYER_START[2])
+        self.pos = list(self.start)
+        self.prev_pos = list(self.start)
+        self.reset(BASE_SPEED)
+
+    def reset(self, speed):
+        self.pos[:] = self.start
+        self.prev_pos[:] = self.start
+        self.lane = self.start_lane  # 0 = center, -1 = left, 1 = right
+        self.speed = speed
+        self.score = 0
+        self.score_accum = 0.0
+        self.crash_count = 0
+        self.last_impact = None  # (toi, kind, index) of the latest crash
+        self.grace = 0.0  # seconds of crash immunity left
+        self.out = False  # crashed out of a multiplayer race
+
+
+def _first_player(name, doc):
+    """A RaceSimulation attribute that reads and writes player one's car."""
+    return property(lambda self: getattr(self.players[0], name),
+                    lambda self, value: setattr(self.players[0], name, value), doc=doc)
+
+
+class RaceSimulation:
+    """One race worth of game state plus the update rules that drive it.
+
+    players > 1 races several local cars through the same obstacles and
+    opponents.  Crashes then respawn a car where it is (with RESPAWN_GRACE
+    seconds of immunity) instead of restarting the field, a car that runs
+    out of crashes stops, and the game is over when every car has.  The
+    single-player attributes (player_car_pos, score, ...) refer to player
+    one.
+    """
+
+    player_car_pos = _first_player('pos', "Player one's [x, y, z].")
+    prev_player_car_pos = _first_player('prev_pos', "Player one's position before the last tick.")
+    player_car_lane = _first_player('lane', "Player one's lane.")
+    player_speed = _first_player('speed', "Player one's speed.")
+    score = _first_player('score', "Player one's score.")
+    crash_count = _first_player('crash_count', "Player one's crashes.")
+    last_impact = _first_player('last_impact', "Player one's latest (toi, kind, index) crash.")
+
+    def __init__(self, verbose=False, profiler=NULL_PROFILER, seed=None, players=1):
+        if not 1 <= players <= MAX_PLAYERS:
+            raise ValueError(f"players must be 1-{MAX_PLAYERS}, got {players}")
+        self.verbose = verbose
+        self.profiler = profiler
+        # Every random draw comes from this generator, so a seed plus the
+        # input log reproduces a race exactly (see replay.py)
+        if seed is None:
+            seed = int(np.random.SeedSequence().entropy % 2**63)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.tick = 0  # completed step() calls
+        self.input_log = None  # optional callable(tick, action, player)
+        self.tick_hooks = []  # callables(sim) run after every tick the cars drove
+        self.run = 0  # bumped by every reset_game(), so hooks can spot restarts
+        # Shared with the renderer so physics and drawing agree on the road
+        self.track = TrackProfile(*sine_shape(track_amplitude, track_curvature))
+        # Pools sized for the most entities any level can have
+        self.obstacles = EntityStore(max(OBSTACLE_CAP, BOOST_OBSTACLE_CAP))
+        self.opponent_cars = EntityStore(max(OPPONENT_CAP, BOOST_OPPONENT_CAP))
+        self.players = [PlayerCar(i, players) for i in range(players)]
+        # Broad-phase indices; obstacles only move when recycled, so theirs
+        # is rebuilt on demand, opponents' every time it is queried.
+        self.obstacle_index = LaneIndex(LANE_WIDTH, -track_width - 30, track_width + 30)
+        self.opponent_index = LaneIndex(LANE_WIDTH, -track_width - 30, track_width + 30)
+        self.obstacles_moved = True
+        self.current_level = 1
+        self.obstacle_count = START_OBSTACLES
+        self.opponent_count = START_OPPONENTS
+        self.difficulty = DifficultyScheduler()
+        self.opponent_ai = OpponentPlanner()
+        self.reset_game()
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def reset_game(self):
+        """Reset game to initial state (the current level is kept)."""
+        self.run += 1
+        self.game_over = False
+        self.game_paused = False
+        self.laps_completed = 0
+        # Base speed scales with level
+        speed = BASE_SPEED + LEVEL_SPEED_STEP * (self.current_level - 1)
+        for car in self.players:
+            car.reset(speed)
+        self.level_elapsed = 0.0
+        self.fifteen_sec_boost_applied = False
+        self.level_banner_left = LEVEL_BANNER_SECONDS
+        self.win_message = None
+
+        self.difficulty.reset(len(self.players))
+        self.init_obstacles()
+        self.init_opponents()
+
+        self._log("=== CAR RACING GAME RESET ===")
+        self._log(f"Level: {self.current_level}")
+        self._log(f"Laps Completed: {self.laps_completed}")
+        self._log(f"Score: {self.score}")
+        self._log(f"Crashes: {self.crash_count}")
+
+    def init_obstacles(self):
+        """Initialize obstacles at random positions ahead of the player."""
+        n = self.obstacle_count
+        base_y = self.racing_span()[0]
+        x = self.rng.uniform(-track_width + SPAWN_EDGE_MARGIN, track_width - SPAWN_EDGE_MARGIN, n)
+        # Place obstacles further apart
+        y = base_y + self.rng.uniform(OBSTACLE_START_AHEAD, view_distance, n)
+        self.obstacles.spawn(x, y)
+        self.obstacles_moved = True
+
+    def init_opponents(self):
+        """Initialize opponent cars"""
+        n = self.opponent_count
+        lane = self.rng.choice(LANES, n)
+        y = self.rng.uniform(-track_length + 100, track_length - 100, n)
+        speed = np.clip(self.player_speed * self.rng.uniform(0.85, 1.15, n), 0.35, 0.6)
+        self.opponent_cars.spawn(lane * LANE_WIDTH, y, speed, lane)
+
+    def level_duration(self):
+        return level_durations.get(self.current_level, 30)
+
+    def time_left(self):
+        """Seconds remaining in the current level."""
+        return max(0, self.level_duration() - self.level_elapsed)
+
+    def apply_input(self, action, player=0):
+        """Apply one input action, following the same rules as the keyboard.
+
+        Lane and speed actions steer car `player`; the others act on the
+        whole game whoever sends them.
+        """
+        if self.input_log is not None:
+            self.input_log(self.tick, action, player)
+        if self.game_over:
+            if action == RESTART:
+                self.reset_game()
+            return
+
+        car = self.players[player]
+        # Speed control works regardless of pause state
+        if action == SPEED_UP:
+            car.speed = min(car.speed + SPEED_KEY_STEP, MAX_SPEED)
+            return
+        if action == SPEED_DOWN:
+            car.speed = max(car.speed - SPEED_KEY_STEP, MIN_SPEED)
+            return
+
+        if self.game_paused:
+            # Only allow continue and restart while paused
+            if action == CONTINUE:
+                self.advance_level()
+            elif action == RESTART:
+                self.reset_game()
+            return
+
+        if action == LEFT:
+            if car.lane > -1 and not car.out:
+                car.lane -= 1
+                self._log("Moved to left lane")
+        elif action == RIGHT:
+            if car.lane < 1 and not car.out:
+                car.lane += 1
+                self._log("Moved to right lane")
+        elif action == RESTART:
+            self.reset_game()
+        elif action == CONTINUE:
+            self.advance_level()
+
+    def apply_inputs(self, inputs):
+        """Apply actions (player one's) and (action, player) pairs in order."""
+        for item in inputs:
+            if isinstance(item, str):
+                self.apply_input(item)
+            else:
+                self.apply_input(*item)
+
+    def step(self, dt, inputs=()):
+        """Advance the race by one tick covering dt seconds of level time."""
+        self.apply_inputs(inputs)
+        self.tick += 1
+
+        self.level_banner_left = max(0.0, self.level_banner_left - dt)
+        if self.game_over or self.game_paused:
+            return
+
+        # Remember where everything was so the renderer can interpolate
+        for car in self.players:
+            car.prev_pos[:] = car.pos
+        self.opponent_cars.save_prev()
+
+        prof = self.profiler
+        with prof.scope('update_player_car'):
+            self.update_player_car(dt)
+        with prof.scope('update_opponent_cars'):
+            self.update_opponent_cars(dt)
+        with prof.scope('update_obstacles'):
+            self.update_obstacles()
+        with prof.scope('difficulty'):
+            self.difficulty.update(self, dt)
+
+        # Timed difficulty and level progression
+        self.level_elapsed += dt
+        if self.level_elapsed > BOOST_SECONDS and not self.fifteen_sec_boost_applied:
+            self.difficulty.raise_speed(self, BOOST_SPEED_STEP, BOOST_SPEED_CAP)
+            self.obstacle_count = min(self.obstacle_count + 1, BOOST_OBSTACLE_CAP)
+            self.opponent_count = min(self.opponent_count + 1, BOOST_OPPONENT_CAP)
+            self.fifteen_sec_boost_applied = True
+            prof.mark(f"level {self.current_level} boost")
+        # Level completion check
+        if self.level_elapsed >= self.level_duration():
+            if self.current_level < FINAL_LEVEL:
+                self.game_paused = True
+                self._log(f"Level {self.current_level} complete! Press C to continue.")
+            else:
+                self.win_message = "WINNER! You finished the battle run."
+                self.game_paused = True
+        for hook in self.tick_hooks:
+            hook(self)
+
+    def advance_level(self):
+        if self.current_level >= FINAL_LEVEL:
+            return
+        self.current_level += 1
+        # Increase difficulty per level
+        self.obstacle_count = min(self.obstacle_count + 1, OBSTACLE_CAP)
+        self.opponent_count = min(self.opponent_count + 1, OPPONENT_CAP)
+        self.difficulty.raise_speed(self, LEVEL_SPEED_STEP, LEVEL_SPEED_CAP)
+        self.fifteen_sec_boost_applied = False
+        self.game_paused = False
+        self.level_elapsed = 0.0
+        self.level_banner_left = LEVEL_BANNER_SECONDS
+        self.win_message = None  # Clear any previous win message
+        self.profiler.mark(f"level {self.current_level}")
+        self._log(f"=== ADVANCED TO LEVEL {self.current_level} ===")
+        self._log(f"Obstacles: {self.obstacle_count}, Opponents: {self.opponent_count}, Speed: {self.player_speed:.2f}")
+
+    def update_player_car(self, dt=1.0 / BASE_FRAME_RATE):
+        """Update every player car still in the race"""
+        frames = dt * BASE_FRAME_RATE
+        for car in self.players:
+            if car.out:
+                continue
+            pos = car.pos
+            start_x, start_y = pos[0], pos[1]
+
+            # Move forward automatically
+            pos[1] += car.speed * frames
+
+            # Increment score over time survived (one point per base frame)
+            car.score_accum += frames
+            car.score = int(car.score_accum)
+
+            # Apply track curvature
+            pos[0] = car.lane * LANE_WIDTH + self.track.offset(pos[1])
+
+            if car.grace > 0:
+                car.grace = max(0.0, car.grace - dt)
+                continue
+            # Swept collision over the whole move, lane change included, so a
+            # long tick can't carry the car through anything
+            impact = self.sweep_player(start_x, start_y, pos[0], pos[1])
+            if impact is not None:
+                car.last_impact = impact
+                self.handle_crash(car)
+
+    def racing_span(self):
+        """(lowest, highest) y of the cars still racing; the world is kept around these."""
+        ys = [car.pos[1] for car in self.players if not car.out] or [car.pos[1] for car in self.players]
+        return min(ys), max(ys)
+
+    def sweep_player(self, x0, y0, x1, y1):
+        """Earliest hit along the player's move from (x0, y0) to (x1, y1).
+
+        Returns (time of impact in [0, 1], 'obstacle' or 'opponent', index)
+        or None.  Opponents are tested where they stand (they move after the
+        player each tick).
+        """
+        best = None
+        for kind, index, radius in (('obstacle', self.refresh_obstacle_index(), OBSTACLE_RADIUS),
+                                    ('opponent', self.refresh_opponent_index(), OPPONENT_RADIUS)):
+            idx, toi = index.sweep(x0, y0, x1, y1, radius)
+            if len(idx) and (best is None or toi[0] < best[0]):
+                best = (float(toi[0]), kind, int(idx[0]))
+        return best
+
+    def refresh_obstacle_index(self):
+        if self.obstacles_moved:
+            obstacles = self.obstacles
+            self.obstacle_index.build(obstacles.x, obstacles.y, obstacles.active)
+            self.obstacles_moved = False
+        return self.obstacle_index
+
+    def refresh_opponent_index(self):
+        opponents = self.opponent_cars
+        self.opponent_index.build(opponents.x, opponents.y)
+        return self.opponent_index
+
+    def update_opponent_cars(self, dt=1.0 / BASE_FRAME_RATE):
+        """Update opponent car positions and recycle them ahead for endless mode."""
+        opponents = self.opponent_cars
+        trail_y, lead_y = self.racing_span()
+
+        # Lane-change decisions for a few cars every few ticks
+        if self.opponent_ai.due():
+            with self.profiler.scope('opponent_ai'):
+                self.plan_opponents()
+
+        # Move forward, steer toward the chosen lane and follow the track curvature
+        opponents.advance(dt * BASE_FRAME_RATE)
+        opponents.steer(dt / LANE_CHANGE_SECONDS)
+        opponents.follow_lanes(LANE_WIDTH, self.track.offsets(opponents.y))
+
+        # If far behind the last player, recycle ahead of the leader
+        idx = opponents.behind(trail_y - 100)
+        if len(idx):
+            opponents.y[idx] = lead_y + view_distance + self.rng.uniform(50, 300, len(idx))
+            opponents.set_lanes(idx, self.rng.choice(LANES, len(idx)))
+
+    def plan_opponents(self):
+        """Run the opponent AI against obstacles, other opponents and the players."""
+        obstacles, opponents = self.obstacles, self.opponent_cars
+        live = np.flatnonzero(obstacles.active)
+        obstacle_y = obstacles.y[live]
+        cars = [car for car in self.players if not car.out]
+        hazard_x = np.concatenate([obstacles.x[live] - self.track.offsets(obstacle_y),
+                                   opponents.lane_pos * LANE_WIDTH, [car.lane * LANE_WIDTH for car in cars]])
+        hazard_y = np.concatenate([obstacle_y, opponents.y, [car.pos[1] for car in cars]])
+        hazard_speed = np.concatenate([np.zeros(len(live)), opponents.speed, [car.speed for car in cars]])
+        self.opponent_ai.update(opponents, hazard_x, hazard_y, hazard_speed, len(live), LANE_WIDTH)
+
+    def update_obstacles(self):
+        """Recycle obstacles for endless mode when they fall behind the last player."""
+        obstacles = self.obstacles
+        trail_y, lead_y = self.racing_span()
+        idx = obstacles.behind(trail_y - 50)
+        if len(idx):
+            obstacles.x[idx] = self.rng.uniform(-track_width + SPAWN_EDGE_MARGIN,
+                                                track_width - SPAWN_EDGE_MARGIN, len(idx))
+            # Respawn further ahead to reduce frequency
+            obstacles.y[idx] = lead_y + view_distance + self.rng.uniform(220, 520, len(idx))
+            obstacles.active[idx] = True
+            self.obstacles_moved = True
+
+    def spawn_obstacle(self):
+        """Add one obstacle just beyond the far end of the visible track."""
+        lead_y = self.racing_span()[1]
+        self.obstacles.append(self.rng.uniform(-track_width + SPAWN_EDGE_MARGIN,
+                                               track_width - SPAWN_EDGE_MARGIN),
+                              lead_y + view_distance + self.rng.uniform(50, 300))
+        self.obstacles_moved = True
+
+    def spawn_opponent(self):
+        """Add one opponent just beyond the far end of the visible track."""
+        lead_y = self.racing_span()[1]
+        lane = self.rng.choice(LANES)
+        y = lead_y + view_distance + self.rng.uniform(50, 300)
+        speed = np.clip(self.player_speed * self.rng.uniform(0.85, 1.15), 0.35, 0.6)
+        self.opponent_cars.append(lane * LANE_WIDTH + self.track.offset(y), y, speed, lane)
+
+    def adjust_population(self):
+        """Add or retire one entity toward obstacle_count/opponent_count.
+
+        Entities are only retired while out of view.  Returns True if the
+        population changed.
+        """
+        if len(self.obstacles) < self.obstacle_count:
+            self.spawn_obstacle()
+            return True
+        if len(self.opponent_cars) < self.opponent_count:
+            self.spawn_opponent()
+            return True
+        over = [store for store, target in ((self.obstacles, self.obstacle_count),
+                                            (self.opponent_cars, self.opponent_count))
+                if len(store) > target]
+        if not over:
+            return False
+        trail_y, lead_y = self.racing_span()
+        for store in over:
+            hidden = np.flatnonzero((store.y < trail_y - 50) | (store.y > lead_y + view_distance))
+            if len(hidden):
+                store.swap_remove(hidden[0])
+                self.obstacles_moved = True
+                return True
+        return False
+
+    def state_digest(self):
+        """CRC32 of the gameplay state, for checking replays bit-for-bit."""
+        crc = zlib.crc32(struct.pack('<qq', self.tick, self.current_level))
+        for car in self.players:
+            crc = zlib.crc32(struct.pack('<qqd', car.score, car.crash_count, car.speed), crc)
+            crc = zlib.crc32(np.asarray(car.pos, np.float64).tobytes(), crc)
+        for store in (self.opponent_cars, self.obstacles):
+            crc = zlib.crc32(store.x.tobytes(), crc)
+            crc = zlib.crc32(store.y.tobytes(), crc)
+        return crc
+
+    def handle_crash(self, car=None):
+        """Handle car crash"""
+        car = self.players[0] if car is None else car
+        car.crash_count += 1
+        self._log(f"CRASH! Total crashes: {car.crash_count}")
+
+        if len(self.players) > 1:
+            # The others are still racing: respawn in place, briefly immune
+            car.grace = RESPAWN_GRACE
+            if car.crash_count >= MAX_CRASHES:
+                car.out = True
+                self._log(f"Player {car.index + 1} is out!")
+                if all(c.out for c in self.players):
+                    self.game_over = True
+                    self._log("GAME OVER - Everyone crashed out!")
+            return
+
+        # Reset car position
+        car.pos[:] = car.start
+        car.lane = car.start_lane
+
+        # Reposition opponents ahead to keep them visible after crash
+        opponents = self.opponent_cars
+        n = len(opponents)
+        base_y = car.pos[1]
+        opponents.set_lanes(slice(None), self.rng.choice(LANES, n))
+        opponents.y[:] = base_y + self.rng.uniform(140, 460, n)
+        opponents.follow_lanes(LANE_WIDTH, self.track.offsets(opponents.y))
+
+        if car.crash_count >= MAX_CRASHES:
+            car.out = True
+            self.game_over = True
+            self._log("GAME OVER - Too many crashes!")
+
+
+class FixedTimestep:
+    """Accumulator that runs a simulation at TICK_RATE whatever the frame rate.
+
+    advance() consumes real frame time in whole ticks and returns the
+    leftover fraction of a tick, for the renderer to interpolate with.
+    """
+
+    def __init__(self, tick_dt=TICK_DT):
+        self.tick_dt = tick_dt
+        self.accumulator = 0.0
+
+    def advance(self, sim, frame_time, inputs=()):
+        self.accumulator += min(frame_time, MAX_FRAME_TIME)
+        while self.accumulator >= self.tick_dt:
+            sim.step(self.tick_dt, inputs)
+            inputs = ()
+            self.accumulator -= self.tick_dt
+        if inputs:
+            # No tick ran this frame; apply input now so key presses aren't lost
+            sim.apply_inputs(inputs)
+        return self.accumulator / self.tick_dt
+
+
+class DifficultyScheduler:
+    """Phases difficulty changes in instead of rebuilding the field.
+
+    Level-ups and the mid-level boost only move targets: the simulation's
+    obstacle_count/opponent_count and a queued speed step for every player
+    car.  Each tick update() eases queued speed in linearly over
+    SPEED_RAMP_SECONDS and, at most every SPAWN_INTERVAL, adds or retires
+    one entity, so a level change costs a bounded amount of work per tick
+    and nothing on screen jumps.
+    """
+
+    def __init__(self, players=1):
+        self.reset(players)
+
+    def reset(self, players=1):
+        self.pending_speed = [0.0] * players  # per player car
+        self.speed_rate = [0.0] * players
+        self.cooldown = 0.0
+
+    def raise_speed(self, sim, step, cap):
+        """Queue a speed increase of step, up to cap, for every car."""
+        pending, rate = self.pending_speed, self.speed_rate
+        for i, car in enumerate(sim.players):
+            eventual = car.speed + pending[i]
+            pending[i] += max(0.0, min(eventual + step, cap) - eventual)
+            rate[i] = pending[i] / SPEED_RAMP_SECONDS
+
+    def update(self, sim, dt):
+        pending = self.pending_speed
+        for i, car in enumerate(sim.players):
+            if pending[i] > 0:
+                step = min(pending[i], self.speed_rate[i] * dt)
+                car.speed += step
+                pending[i] -= step
+        self.cooldown = max(0.0, self.cooldown - dt)
+        if self.cooldown == 0.0 and sim.adjust_population():
+            self.cooldown = SPAWN_INTERVAL
+
+
+def lerp_pos(prev, cur, alpha):
+    """Blend two positions for rendering, snapping across teleports."""
+    if abs(cur[1] - prev[1]) > MAX_INTERP_JUMP:
+        return cur
+    return [p + (c - p) * alpha for p, c in zip(prev, cur)]
+
+
+def lerp_store(store, alpha):
+    """Interpolated (count, 3) positions for an EntityStore (a reused buffer)."""
+    return store.interpolated(alpha, MAX_INTERP_JUMP)
@@ -0,0 +1,183 @@
+"""Broad-phase spatial index for collision queries along the track.
+
+Entities are bucketed into lane-wide slabs across the track (by x) and,
+inside each slab, kept sorted by y.  A query only looks at the slabs it
+overlaps and binary-searches the y range, so the cost depends on how many
+entities are nearby rather than how many exist.
+
+sweep() tests a moving circle's whole path for one tick against the
+indexed points and reports the time of impact, so nothing is tunnelled
+through however far the circle moves in a tick.  window_pairs() answers
+many y-window queries at once.  That is how opponents query the index: the
+opponent planner (opponent_ai.OpponentPlanner.update) indexes obstacles,
+opponents and players together and asks each replanning opponent's
+lookahead window of it, so opponent-vs-opponent and opponent-vs-obstacle
+queries cost what the nearby traffic costs.
+
+Sorting is deferred until a query needs it, and sweep() over a handful of
+points (SCALAR_POINTS or fewer, as in a normal game) just scans them in
+Python: at that size NumPy's per-call overhead costs more than the sort
+saves.
+"""
+import math
+
+import numpy as np
+
+SCALAR_POINTS = 32
+
+
+def segment_hits(x0, y0, x1, y1, cx, cy, radius):
+    """Time of impact of a circle moving (x0, y0) -> (x1, y1) with points.
+
+    Returns (hit mask, toi) over the points (cx, cy): toi is the fraction
+    of the move in [0, 1] at which the circle first comes strictly within
+    radius of each point (0 if it starts there), and 1.0 where there's no
+    hit.
+    """
+    dx, dy = x1 - x0, y1 - y0
+    fx, fy = x0 - cx, y0 - cy
+    a = dx * dx + dy * dy
+    b = 2 * (fx * dx + fy * dy)
+    c = fx * fx + fy * fy - radius * radius
+    inside = c < 0
+    if a == 0:
+        return inside, np.where(inside, 0.0, 1.0)
+    disc = b * b - 4 * a * c
+    with np.errstate(invalid='ignore'):
+        t = (-b - np.sqrt(disc)) / (2 * a)
+    # disc == 0 is a graze (distance never drops below radius)
+    hit = inside | ((disc > 0) & (t >= 0) & (t <= 1))
+    toi = np.where(inside, 0.0, np.where(hit, t, 1.0))
+    return hit, toi
+
+
+class LaneIndex:
+    """Per-lane sorted-by-y index over a set of (x, y) points."""
+
+    def __init__(self, slab_width, x_min, x_max):
+        self.slab_width = slab_width
+        self.x_min = x_min
+        self.slab_count = max(1, int(np.ceil((x_max - x_min) / slab_width)))
+        self.order = np.zeros(0, dtype=np.intp)
+        self.sorted_y = np.zeros(0)
+        self.starts = np.zeros(self.slab_count + 1, dtype=np.intp)
+        self.xs = np.zeros(0)
+        self.ys = np.zeros(0)
+        self._mask = None
+        self._masked = False
+        self._sorted = True
+
+    def _slab(self, x):
+        s = np.floor((np.asarray(x) - self.x_min) / self.slab_width).astype(np.intp)
+        return np.clip(s, 0, self.slab_count - 1)
+
+    def build(self, xs, ys, mask=None):
+        """(Re)index the points; entries where mask is False are left out.
+
+        The arrays are referenced, not copied, and sorted on first use.
+        """
+        self.xs = xs
+        self.ys = ys
+        self._mask = mask
+        self._sorted = False
+
+    def _sort(self):
+        if self._sorted:
+            return
+        self._sorted = True
+        xs, ys, mask = self.xs, self.ys, self._mask
+        if mask is not None:
+            ids = np.flatnonzero(mask)
+        elif len(self.order) == len(ys) and not self._masked:
+            # Entities mostly keep their relative order between ticks, and the
+            # stable sort is close to linear on nearly sorted input.
+            ids = self.order
+        else:
+            ids = np.arange(len(ys))
+        self._masked = mask is not None
+        ids = ids[np.argsort(ys[ids], kind='stable')]
+        slabs = self._slab(xs[ids])
+        by_slab = np.argsort(slabs, kind='stable')
+        self.order = ids[by_slab]
+        self.sorted_y = ys[self.order]
+        self.starts = np.searchsorted(slabs[by_slab], np.arange(self.slab_count + 1))
+
+    def _slab_scalar(self, x):
+        s = math.floor((x - self.x_min) / self.slab_width)
+        return min(max(s, 0), self.slab_count - 1)
+
+    def candidates_box(self, x_lo, x_hi, y_lo, y_hi):
+        """Indices of points in the slabs and y window covering a box."""
+        self._sort()
+        lo, hi = self._slab_scalar(x_lo), self._slab_scalar(x_hi)
+        found = []
+        for s in range(lo, hi + 1):
+            a, b = self.starts[s], self.starts[s + 1]
+            if a == b:
+                continue
+            seg = self.sorted_y[a:b]
+            i = a + int(seg.searchsorted(y_lo, side='left'))
+            j = a + int(seg.searchsorted(y_hi, side='right'))
+            if i < j:
+                found.append(self.order[i:j])
+        if not found:
+            return np.zeros(0, dtype=np.intp)
+        return np.concatenate(found)
+
+    def sweep(self, x0, y0, x1, y1, radius):
+        """Points hit by a circle moving (x0, y0) -> (x1, y1) this tick.
+
+        Returns (indices, toi) sorted by time of impact, earliest first.
+        """
+        box = (min(x0, x1) - radius, max(x0, x1) + radius,
+               min(y0, y1) - radius, max(y0, y1) + radius)
+        if len(self.ys) <= SCALAR_POINTS:
+            idx = self._scan_box(*box)
+        else:
+            idx = self.candidates_box(*box)
+        if len(idx) == 0:
+            return idx, np.zeros(0)
+        hit, toi = segment_hits(x0, y0, x1, y1, self.xs[idx], self.ys[idx], radius)
+        idx, toi = idx[hit], toi[hit]
+        order = np.argsort(toi, kind='stable')
+        return idx[order], toi[order]
+
+    def _scan_box(self, x_lo, x_hi, y_lo, y_hi):
+        """candidates_box() by a plain scan (only the points inside the box)."""
+        live = None if self._mask is None else self._mask.tolist()
+        found = [i for i, (x, y) in enumerate(zip(self.xs.tolist(), self.ys.tolist()))
+                 if x_lo <= x <= x_hi and y_lo <= y <= y_hi and (live is None or live[i])]
+        return np.array(found, dtype=np.intp)
+
+    def window_pairs(self, y_lo, y_hi, first_slab=0, last_slab=None, budget=None):
+        """(query, point) index pairs with the point inside a query's window.
+
+        Query k covers y in [y_lo[k], y_hi[k]] across slabs first_slab to
+        last_slab (default: the last).  Pairs are counted before any are
+        built, and with a budget only the leading queries whose pairs fit in
+        it (always at least one) are expanded.  Returns (query, point, slab,
+        covered): pair arrays grouped by slab, and how many leading queries
+        they cover.
+        """
+        self._sort()
+        last_slab = self.slab_count - 1 if last_slab is None else last_slab
+        slabs = np.arange(first_slab, last_slab + 1)
+        # Each (slab, query) window is one run of sorted slots [i, i + n)
+        i = np.empty((len(slabs), len(y_lo)), dtype=np.intp)
+        n = np.empty_like(i)
+        for row, s in enumerate(slabs):
+            a, b = self.starts[s], self.starts[s + 1]
+            seg = self.sorted_y[a:b]
+            i[row] = seg.searchsorted(y_lo, side='left')
+            n[row] = seg.searchsorted(y_hi, side='right') - i[row]
+            i[row] += a
+        covered = len(y_lo)
+        if budget is not None and covered:
+            per_query = np.cumsum(n.sum(axis=0))
+            covered = min(covered, max(1, int(np.searchsorted(per_query, budget, side='right'))))
+            i, n = i[:, :covered], n[:, :covered]
+        i, n = i.ravel(), n.ravel()
+        total = n.sum()
+        q = np.repeat(np.tile(np.arange(covered), len(slabs)), n)
+        slots = np.repeat(i - np.cumsum(n) + n, n) + np.arange(total)
+        return q, self.order[slots], np.repeat(np.repeat(slabs, covered), n), covered
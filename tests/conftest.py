@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiles  # noqa: E402
+import simulation  # noqa: E402
+
+
+@pytest.fixture
+def restore_settings():
+    """Put the simulation module's profile settings back after the test."""
+    names = list(profiles.SIMULATION_KEYS.values()) + ['LANE_WIDTH']
+    saved = {name: getattr(simulation, name) for name in names}
+    yield
+    for name, value in saved.items():
+        setattr(simulation, name, value)
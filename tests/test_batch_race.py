@@ -0,0 +1,35 @@
+import pytest
+
+import batch_race
+import profiles
+import simulation
+
+
+def test_overrides_are_applied_through_the_profile(restore_settings):
+    profile, extra = batch_race.merge_overrides(
+        profiles.load('default'),
+        {'track_width': 210, 'level_durations': {'2': 30}, 'OBSTACLE_RADIUS': 9})
+    assert profile['track_width'] == 210
+    assert profile['level_durations'] == {1: 45, 2: 30, 3: 75, 4: 90, 5: 120}
+    assert extra == {'OBSTACLE_RADIUS': 9}
+    saved = simulation.OBSTACLE_RADIUS
+    try:
+        batch_race._configure(profile, extra)
+        assert simulation.LANE_WIDTH == 70
+        assert simulation.OBSTACLE_RADIUS == 9
+    finally:
+        simulation.OBSTACLE_RADIUS = saved
+
+
+def test_overrides_leave_the_profile_alone():
+    profile = profiles.load('default')
+    batch_race.merge_overrides(profile, {'level_durations': {'1': 5}})
+    assert profile['level_durations'][1] == 45
+
+
+def test_an_invalid_override_is_refused(capsys):
+    with pytest.raises(ValueError, match='base_speed must lie between'):
+        batch_race.merge_overrides(profiles.load('default'), {'BASE_SPEED': 2.0})
+    with pytest.raises(SystemExit):
+        batch_race.main(['--races', '1', '--set', 'MAX_SPEED=0.2'])
+    assert 'invalid profile' in capsys.readouterr().err
@@ -0,0 +1,56 @@
+import pytest
+
+import simulation
+from simulation import SPAWN_INTERVAL, SPEED_RAMP_SECONDS, TICK_DT, RaceSimulation
+
+
+def test_speed_step_eases_in_over_the_ramp():
+    sim = RaceSimulation(seed=1)
+    car = sim.players[0]
+    start = car.speed
+    sim.difficulty.raise_speed(sim, 0.2, 10.0)
+    speeds = []
+    for _ in range(round(SPEED_RAMP_SECONDS / TICK_DT) + 10):
+        sim.difficulty.update(sim, TICK_DT)
+        speeds.append(car.speed)
+    steps = [b - a for a, b in zip([start] + speeds, speeds)]
+    assert speeds[-1] == pytest.approx(start + 0.2)
+    assert max(steps) == pytest.approx(0.2 * TICK_DT / SPEED_RAMP_SECONDS)
+    assert sim.difficulty.pending_speed == [0.0]
+
+
+def test_speed_steps_stop_at_the_cap():
+    sim = RaceSimulation(seed=1, players=2)
+    sim.players[1].speed = 0.95
+    for _ in range(20):
+        sim.difficulty.raise_speed(sim, 0.1, 1.0)
+    for car, pending in zip(sim.players, sim.difficulty.pending_speed):
+        assert car.speed + pending == pytest.approx(1.0)
+
+
+def test_population_changes_one_entity_per_interval():
+    sim = RaceSimulation(seed=1)
+    sim.obstacle_count = len(sim.obstacles) + 5
+    counts = []
+    for _ in range(round(SPAWN_INTERVAL / TICK_DT) * 3):
+        sim.difficulty.update(sim, TICK_DT)
+        counts.append(len(sim.obstacles))
+    assert counts[-1] - counts[0] <= 3
+    assert all(b - a in (0, 1) for a, b in zip(counts, counts[1:]))
+
+
+def test_level_ups_are_deterministic():
+    def run():
+        sim = RaceSimulation(seed=9)
+        for _ in range(3):
+            sim.advance_level()
+            for _ in range(600):
+                sim.step(TICK_DT)
+        return sim.state_digest(), [car.speed for car in sim.players]
+    assert run() == run()
+
+
+def test_reset_sizes_the_queue_per_player():
+    scheduler = simulation.DifficultyScheduler()
+    scheduler.reset(3)
+    assert scheduler.pending_speed == scheduler.speed_rate == [0.0, 0.0, 0.0]
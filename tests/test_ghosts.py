@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+import ghosts
+from simulation import LEFT, RESTART, RIGHT, SPEED_UP, TICK_DT, RaceSimulation
+
+
+def race(sim, ticks, hooks):
+    sim.tick_hooks += hooks
+    rng = np.random.default_rng(4)
+    for tick in range(ticks):
+        inputs = [(LEFT, RIGHT, SPEED_UP)[rng.integers(3)]] if tick % 53 == 0 else []
+        if sim.game_over:
+            inputs.append(RESTART)
+        sim.step(TICK_DT, inputs)
+
+
+def record(path, ticks=3000, seed=7):
+    sim = RaceSimulation(seed=seed)
+    recorder = ghosts.GhostRecorder(path)
+    race(sim, ticks, [recorder])
+    recorder.close()
+    return sim, recorder
+
+
+def test_header_is_finalised_on_close(tmp_path):
+    path = tmp_path / 'run.ghost'
+    sim, recorder = record(path)
+    header = ghosts.read_header(path)
+    assert header == {'tick_dt': TICK_DT, 'ticks': recorder.ticks, 'score': sim.score,
+                      'level': sim.current_level}
+    assert recorder.ticks > 0
+
+
+def test_playback_follows_the_recorded_car(tmp_path):
+    path = tmp_path / 'run.ghost'
+    # The file holds only the latest run, so compare against that run alone
+    final_run = record(path)[0].run
+    sim = RaceSimulation(seed=7)
+    pack = ghosts.GhostPack(ghosts.load(str(path)), sim.track)
+    ghost = pack.ghosts[0]
+    worst, checked = [0.0], [0]
+
+    def check(sim):
+        if sim.run != final_run:
+            return
+        checked[0] += 1
+        car = sim.players[0]
+        worst[0] = max(worst[0], abs(ghost.y - car.pos[1]))
+        assert (ghost.lane, ghost.speed) == (car.lane, round(car.speed * ghosts.SPEED_QUANT)
+                                             / ghosts.SPEED_QUANT)
+    race(sim, 3000, [pack, check])
+    assert checked[0] == ghosts.read_header(path)['ticks']
+    assert worst[0] <= 0.5 / ghosts.QUANT
+    assert ghost.finished
+
+
+def test_restart_starts_the_file_again(tmp_path):
+    path = tmp_path / 'run.ghost'
+    sim = RaceSimulation(seed=7)
+    recorder = ghosts.GhostRecorder(path)
+    race(sim, 500, [recorder])
+    sim.reset_game()
+    for _ in range(100):
+        sim.step(TICK_DT)
+    recorder.close()
+    assert ghosts.read_header(path)['ticks'] == recorder.ticks == 100
+
+
+@pytest.mark.parametrize('dy', [0, 1, -1, 63, -64, 64, 5000, -5000])
+def test_position_deltas_round_trip(tmp_path, dy):
+    # One record per tick: zigzag varint of the quantised y change
+    path = tmp_path / 'steps.ghost'
+    sim = RaceSimulation(seed=1)
+    recorder = ghosts.GhostRecorder(path)
+    for step in range(3):
+        sim.players[0].pos[1] = step * dy / ghosts.QUANT
+        recorder(sim)
+    recorder.close()
+    ghost = ghosts.Ghost(str(path))
+    ys = []
+    while ghost.advance():
+        ys.append(ghost.y)
+    assert ys == [step * dy / ghosts.QUANT for step in range(3)]
+
+
+def test_a_directory_loads_the_best_scores(tmp_path):
+    for i, ticks in enumerate((400, 1200, 800)):
+        record(tmp_path / f'{i}.ghost', ticks=ticks)
+    (tmp_path / 'junk.ghost').write_bytes(b'nope')
+    loaded = ghosts.load(str(tmp_path), limit=2)
+    assert [g.score for g in loaded] == sorted((g.score for g in loaded), reverse=True)
+    assert [g.path.rsplit('/', 1)[1] for g in loaded] == ['1.ghost', '2.ghost']
+
+
+def test_truncated_files_are_rejected(tmp_path):
+    path = tmp_path / 'run.ghost'
+    record(path, ticks=600)
+    data = path.read_bytes()
+    cut = tmp_path / 'cut.ghost'
+    for size in range(ghosts._HEADER.size, len(data)):
+        cut.write_bytes(data[:size])
+        with pytest.raises(ValueError, match='truncated'):
+            ghosts.Ghost(str(cut))
+
+
+def test_a_directory_skips_truncated_files(tmp_path):
+    record(tmp_path / 'best.ghost', ticks=1200)
+    record(tmp_path / 'other.ghost', ticks=400)
+    best = tmp_path / 'best.ghost'
+    best.write_bytes(best.read_bytes()[:-1])
+    assert [g.path.rsplit('/', 1)[1] for g in ghosts.load(str(tmp_path))] == ['other.ghost']
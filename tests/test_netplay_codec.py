@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import netplay
+from simulation import TICK_DT, RaceSimulation
+
+
+@pytest.mark.parametrize('peak', [0, 1, 0x7F, 0x80, 0x7FFF, 0x8000, 2**30])
+def test_delta_round_trip(peak):
+    rng = np.random.default_rng(peak)
+    base = rng.integers(-1000, 1000, 97).astype(np.int32)
+    state = base.copy()
+    changed = rng.random(97) < 0.3
+    state[changed] += rng.integers(-peak, peak + 1, changed.sum()).astype(np.int32)
+    data = netplay.encode_delta(state, base)
+    np.testing.assert_array_equal(netplay.decode_delta(data, base), state)
+
+
+def test_delta_width_follows_the_largest_change():
+    base = np.zeros(16, np.int32)
+    sizes = {}
+    for peak in (5, 500, 500000):
+        state = base.copy()
+        state[[1, 9]] = (peak, -peak)
+        sizes[peak] = len(netplay.encode_delta(state, base))
+    mask = 1 + 2  # width byte and a 16-field bitmask
+    assert sizes == {5: mask + 2, 500: mask + 4, 500000: mask + 8}
+
+
+def test_unchanged_state_costs_only_the_mask():
+    state = np.arange(40, dtype=np.int32)
+    assert len(netplay.encode_delta(state, state)) == 1 + 5
+
+
+def test_captured_race_survives_a_delta_chain():
+    sim = RaceSimulation(seed=2, players=2)
+    zero = np.zeros(netplay.state_size(sim), np.int32)
+    held = zero
+    for _ in range(10):
+        for _ in range(12):
+            sim.step(TICK_DT)
+        state = np.zeros_like(zero)
+        netplay.capture(sim, state)
+        held = netplay.decode_delta(netplay.encode_delta(state, held), held)
+        np.testing.assert_array_equal(held, state)
@@ -0,0 +1,119 @@
+import numpy as np
+
+from entities import EntityStore
+from opponent_ai import PAIR_BUDGET, OpponentPlanner
+from spatial import LaneIndex
+
+LW = 50
+
+
+def dense_index(rng, n, y_span):
+    index = LaneIndex(LW, -2.5 * LW, 2.5 * LW)
+    xs = rng.integers(-1, 2, n) * LW + rng.uniform(-10, 10, n)
+    index.build(xs, rng.uniform(0, y_span, n))
+    return index
+
+
+def brute_pairs(index, y_lo, y_hi, queries):
+    slabs = index._slab(index.xs)
+    return {(k, int(p)) for k in range(queries)
+            for p in np.flatnonzero((index.ys >= y_lo[k]) & (index.ys <= y_hi[k])
+                                    & (slabs >= 1) & (slabs <= 3))}
+
+
+def test_window_pairs_match_brute_force():
+    rng = np.random.default_rng(0)
+    index = dense_index(rng, 400, 5000)
+    y_lo = rng.uniform(0, 5000, 60)
+    y_hi = y_lo + rng.uniform(0, 300, 60)
+    q, points, slab, covered = index.window_pairs(y_lo, y_hi, 1, 3)
+    assert covered == 60
+    assert set(zip(q.tolist(), points.tolist())) == brute_pairs(index, y_lo, y_hi, 60)
+    np.testing.assert_array_equal(slab, index._slab(index.xs[points]))
+
+
+def test_budget_bounds_the_pairs_built():
+    # 4000 hazards packed into 400 units: every window holds hundreds
+    rng = np.random.default_rng(1)
+    index = dense_index(rng, 4000, 400)
+    y_lo = rng.uniform(0, 400, 1000)
+    y_hi = y_lo + 60
+    q, points, _, covered = index.window_pairs(y_lo, y_hi, 1, 3, budget=PAIR_BUDGET)
+    assert 1 <= covered < 1000
+    assert len(q) == len(points) <= PAIR_BUDGET
+    assert set(zip(q.tolist(), points.tolist())) == brute_pairs(index, y_lo, y_hi, covered)
+    # The next query would have gone over
+    _, more, _, _ = index.window_pairs(y_lo[:covered + 1], y_hi[:covered + 1], 1, 3)
+    assert len(more) > PAIR_BUDGET
+
+
+def test_one_query_over_budget_still_runs_alone():
+    rng = np.random.default_rng(2)
+    index = dense_index(rng, 3000, 100)
+    q, _, _, covered = index.window_pairs(np.array([0.0, 0.0]), np.array([100.0, 100.0]),
+                                          1, 3, budget=10)
+    assert covered == 1
+    assert set(q.tolist()) == {0}
+
+
+def test_dense_traffic_stays_within_budget_and_everyone_replans():
+    rng = np.random.default_rng(3)
+    n = 2000
+    opponents = EntityStore(n)
+    lane = rng.integers(-1, 2, n)
+    opponents.spawn(lane * LW, rng.uniform(0, 3000, n), rng.uniform(0.35, 0.6, n), lane)
+    obstacle_x, obstacle_y = rng.uniform(-110, 110, n), rng.uniform(0, 3000, n)
+    hazard_x = np.concatenate([obstacle_x, opponents.lane_pos * LW])
+    hazard_y = np.concatenate([obstacle_y, opponents.y])
+    hazard_speed = np.concatenate([np.zeros(n), opponents.speed])
+    planner = OpponentPlanner()
+    planned = 0
+    while planned < n:
+        planner.update(opponents, hazard_x, hazard_y, hazard_speed, n, LW)
+        assert 1 <= planner.planned < n
+        assert planner.pairs <= PAIR_BUDGET
+        planned += planner.planned
+    assert planner.cursor == planned % n
+
+
+def test_blocked_car_moves_to_the_free_lane():
+    opponents = EntityStore(1)
+    opponents.spawn(np.array([0.0]), np.array([0.0]), np.array([0.5]), np.array([0]))
+    # An obstacle ahead in the middle lane and one alongside on the left
+    hazard_x = np.array([0.0, -LW, 0.0])
+    hazard_y = np.array([30.0, 5.0, 0.0])
+    hazard_speed = np.array([0.0, 0.0, 0.5])
+    planner = OpponentPlanner(replan_ticks=1, interval=1)
+    planner.update(opponents, hazard_x, hazard_y, hazard_speed, 2, LW)
+    assert opponents.lane[0] == 1
+    assert planner.lane_changes == 1
+
+
+def test_small_fields_plan_the_same_in_plain_python(monkeypatch):
+    import opponent_ai
+
+    def plan(seed, scalar_hazards):
+        monkeypatch.setattr(opponent_ai, 'SCALAR_HAZARDS', scalar_hazards)
+        rng = np.random.default_rng(seed)
+        n, m = int(rng.integers(1, 12)), int(rng.integers(0, 15))
+        opponents = EntityStore(n)
+        lane = rng.integers(-1, 2, n)
+        # Coarse positions and speeds, so ties and window edges come up
+        opponents.spawn(lane * LW, rng.uniform(0, 600, n).round(-1),
+                        rng.choice([0.35, 0.5, 0.6], n), lane)
+        opponents.lane_pos[rng.random(n) < 0.2] += 0.5
+        hazard_x = np.concatenate([rng.uniform(-130, 130, m), opponents.lane_pos * LW, [0.0]])
+        hazard_y = np.concatenate([rng.uniform(0, 600, m).round(-1), opponents.y, [300.0]])
+        hazard_speed = np.concatenate([np.zeros(m), opponents.speed, [0.5]])
+        planner = OpponentPlanner(replan_ticks=2, interval=1)
+        planner.cursor = int(rng.integers(n))
+        planner.update(opponents, hazard_x, hazard_y, hazard_speed, m, LW)
+        return (opponents.lane.tolist(), planner.cursor, planner.planned, planner.pairs,
+                planner.lane_changes)
+
+    changes = 0
+    for seed in range(400):
+        scalar = plan(seed, opponent_ai.SCALAR_HAZARDS)
+        assert scalar == plan(seed, -1)
+        changes += scalar[-1]
+    assert changes > 20
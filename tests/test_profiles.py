@@ -0,0 +1,93 @@
+import copy
+import json
+
+import pytest
+
+import profiles
+import simulation
+
+
+def write(path, data):
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+@pytest.mark.parametrize('name', sorted(profiles.PRESETS))
+def test_presets_are_valid(name):
+    assert profiles.load(name) == profiles.PRESETS[name]
+
+
+def test_a_file_overrides_its_base(tmp_path):
+    path = write(tmp_path / 'kiosk.json', {'base': 'low-end', 'view_distance': 450,
+                                           'level_durations': {'1': 30}})
+    profile = profiles.load(path)
+    assert profile['view_distance'] == 450
+    assert profile['fps_cap'] == profiles.PRESETS['low-end']['fps_cap']
+    assert profile['level_durations'] == {1: 30, 2: 60, 3: 75, 4: 90, 5: 120}
+    # The preset itself is left alone
+    assert profiles.PRESETS['low-end']['level_durations'][1] == 45
+
+
+@pytest.mark.parametrize('data', [[1, 2], 'default', 3])
+def test_a_file_must_hold_a_table(tmp_path, data):
+    with pytest.raises(ValueError, match='table of settings'):
+        profiles.load(write(tmp_path / 'bad.json', data))
+
+
+def test_unknown_names_and_bases_are_refused(tmp_path):
+    with pytest.raises(ValueError, match='no preset or file'):
+        profiles.load('ultra')
+    with pytest.raises(ValueError, match='unknown base preset'):
+        profiles.load(write(tmp_path / 'bad.json', {'base': 'ultra'}))
+
+
+def test_every_problem_is_reported(tmp_path):
+    path = write(tmp_path / 'bad.json', {'fps_cap': -1, 'track_width': 0, 'rainn_count': 5})
+    with pytest.raises(ValueError) as error:
+        profiles.load(path)
+    message = str(error.value)
+    assert "unknown setting 'rainn_count'" in message
+    assert 'fps_cap must be a non-negative integer' in message
+    assert 'track_width must be a positive number' in message
+
+
+def test_missing_settings_are_reported():
+    profile = copy.deepcopy(profiles.PRESETS['default'])
+    del profile['fov_y']
+    with pytest.raises(ValueError, match="missing setting 'fov_y'"):
+        profiles.validate(profile)
+
+
+@pytest.mark.parametrize('key, value, message', [
+    ('fps_cap', 30.5, 'fps_cap must be a non-negative integer'),
+    ('obstacle_cap', True, 'obstacle_cap must be a non-negative integer'),
+    ('base_speed', '0.4', 'base_speed must be a positive number'),
+    ('level_durations', {1: 45}, 'level_durations must give seconds'),
+    ('level_durations', {1: 45, 2: 60, 3: 0, 4: 90, 5: 120}, 'level_durations must all be positive'),
+    ('lod_distances', [450, 250], 'lod_distances must be two increasing'),
+    ('lod_distances', [250], 'lod_distances must be two increasing'),
+    ('fov_y', 180, 'fov_y must be under 180'),
+    ('track_width', simulation.SPAWN_EDGE_MARGIN, 'track_width must be over'),
+    ('view_distance', simulation.OBSTACLE_START_AHEAD, 'view_distance must be over'),
+    ('start_obstacles', 8, 'start_obstacles is above an obstacle cap'),
+    ('start_opponents', 7, 'start_opponents is above an opponent cap'),
+    ('base_speed', 1.6, 'base_speed must lie between'),
+    ('boost_speed_cap', 1.6, 'speed caps must not exceed max_speed'),
+])
+def test_range_checks(key, value, message):
+    profile = copy.deepcopy(profiles.PRESETS['default'])
+    profile[key] = value
+    with pytest.raises(ValueError, match=message):
+        profiles.validate(profile)
+
+
+def test_applying_a_profile_changes_the_digest(restore_settings):
+    before = profiles.simulation_digest()
+    profile = profiles.load('default')
+    profile['track_width'] = 180
+    profiles.apply_simulation(profile)
+    assert simulation.track_width == 180
+    assert simulation.LANE_WIDTH == 60
+    assert profiles.simulation_digest() != before
+    profiles.apply_simulation(profiles.load('default'))
+    assert profiles.simulation_digest() == before
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import profiles
+import replay
+from simulation import (CONTINUE, LEFT, RESTART, RIGHT, SPEED_DOWN, SPEED_UP, TICK_DT,
+                        RaceSimulation)
+
+
+def drive(sim, ticks, rng, players=1):
+    """Scripted random inputs, continuing and restarting as a player would."""
+    actions = (LEFT, RIGHT, SPEED_UP, SPEED_DOWN)
+    for _ in range(ticks):
+        inputs = []
+        if rng.random() < 0.05:
+            inputs.append((actions[rng.integers(4)], int(rng.integers(players))))
+        if sim.game_paused:
+            inputs.append(CONTINUE)
+        if sim.game_over:
+            inputs.append(RESTART)
+        sim.step(TICK_DT, inputs)
+
+
+def record(path, seed=3, ticks=2000, players=1):
+    sim = RaceSimulation(seed=seed, players=players)
+    recorder = replay.InputRecorder(path, sim, TICK_DT)
+    drive(sim, ticks, np.random.default_rng(seed), players)
+    recorder.close()
+    return sim, recorder
+
+
+@pytest.mark.parametrize('n', [0, 1, 127, 128, 300, 16383, 16384, 2**35])
+def test_varint_round_trip(n):
+    data = replay._varint(n) + b'\x2a'
+    assert replay._read_varint(data, 0) == (n, len(data) - 1)
+
+
+def test_load_returns_what_was_recorded(tmp_path):
+    path = tmp_path / 'run.rpl'
+    sim, recorder = record(path)
+    seed, tick_dt, players, settings, events, end_tick, outcome = replay.load(path)
+    assert (seed, tick_dt, players) == (3, TICK_DT, 1)
+    assert settings == profiles.simulation_digest()
+    assert len(events) == recorder.events
+    assert all(a[0] <= b[0] for a, b in zip(events, events[1:]))
+    assert end_tick == sim.tick
+    assert outcome == {'score': sim.score, 'crashes': sim.crash_count,
+                       'level': sim.current_level, 'digest': sim.state_digest()}
+
+
+@pytest.mark.parametrize('players', [1, 2])
+def test_replay_reproduces_the_race(tmp_path, players):
+    path = tmp_path / 'run.rpl'
+    record(path, seed=11, ticks=3000, players=players)
+    _, expected, matched = replay.replay(path)
+    assert matched, expected
+
+
+def test_same_seed_and_inputs_give_the_same_race():
+    a, b = RaceSimulation(seed=5), RaceSimulation(seed=5)
+    drive(a, 1500, np.random.default_rng(1))
+    drive(b, 1500, np.random.default_rng(1))
+    assert a.state_digest() == b.state_digest()
+
+
+def test_every_truncation_is_rejected(tmp_path):
+    path = tmp_path / 'run.rpl'
+    record(path, ticks=400)
+    data = path.read_bytes()
+    cut = tmp_path / 'cut.rpl'
+    for size in range(5, len(data)):
+        cut.write_bytes(data[:size])
+        with pytest.raises(ValueError, match='truncated'):
+            replay.load(cut)
+
+
+def test_main_reports_a_truncated_file(tmp_path, capsys):
+    path = tmp_path / 'run.rpl'
+    record(path, ticks=200)
+    path.write_bytes(path.read_bytes()[:-3])
+    assert replay.main([str(path)]) == 1
+    assert 'truncated replay' in capsys.readouterr().out
+
+
+def test_replay_under_other_settings_is_refused(tmp_path, restore_settings):
+    path = tmp_path / 'run.rpl'
+    record(path, ticks=200)
+    profiles.apply_simulation(profiles.load('low-end'))
+    with pytest.raises(ValueError, match='--config'):
+        replay.replay(path)
@@ -0,0 +1,132 @@
+import numpy as np
+
+import spatial
+from simulation import LANE_WIDTH, MAX_SPEED, RaceSimulation
+from spatial import LaneIndex
+
+
+def random_points(rng, n):
+    xs = rng.uniform(-150, 150, n)
+    ys = rng.uniform(0, 400, n)
+    return xs, ys, rng.random(n) < 0.8
+
+
+def brute_box(xs, ys, mask, x_lo, x_hi, y_lo, y_hi):
+    inside = (xs >= x_lo) & (xs <= x_hi) & (ys >= y_lo) & (ys <= y_hi) & mask
+    return set(np.flatnonzero(inside).tolist())
+
+
+def test_box_queries_find_every_point_inside():
+    rng = np.random.default_rng(1)
+    xs, ys, mask = random_points(rng, 500)
+    index = LaneIndex(50, -125, 125)  # points past either edge go in the edge slabs
+    index.build(xs, ys, mask)
+    for _ in range(200):
+        x_lo, y_lo = rng.uniform(-170, 150), rng.uniform(-20, 400)
+        box = (x_lo, x_lo + rng.uniform(0, 120), y_lo, y_lo + rng.uniform(0, 80))
+        found = index.candidates_box(*box).tolist()
+        assert len(found) == len(set(found))
+        assert not set(found) - set(np.flatnonzero(mask).tolist())
+        assert brute_box(xs, ys, mask, *box) <= set(found)
+
+
+def test_box_queries_only_look_at_nearby_slabs_and_rows():
+    rng = np.random.default_rng(2)
+    xs, ys, _ = random_points(rng, 5000)
+    index = LaneIndex(50, -150, 150)
+    index.build(xs, ys)
+    found = index.candidates_box(-10, 10, 200, 220)
+    # Two slabs, 20 of 400 units: about 1/3 * 1/20 of the points, not all
+    assert 0 < len(found) < 250
+    assert np.all((ys[found] >= 200) & (ys[found] <= 220))
+
+
+def test_rebuild_after_moves_reuses_the_order():
+    rng = np.random.default_rng(3)
+    xs, ys, _ = random_points(rng, 300)
+    index = LaneIndex(50, -150, 150)
+    for tick in range(20):
+        index.build(xs, ys)
+        box = (-60, 60, 100, 200)
+        assert set(index.candidates_box(*box).tolist()) >= brute_box(
+            xs, ys, np.ones(len(xs), bool), *box)
+        ys += rng.uniform(0, 5, len(ys))  # everyone drives on, a little unevenly
+        xs += rng.uniform(-20, 20, len(xs))
+    assert np.all(np.diff(index.sorted_y[index.starts[1]:index.starts[2]]) >= 0)
+
+
+def test_small_sweeps_scan_to_the_same_hits(monkeypatch):
+    rng = np.random.default_rng(0)
+    small = spatial.SCALAR_POINTS
+    hits = 0
+    for _ in range(300):
+        xs, ys, mask = random_points(rng, int(rng.integers(0, small + 1)))
+        x0, y0 = rng.uniform(-150, 150), rng.uniform(0, 400)
+        x1, y1 = x0 + rng.uniform(-60, 60), y0 + rng.uniform(0, 80)
+        found = []
+        for scalar_points in (small, -1):
+            monkeypatch.setattr(spatial, 'SCALAR_POINTS', scalar_points)
+            index = LaneIndex(50, -125, 125)
+            index.build(xs, ys, mask)
+            idx, toi = index.sweep(x0, y0, x1, y1, 15)
+            found.append(sorted(zip(toi.tolist(), idx.tolist())))
+        assert found[0] == found[1]
+        hits += len(found[0])
+    assert hits > 20
+
+
+def test_time_of_impact_matches_a_sampled_path():
+    rng = np.random.default_rng(4)
+    ts = np.linspace(0, 1, 4001)
+    for _ in range(300):
+        x0, y0, x1, y1 = rng.uniform(-60, 60, 4)
+        cx, cy = rng.uniform(-60, 60, (2, 40))
+        hit, toi = spatial.segment_hits(x0, y0, x1, y1, cx, cy, 15)
+        px = x0 + (x1 - x0) * ts[:, None]
+        py = y0 + (y1 - y0) * ts[:, None]
+        inside = (px - cx) ** 2 + (py - cy) ** 2 < 15 * 15
+        sampled = inside.any(axis=0)
+        # Sampling can only miss the shallowest clips
+        assert np.all(sampled <= hit)
+        assert (hit & ~sampled).sum() <= 1
+        both = hit & sampled
+        np.testing.assert_allclose(toi[both], ts[inside.argmax(axis=0)][both], atol=1e-3)
+        assert np.all(toi[~hit] == 1.0)
+
+
+def test_time_of_impact_cases():
+    cx, cy = np.array([0.0, 30.0, 0.0, 15.0]), np.array([50.0, 50.0, 0.0, 50.0])
+    hit, toi = spatial.segment_hits(0.0, 0.0, 0.0, 100.0, cx, cy, 15)
+    # Straight through, passing wide, starting inside, grazing exactly
+    assert hit.tolist() == [True, False, True, False]
+    assert toi.tolist() == [0.35, 1.0, 0.0, 1.0]
+    hit, toi = spatial.segment_hits(0.0, 0.0, 0.0, 0.0, cx, cy, 15)
+    assert hit.tolist() == [False, False, True, False]
+
+
+def test_sweep_reports_hits_earliest_first():
+    rng = np.random.default_rng(5)
+    xs, ys = rng.uniform(-150, 150, 300), rng.uniform(0, 2000, 300)
+    index = LaneIndex(50, -180, 180)
+    index.build(xs, ys)
+    idx, toi = index.sweep(-100, 0, 100, 2000, 15)
+    hit, expected = spatial.segment_hits(-100, 0, 100, 2000, xs, ys, 15)
+    assert sorted(idx.tolist()) == np.flatnonzero(hit).tolist()
+    np.testing.assert_array_equal(toi, expected[idx])
+    assert np.all(np.diff(toi) >= 0)
+
+
+def test_a_fast_car_cannot_tunnel_through_an_obstacle():
+    sim = RaceSimulation(seed=1)
+    car = sim.players[0]
+    y = car.pos[1] + 60
+    sim.obstacles.spawn([car.lane * LANE_WIDTH + sim.track.offset(y)], [y])
+    sim.obstacles_moved = True
+    sim.opponent_cars.spawn([], [])
+    car.speed = MAX_SPEED
+    # One long tick carries the car 90 units, well past the obstacle
+    sim.update_player_car(1.0)
+    assert car.crash_count == 1
+    toi, kind, index = car.last_impact
+    assert (kind, index) == ('obstacle', 0)
+    assert 0 < toi < 60 / 90
@@ -0,0 +1,105 @@
+"""Streaming track line geometry held in a GPU ring buffer.
+
+The endless road's boundary and lane-divider lines are built in fixed-size
+chunks of CHUNK_SEGMENTS lane segments.  A chunk is generated and uploaded
+once, when it first scrolls into view, into the ring slot (chunk index
+modulo ring size) of a single vertex buffer; by the time that slot is
+needed again the old chunk has fallen behind the player.  Each frame the
+visible segment range is drawn with one glMultiDrawArrays call, however
+large view_distance is.
+
+With several viewports (split screen) each view gets its own stretch of
+ring slots, so cars far apart on the road don't keep evicting each
+other's chunks.
+"""
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+CHUNK_SEGMENTS = 16
+VERTS_PER_SEGMENT = 8  # two boundary lines + two divider lines
+FLOATS_PER_VERT = 6  # x, y, z, r, g, b
+
+BOUNDARY_COLOR = (1.0, 1.0, 1.0)
+DIVIDER_COLOR = (1.0, 1.0, 0.0)
+
+
+class TrackMesh:
+    """Chunked boundary/divider lines for the road around the player."""
+
+    def __init__(self, track, track_width, lane_segment, view_distance, views=1):
+        self.track = track
+        self.track_width = track_width
+        self.lane_segment = lane_segment
+        self.chunk_length = lane_segment * CHUNK_SEGMENTS
+        # Enough slots for every chunk a view can touch, plus one spare
+        self.view_slots = int(np.ceil(2 * view_distance / self.chunk_length)) + 2
+        self.slots = self.view_slots * views
+        self.slot_keys = [None] * self.slots
+        self.chunks_built = 0
+        self.draw_calls = 0
+        self._chunk_floats = CHUNK_SEGMENTS * VERTS_PER_SEGMENT * FLOATS_PER_VERT
+        self._vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.slots * self._chunk_floats * 4, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def _build_chunk(self, key):
+        """Vertex data for chunk `key` (interleaved position + color)."""
+        seg = self.lane_segment
+        first = key * CHUNK_SEGMENTS
+        ys = (first + np.arange(CHUNK_SEGMENTS)) * seg
+        offsets = self.track.offsets(ys)
+        w = self.track_width
+        data = np.zeros((CHUNK_SEGMENTS, VERTS_PER_SEGMENT, FLOATS_PER_VERT), np.float32)
+        # Boundaries: left then right, each a line from y to y + seg
+        for v, (x, color, dy) in enumerate([(-w, BOUNDARY_COLOR, 0), (-w, BOUNDARY_COLOR, seg),
+                                            (w, BOUNDARY_COLOR, 0), (w, BOUNDARY_COLOR, seg),
+                                            (-w/3, DIVIDER_COLOR, 0), (-w/3, DIVIDER_COLOR, seg),
+                                            (w/3, DIVIDER_COLOR, 0), (w/3, DIVIDER_COLOR, seg)]):
+            data[:, v, 0] = x + offsets
+            data[:, v, 1] = ys + dy
+            data[:, v, 3:] = color
+        # Dividers are dashed: on every other segment collapse them to a point
+        odd = (first + np.arange(CHUNK_SEGMENTS)) % 2 == 1
+        data[odd, 5, :2] = data[odd, 4, :2]
+        data[odd, 7, :2] = data[odd, 6, :2]
+        return data
+
+    def _ensure_chunk(self, key, view):
+        slot = view * self.view_slots + key % self.view_slots
+        if self.slot_keys[slot] != key:
+            data = self._build_chunk(key)
+            glBufferSubData(GL_ARRAY_BUFFER, slot * data.nbytes, data.nbytes, data)
+            self.slot_keys[slot] = key
+            self.chunks_built += 1
+        return slot
+
+    def draw(self, start_y, end_y, view=0):
+        """Draw the lines for segments starting in [start_y, end_y)."""
+        seg = self.lane_segment
+        first_seg = int(start_y // seg)
+        end_seg = int(-(-end_y // seg))  # exclusive
+        if end_seg <= first_seg:
+            self.draw_calls = 0
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        firsts, counts = [], []
+        for key in range(first_seg // CHUNK_SEGMENTS, (end_seg - 1) // CHUNK_SEGMENTS + 1):
+            slot = self._ensure_chunk(key, view)
+            lo = max(first_seg, key * CHUNK_SEGMENTS) - key * CHUNK_SEGMENTS
+            hi = min(end_seg, (key + 1) * CHUNK_SEGMENTS) - key * CHUNK_SEGMENTS
+            firsts.append((slot * CHUNK_SEGMENTS + lo) * VERTS_PER_SEGMENT)
+            counts.append((hi - lo) * VERTS_PER_SEGMENT)
+
+        stride = FLOATS_PER_VERT * 4
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(3, GL_FLOAT, stride, ctypes.c_void_p(0))
+        glColorPointer(3, GL_FLOAT, stride, ctypes.c_void_p(12))
+        glMultiDrawArrays(GL_LINES, np.array(firsts, np.int32), np.array(counts, np.int32), len(firsts))
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.draw_calls = 1